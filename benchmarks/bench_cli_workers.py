@@ -0,0 +1,120 @@
+"""
+Requests per second of the CLI backend: a ``pvesh`` process per request versus
+long-lived worker processes.
+
+A stand-in ``pvesh`` script sleeps ``STARTUP_MS`` on start (pvesh loads its Perl
+modules) and ``CALL_MS`` per call. Run as ``pvesh get <path>`` it answers one
+request, with ``--worker`` it answers the newline delimited JSON requests of the
+batch protocol until stdin closes.
+
+    python benchmarks/bench_cli_workers.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_common import percentile, print_table
+
+from ext_api.backends.backend_cli import ProxmoxAsyncCLIBackend, ProxmoxCLIBackend
+
+STARTUP_MS = 150
+CALL_MS = 5
+REQUESTS = 200
+CONCURRENCY = 8
+
+FAKE_PVESH = f"""
+import json, sys, time
+time.sleep({STARTUP_MS} / 1000)
+if sys.argv[1] != "--worker":
+    time.sleep({CALL_MS} / 1000)
+    print(json.dumps({{"path": sys.argv[2], "status": "online"}}))
+    sys.exit(0)
+for line in sys.stdin:
+    req = json.loads(line)
+    time.sleep({CALL_MS} / 1000)
+    answer = {{"id": req["id"], "ok": True, "data": {{"path": req["path"], "status": "online"}}}}
+    sys.stdout.write(json.dumps(answer) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+def run(backend) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+
+    async def client(count: int):
+        for i in range(count):
+            start = time.perf_counter()
+            result = await backend.async_request(method="get", endpoint=f"nodes/pve{i}")
+            assert result["success"], result
+            latencies.append(time.perf_counter() - start)
+
+    async def main() -> float:
+        async with backend:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(client(REQUESTS // CONCURRENCY) for _ in range(CONCURRENCY))
+            )
+            return time.perf_counter() - start
+
+    return asyncio.run(main()), latencies
+
+
+def run_sync(backend) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    with backend:
+        start = time.perf_counter()
+        for i in range(REQUESTS // CONCURRENCY):
+            begin = time.perf_counter()
+            assert backend.request(method="get", endpoint=f"nodes/pve{i}")["success"]
+            latencies.append(time.perf_counter() - begin)
+        return time.perf_counter() - start, latencies
+
+
+def row(name: str, duration: float, latencies: list[float]) -> tuple:
+    return (
+        name,
+        len(latencies),
+        f"{len(latencies) / duration:.1f}",
+        f"{percentile(latencies, 50) * 1000:.1f}",
+        f"{percentile(latencies, 99) * 1000:.1f}",
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "pvesh"
+        script.write_text(FAKE_PVESH)
+        # the backend strips "/" around the entry point, start it from PATH
+        spawn = f"{Path(sys.executable).name} {script}"
+        worker = [sys.executable, str(script), "--worker"]
+        rows = [
+            row("sync, pvesh per request", *run_sync(ProxmoxCLIBackend(spawn))),
+            row(
+                "sync, 1 worker",
+                *run_sync(ProxmoxCLIBackend(spawn, workers=1, worker_command=worker)),
+            ),
+            row(
+                f"async x{CONCURRENCY}, pvesh per request",
+                *run(ProxmoxAsyncCLIBackend(spawn)),
+            ),
+            row(
+                f"async x{CONCURRENCY}, {CONCURRENCY} workers",
+                *run(
+                    ProxmoxAsyncCLIBackend(
+                        spawn, workers=CONCURRENCY, worker_command=worker
+                    )
+                ),
+            ),
+        ]
+    print_table(
+        f"CLI backend (stand-in pvesh: startup {STARTUP_MS} ms, call {CALL_MS} ms)",
+        rows,
+        ("mode", "requests", "req/s", "p50 ms", "p99 ms"),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Shared helpers for the micro-benchmarks in this folder.
+
+The benchmarks are plain scripts, run them from the project root, e.g.:
+
+    python benchmarks/bench_path_builder.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from ext_api.backends.backend_abstract import ProxmoxBackend  # noqa: E402
+from ext_api.backends.backend_registry import (  # noqa: E402
+    BackendRegistry,
+    BackendType,
+)
+
+NULL_RESPONSE = {
+    "response": {"data": {"status": "ok"}},
+    "status_code": 200,
+    "success": True,
+}
+
+
+class NullBackend(ProxmoxBackend):
+    """Backend that answers every request immediately with a canned response."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.endpoints: list[str] = []
+
+    def request(self, method: str = None, endpoint: str = None, *args, **kwargs):
+        self.endpoints.append(endpoint)
+        return NULL_RESPONSE
+
+    async def async_request(
+        self, method: str = None, endpoint: str = None, *args, **kwargs
+    ):
+        self.endpoints.append(endpoint)
+        return NULL_RESPONSE
+
+
+class NullAsyncBackend(NullBackend): ...
+
+
+def register_null_backend():
+    BackendRegistry.register_backend("null", BackendType.SYNC, NullBackend)
+    BackendRegistry.register_backend("null", BackendType.ASYNC, NullAsyncBackend)
+
+
+def timeit(func, repeat: int = 5, number: int = 10_000) -> float:
+    """Return the best per-call time of ``func`` in microseconds."""
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        results.append((time.perf_counter() - start) / number)
+    return min(results) * 1e6
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def print_table(title: str, rows: list[tuple], headers: tuple):
+    print(f"\n{title}")
+    widths = [
+        max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)
+    ]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+__all__ = [
+    "NullBackend",
+    "NullAsyncBackend",
+    "register_null_backend",
+    "timeit",
+    "percentile",
+    "print_table",
+]
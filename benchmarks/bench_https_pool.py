@@ -0,0 +1,179 @@
+"""
+Sweep of the HTTPS backend connection pool settings against a local stand-in server.
+
+The stand-in server speaks plain HTTP/1.1 with keep-alive and mimics pveproxy:
+a new connection costs ``HANDSHAKE_MS`` (the TLS handshake of the real server),
+every request ``SERVICE_MS``, and at most ``SERVER_WORKERS`` requests are served
+at the same time. Each row runs ``CONCURRENCY`` clients on one async ProxmoxAPI
+and reports throughput, p50/p99 latency and the connections the server accepted.
+
+HTTP/2 needs TLS with ALPN, so the stand-in server only measures the pool limits
+and keepalive settings; ``HTTP2`` is left to the real cluster.
+
+    python benchmarks/bench_https_pool.py
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from bench_common import percentile, print_table
+
+from ext_api.backends.registry import register_backends
+from ext_api.proxmox_api import ProxmoxAPI
+
+HANDSHAKE_MS = 10
+SERVICE_MS = 2
+SERVER_WORKERS = 16
+REQUESTS = 2_000
+
+# (concurrency, max_connections, max_keepalive_connections, keepalive_expiry)
+SWEEP = [
+    (10, 1, 1, 5.0),
+    (10, 10, 0, 5.0),
+    (10, 10, 10, 5.0),
+    (10, 100, 20, 5.0),
+    (50, 10, 10, 5.0),
+    (50, 50, 20, 5.0),
+    (50, 50, 50, 5.0),
+    (50, 100, 20, 0.001),
+]
+
+BODY = json.dumps({"data": [{"node": f"pve{i}", "status": "online"} for i in range(8)]})
+
+
+class StandInServer:
+    """Minimal keep-alive HTTP/1.1 server running its own event loop in a thread."""
+
+    def __init__(self):
+        self.connections = 0
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._workers = asyncio.Semaphore(SERVER_WORKERS)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        server.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_MS / 1000)
+        body = BODY.encode()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                async with self._workers:
+                    await asyncio.sleep(SERVICE_MS / 1000)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def run_sweep_row(
+    server: StandInServer,
+    concurrency: int,
+    max_connections: int,
+    max_keepalive: int,
+    keepalive_expiry: float,
+) -> tuple:
+    api = ProxmoxAPI(
+        backend_name="https",
+        backend_type="async",
+        base_url=f"http://127.0.0.1:{server.port}",
+        entry_point="/api2/json",
+        token="bench@pam!bench=secret",
+        verify_ssl=False,
+        http2=False,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+        timeout_pool=60,
+        rate_limit=False,
+        concurrency=False,
+    )
+    latencies: list[float] = []
+
+    async def client(count: int):
+        for _ in range(count):
+            start = time.perf_counter()
+            await api.nodes.get()
+            latencies.append(time.perf_counter() - start)
+
+    async def run() -> float:
+        async with api:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(client(REQUESTS // concurrency) for _ in range(concurrency))
+            )
+            return time.perf_counter() - start
+
+    connections = server.connections
+    duration = asyncio.run(run())
+    return (
+        concurrency,
+        max_connections,
+        max_keepalive,
+        keepalive_expiry,
+        f"{len(latencies) / duration:.0f}",
+        f"{percentile(latencies, 50) * 1000:.1f}",
+        f"{percentile(latencies, 99) * 1000:.1f}",
+        server.connections - connections,
+    )
+
+
+def main():
+    register_backends("https")
+    with StandInServer() as server:
+        rows = [run_sweep_row(server, *settings) for settings in SWEEP]
+    print_table(
+        f"HTTPS pool sweep, {REQUESTS} requests per row "
+        f"(handshake {HANDSHAKE_MS} ms, service {SERVICE_MS} ms, {SERVER_WORKERS} server workers)",
+        rows,
+        (
+            "concurrency",
+            "max conn",
+            "keepalive",
+            "expiry s",
+            "req/s",
+            "p50 ms",
+            "p99 ms",
+            "connections",
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Cold start of the command line tool: ``python -X importtime`` of its entry
+points in fresh interpreters, and the heavy dependencies each one loads.
+
+    python benchmarks/bench_import_time.py
+"""
+
+import subprocess
+import sys
+import time
+
+from bench_common import SRC_PATH, print_table
+
+RUNS = 7
+HEAVY = ("httpx", "paramiko", "asyncssh", "yaml", "dotenv", "asyncio")
+TARGETS = {
+    "main (CLI)": "import main",
+    "ext_api.proxmox_api + register_backends": (
+        "from ext_api.backends.registry import register_backends\n"
+        "from ext_api.proxmox_api import ProxmoxAPI\n"
+        "register_backends()"
+    ),
+    "https backend chosen": (
+        "from ext_api.backends.registry import register_backends\n"
+        "from ext_api.proxmox_api import ProxmoxAPI\n"
+        "register_backends()\n"
+        "ProxmoxAPI(backend_name='https', backend_type='sync')"
+    ),
+}
+
+
+def run(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        cwd=SRC_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time(code: str) -> tuple[float, list[tuple[str, int]]]:
+    """Total import time in ms without ``site``, and the slowest top-level imports."""
+    best, slowest = None, []
+    for _ in range(RUNS):
+        top_level = []
+        for line in run(code, "-X", "importtime").stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  ") and name.strip() != "site":
+                top_level.append((name.strip(), int(cumulative)))
+        total = sum(us for _, us in top_level) / 1000
+        if best is None or total < best:
+            best, slowest = total, sorted(top_level, key=lambda i: -i[1])[:3]
+    return best, slowest
+
+
+def heavy_modules(code: str) -> str:
+    check = (
+        f"{code}\nimport sys\nprint(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    return run(check).stdout.strip() or "-"
+
+
+def cli_version() -> float:
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py", "--version"],
+            cwd=SRC_PATH,
+            capture_output=True,
+            check=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    rows = []
+    for target, code in TARGETS.items():
+        total, slowest = import_time(code)
+        rows.append(
+            (
+                target,
+                f"{total:.1f}",
+                ", ".join(f"{name} {us / 1000:.1f}" for name, us in slowest),
+                heavy_modules(code),
+            )
+        )
+    print_table(
+        f"Import time, best of {RUNS} fresh interpreters (-X importtime)",
+        rows,
+        ("entry point", "ms", "slowest top-level imports (ms)", "heavy modules loaded"),
+    )
+    print(f"\n'main.py --version' wall time: {cli_version():.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Overhead of the interceptor chain on the request path: no interceptors versus
+interceptors that override every hook and do nothing, sync and async.
+
+    python benchmarks/bench_interceptors.py
+"""
+
+import asyncio
+import time
+
+from bench_common import print_table, register_null_backend, timeit
+
+from ext_api.interceptors import Interceptor
+from ext_api.proxmox_api import ProxmoxAPI
+
+COROUTINES = 10_000
+
+
+class NoopInterceptor(Interceptor):
+    def before_request(self, context):
+        return None
+
+    def after_response(self, context, result):
+        return result
+
+    def on_error(self, context, error):
+        return None
+
+
+class AsyncNoopInterceptor(NoopInterceptor):
+    async def before_request(self, context):
+        return None
+
+
+def make_api(backend_type: str, interceptors: list) -> ProxmoxAPI:
+    return ProxmoxAPI(
+        backend_name="null",
+        backend_type=backend_type,
+        retry=False,
+        circuit_breaker=False,
+        rate_limit=False,
+        concurrency=False,
+        single_flight=False,
+        interceptors=interceptors,
+    )
+
+
+def bench_sync(interceptors: list) -> float:
+    api = make_api("sync", interceptors)
+    return timeit(lambda: api.version.get())
+
+
+def bench_async(interceptors: list) -> float:
+    api = make_api("async", interceptors)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(COROUTINES):
+            await api.version.get()
+        return time.perf_counter() - start
+
+    return min(asyncio.run(run()) for _ in range(5)) / COROUTINES * 1e6
+
+
+def main():
+    register_null_backend()
+    rows = []
+    cases = [
+        ("sync", bench_sync, lambda: []),
+        ("sync", bench_sync, lambda: [NoopInterceptor()]),
+        ("sync", bench_sync, lambda: [NoopInterceptor() for _ in range(3)]),
+        ("async", bench_async, lambda: []),
+        ("async", bench_async, lambda: [NoopInterceptor()]),
+        ("async", bench_async, lambda: [AsyncNoopInterceptor() for _ in range(3)]),
+    ]
+    baseline = {}
+    for mode, bench, interceptors in cases:
+        chain = interceptors()
+        per_request = bench(chain)
+        baseline.setdefault(mode, per_request)
+        overhead = per_request - baseline[mode]
+        kind = type(chain[0]).__name__ if chain else "-"
+        rows.append(
+            (
+                mode,
+                len(chain),
+                kind,
+                f"{per_request:.2f}",
+                f"{overhead:+.2f}",
+                f"{overhead / baseline[mode]:+.1%}",
+            )
+        )
+    print_table(
+        "Interceptor chain overhead (null backend, whole ProxmoxAPI request)",
+        rows,
+        ("mode", "interceptors", "kind", "us/request", "overhead us", "overhead"),
+    )
+
+
+if __name__ == "__main__":
+    main()
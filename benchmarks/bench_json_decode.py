@@ -0,0 +1,127 @@
+"""
+Decoding of large ``/cluster/resources`` bodies: the former CLI/SSH path
+(decode to str, strip, ``json.loads`` twice) versus one pass from bytes with
+every JSON library installed (stdlib, orjson, msgspec).
+
+    python benchmarks/bench_json_decode.py
+"""
+
+import json
+import random
+
+from bench_common import print_table, timeit
+
+from ext_api.backends import json_codec
+from ext_api.backends.backend_cli import ProxmoxCLIBaseBackend
+
+SIZES = (1_000, 10_000, 50_000)
+
+
+def cluster_resources(guests: int) -> bytes:
+    rnd = random.Random(guests)
+    nodes = [f"pve{i}" for i in range(1, 17)]
+    data = [
+        {
+            "id": f"node/{node}",
+            "type": "node",
+            "node": node,
+            "status": "online",
+            "cpu": rnd.random(),
+            "maxcpu": 64,
+            "mem": rnd.randrange(1 << 36),
+            "maxmem": 1 << 38,
+            "uptime": rnd.randrange(10**7),
+        }
+        for node in nodes
+    ]
+    for vmid in range(100, 100 + guests):
+        data.append(
+            {
+                "id": f"qemu/{vmid}",
+                "type": "qemu",
+                "vmid": vmid,
+                "name": f"vm-{vmid}-app",
+                "node": rnd.choice(nodes),
+                "status": rnd.choice(("running", "stopped")),
+                "template": 0,
+                "tags": "prod;web",
+                "pool": "tenants",
+                "cpu": rnd.random(),
+                "maxcpu": 4,
+                "mem": rnd.randrange(1 << 33),
+                "maxmem": 1 << 33,
+                "disk": 0,
+                "maxdisk": 1 << 35,
+                "netin": rnd.randrange(1 << 40),
+                "netout": rnd.randrange(1 << 40),
+                "diskread": rnd.randrange(1 << 40),
+                "diskwrite": rnd.randrange(1 << 40),
+                "uptime": rnd.randrange(10**7),
+            }
+        )
+    return json.dumps(data, indent=1).encode() + b"\n"
+
+
+def former_cli_path(output: bytes):
+    decoded = output.decode("utf-8").strip()
+    json.loads(decoded)
+    return json.loads(decoded)
+
+
+def available_libraries() -> list[str]:
+    libraries = []
+    for name in json_codec.LIBRARIES:
+        try:
+            json_codec.use(name)
+        except ImportError:
+            continue
+        libraries.append(name)
+    json_codec.use()
+    return libraries
+
+
+def main():
+    libraries = available_libraries()
+    rows = []
+    for guests in SIZES:
+        body = cluster_resources(guests)
+        number = max(1, 200_000 // guests)
+        mb = len(body) / 1e6
+        baseline = timeit(lambda: former_cli_path(body), repeat=3, number=number)
+        rows.append(
+            (
+                guests,
+                f"{mb:.1f}",
+                "former (str, 2x json)",
+                f"{baseline / 1000:.2f}",
+                f"{mb / baseline * 1e6:.0f}",
+                "1.00x",
+            )
+        )
+        for name in libraries:
+            json_codec.use(name)
+            elapsed = timeit(
+                lambda: ProxmoxCLIBaseBackend.result_analyze(body, b"", 0).data,
+                repeat=3,
+                number=number,
+            )
+            rows.append(
+                (
+                    guests,
+                    f"{mb:.1f}",
+                    f"single pass, {name}",
+                    f"{elapsed / 1000:.2f}",
+                    f"{mb / elapsed * 1e6:.0f}",
+                    f"{baseline / elapsed:.2f}x",
+                )
+            )
+    json_codec.use()
+    print_table(
+        "/cluster/resources decoding",
+        rows,
+        ("guests", "MB", "path", "ms", "MB/s", "speedup"),
+    )
+
+
+if __name__ == "__main__":
+    main()
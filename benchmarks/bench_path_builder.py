@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of the ProxmoxAPI path builder overhead.
+
+Every request goes through a null backend, so the numbers are the pure cost of
+building ``api.nodes(node).qemu(vm_id).status.current.get()`` and preparing
+the request parameters. The threaded run also counts requests that reached the
+backend with a wrong endpoint (interleaved builders sharing one client).
+
+    python benchmarks/bench_path_builder.py
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_common import print_table, register_null_backend, timeit
+
+from ext_api.proxmox_api import ProxmoxAPI
+
+THREADS = 8
+REQUESTS_PER_THREAD = 5_000
+COROUTINES = 1_000
+
+
+def bench_sync_single() -> float:
+    api = ProxmoxAPI(
+        backend_name="null", backend_type="sync", rate_limit=False, concurrency=False
+    )
+    return timeit(lambda: api.nodes("pve1").qemu(100).status.current.get())
+
+
+def bench_sync_threads() -> tuple[float, int]:
+    api = ProxmoxAPI(
+        backend_name="null", backend_type="sync", rate_limit=False, concurrency=False
+    )
+    api.backend.endpoints.clear()
+
+    def worker(index: int) -> int:
+        node = f"pve{index}"
+        failed = 0
+        for vm_id in range(REQUESTS_PER_THREAD):
+            try:
+                api.nodes(node).qemu(vm_id).status.current.get()
+            except Exception:
+                failed += 1
+        return failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        failed = sum(executor.map(worker, range(THREADS)))
+    duration = time.perf_counter() - start
+    total = THREADS * REQUESTS_PER_THREAD
+    endpoints = api.backend.endpoints
+    wrong = (
+        failed
+        + len(endpoints)
+        - sum(
+            1
+            for e in endpoints
+            if e
+            and e.startswith("nodes/pve")
+            and e.endswith("/status/current")
+            and e.count("/") == 5
+        )
+    )
+    return duration / total * 1e6, wrong
+
+
+def bench_async_gather() -> tuple[float, int]:
+    api = ProxmoxAPI(
+        backend_name="null", backend_type="async", rate_limit=False, concurrency=False
+    )
+
+    async def run():
+        api.backend.endpoints.clear()
+        coroutines = [
+            api.nodes(f"pve{i % 8}").qemu(i).status.current.get()
+            for i in range(COROUTINES)
+        ]
+        start = time.perf_counter()
+        await asyncio.gather(*coroutines)
+        return time.perf_counter() - start
+
+    duration = asyncio.run(run())
+    expected = {f"nodes/pve{i % 8}/qemu/{i}/status/current" for i in range(COROUTINES)}
+    wrong = sum(1 for e in api.backend.endpoints if e not in expected)
+    wrong += COROUTINES - len(set(api.backend.endpoints) & expected)
+    return duration / COROUTINES * 1e6, wrong
+
+
+def main():
+    register_null_backend()
+    single = bench_sync_single()
+    threaded, threaded_wrong = bench_sync_threads()
+    gathered, gathered_wrong = bench_async_gather()
+    print_table(
+        "ProxmoxAPI path builder overhead (null backend)",
+        [
+            ("sync, 1 thread", f"{single:.2f}", "-"),
+            (f"sync, {THREADS} threads / 1 client", f"{threaded:.2f}", threaded_wrong),
+            (f"async, gather {COROUTINES}", f"{gathered:.2f}", gathered_wrong),
+        ],
+        ("mode", "us/request", "wrong endpoints"),
+    )
+
+
+if __name__ == "__main__":
+    main()
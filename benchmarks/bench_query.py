@@ -0,0 +1,87 @@
+"""
+Filtering of a large ``/cluster/resources`` list: the former ``_filter_response``
+(dotted paths split per item, two lookups per key) versus the compiled query,
+and a selection written as a hand-made Python loop versus ``where``/``order_by``/``limit``.
+
+    python benchmarks/bench_query.py
+"""
+
+import json
+
+from bench_common import print_table, timeit
+from bench_json_decode import cluster_resources
+
+from ext_api.query import Query
+
+FILTER_KEYS = ["vmid", "name", "node", "status", "mem"]
+
+
+def former_nested_value(data, key_path):
+    for key in key_path.split("."):
+        if isinstance(data, dict):
+            data = data.get(key, None)
+        elif isinstance(data, list) and key.isdigit():
+            try:
+                data = data[int(key)]
+            except (ValueError, IndexError):
+                return None
+        else:
+            return None
+        if data is None:
+            return None
+    return data
+
+
+def former_filter(items, filter_keys):
+    return [
+        {
+            key: former_nested_value(item, key)
+            for key in filter_keys
+            if former_nested_value(item, key) is not None
+        }
+        for item in items
+    ]
+
+
+def loop_select(items):
+    selected = [
+        item
+        for item in items
+        if item.get("type") == "qemu" and item.get("status") == "running"
+    ]
+    selected.sort(key=lambda item: item.get("mem"), reverse=True)
+    return former_filter(selected[:10], FILTER_KEYS)
+
+
+def main():
+    rows = []
+    for guests in (1_000, 10_000):
+        items = json.loads(cluster_resources(guests))
+        number = max(1, 100_000 // guests)
+        cases = (
+            ("projection, former", lambda: former_filter(items, FILTER_KEYS)),
+            ("projection, compiled", lambda: Query(FILTER_KEYS).apply(items)),
+            ("top 10 running, hand loop", lambda: loop_select(items)),
+            (
+                "top 10 running, query",
+                lambda: Query(
+                    FILTER_KEYS,
+                    where={"type": "qemu", "status": "running"},
+                    order_by="-mem",
+                    limit=10,
+                ).apply(items),
+            ),
+        )
+        baseline = None
+        for name, func in cases:
+            elapsed = timeit(func, repeat=3, number=number)
+            if name.endswith(("former", "hand loop")):
+                baseline = elapsed
+            rows.append(
+                (guests, name, f"{elapsed / 1000:.2f}", f"{baseline / elapsed:.2f}x")
+            )
+    print_table("filter_keys and queries", rows, ("guests", "case", "ms", "speedup"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,46 @@
 import logging
+from contextlib import nullcontext
 from pathlib import Path
 import asyncio
 
 from cluster_tasks.configure_logging import config_logger
+from cluster_tasks.tasks.polling import PollingStats
 from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
 from config_loader.config import ConfigLoader, configuration
 from ext_api.backends.registry import register_backends
+from ext_api.concurrency import AsyncAdaptiveLimit
 from ext_api.proxmox_api import ProxmoxAPI
 from .loader_scene import ScenarioFactory
 
-
 logger = logging.getLogger(f"CT.{__name__}")
 
 MAX_CONCURRENCY = configuration.get("SCENARIOS.MAX_CONCURRENCY", 4)
-semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
 
 
-async def scenario_run(api, scenario_config, scenario_name: str = None):
-    async with semaphore:
+def scenario_limit(api: ProxmoxAPI) -> AsyncAdaptiveLimit:
+    """
+    Limit of concurrent scenarios, adapted to the requests of the API they use
+    when its adaptive concurrency is on, fixed at ``MAX_CONCURRENCY`` otherwise.
+    """
+    limit = AsyncAdaptiveLimit(
+        "scenarios",
+        initial=configuration.get("SCENARIOS.INITIAL_CONCURRENCY", MAX_CONCURRENCY),
+        max_limit=MAX_CONCURRENCY,
+        target_p95=configuration.get("API.CONCURRENCY_TARGET_P95", 2.0),
+        max_error_rate=configuration.get("API.CONCURRENCY_MAX_ERROR_RATE", 0.1),
+        window=configuration.get("API.CONCURRENCY_WINDOW", 20),
+    )
+    if api.concurrency is not None:
+        api.concurrency.followers.append(limit)
+    else:
+        limit.limit = MAX_CONCURRENCY
+    return limit
+
+
+async def scenario_run(
+    api, scenario_config, scenario_name: str = None, limit: AsyncAdaptiveLimit = None
+):
+    async with limit or nullcontext():
         node_tasks = ProxmoxTasksAsync(api=api)
         scenario_file = scenario_config.get("file")
         config = scenario_config.get("config")
@@ -46,16 +69,20 @@ async def main(cli_args=None, **kwargs):
     try:
         # Run through scenarios
         async with ext_api as api:
+            limit = scenario_limit(api)
             tasks = []
             for scenario_name, scenario_config in scenarios_config.get(
                 "Scenarios"
             ).items():
                 if concurrent:
-                    tasks.append(scenario_run(api, scenario_config, scenario_name))
+                    tasks.append(
+                        scenario_run(api, scenario_config, scenario_name, limit)
+                    )
                 else:
-                    await scenario_run(api, scenario_config, scenario_name)
+                    await scenario_run(api, scenario_config, scenario_name, limit)
             if concurrent:
                 await asyncio.gather(*tasks)
+            logger.info(PollingStats.for_api(api).report())
     except Exception as e:
         logger.error(f"Controller: {e}")
 
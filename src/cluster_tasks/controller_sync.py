@@ -1,12 +1,16 @@
 import logging
 import queue
 from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
 
 from cluster_tasks.configure_logging import config_logger
+from cluster_tasks.tasks.polling import PollingStats
 from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+from cluster_tasks.tasks.snapshot_cache import SnapshotCacheSync
 from config_loader.config import ConfigLoader, configuration
 from ext_api.backends.registry import register_backends
+from ext_api.concurrency import AdaptiveLimit
 from ext_api.proxmox_api import ProxmoxAPI
 from .loader_scene import ScenarioFactory
 
@@ -15,17 +19,50 @@ logger = logging.getLogger(f"CT.{__name__}")
 MAX_CONCURRENCY = configuration.get("SCENARIOS.MAX_CONCURRENCY", 4)
 
 
-def scenario_run_queue(api_queue, scenario_config, scenario_name: str = None):
-    api = api_queue.get()
-    try:
-        with api as api:
-            scenario_run(api, scenario_config, scenario_name)
-    finally:
-        api_queue.put(api)
+def scenario_limit(apis: list[ProxmoxAPI]) -> AdaptiveLimit:
+    """
+    Limit of concurrent scenarios, adapted to the requests of the APIs they use
+    when their adaptive concurrency is on, fixed at ``MAX_CONCURRENCY`` otherwise.
+    """
+    limit = AdaptiveLimit(
+        "scenarios",
+        initial=configuration.get("SCENARIOS.INITIAL_CONCURRENCY", MAX_CONCURRENCY),
+        max_limit=MAX_CONCURRENCY,
+        target_p95=configuration.get("API.CONCURRENCY_TARGET_P95", 2.0),
+        max_error_rate=configuration.get("API.CONCURRENCY_MAX_ERROR_RATE", 0.1),
+        window=configuration.get("API.CONCURRENCY_WINDOW", 20),
+    )
+    followed = [api.concurrency for api in apis if api.concurrency is not None]
+    for concurrency in followed:
+        concurrency.followers.append(limit)
+    if not followed:
+        limit.limit = MAX_CONCURRENCY
+    return limit
+
+
+def scenario_run_queue(
+    api_queue,
+    scenario_config,
+    scenario_name: str = None,
+    limit: AdaptiveLimit = None,
+    snapshot_cache: SnapshotCacheSync = None,
+):
+    with limit or nullcontext():
+        api = api_queue.get()
+        try:
+            with api as api:
+                scenario_run(api, scenario_config, scenario_name, snapshot_cache)
+        finally:
+            api_queue.put(api)
 
 
-def scenario_run(api, scenario_config, scenario_name: str = None):
-    node_tasks = ProxmoxTasksSync(api=api)
+def scenario_run(
+    api,
+    scenario_config,
+    scenario_name: str = None,
+    snapshot_cache: SnapshotCacheSync = None,
+):
+    node_tasks = ProxmoxTasksSync(api=api, snapshot_cache=snapshot_cache)
     scenario_file = scenario_config.get("file")
     config = scenario_config.get("config")
     # Create scenario instance using the factory
@@ -47,6 +84,7 @@ def main(cli_args=None, **kwargs):
     register_backends(backend_name)
     client_queue = queue.Queue()
     ext_api = None
+    clients = []
     if concurrent:
         max_threads = min(MAX_CONCURRENCY, len(scenarios_config.get("Scenarios")))
         clients = [
@@ -56,13 +94,21 @@ def main(cli_args=None, **kwargs):
         [client_queue.put(c) for c in clients]
     else:
         ext_api = ProxmoxAPI(backend_name=backend_name, backend_type="sync")
+        clients = [ext_api]
     try:
         if concurrent:
-            # Concurrent execution
-            with ThreadPoolExecutor() as executor:
+            # Concurrent execution, the clients of the threads share one snapshot
+            limit = scenario_limit(clients)
+            snapshot_cache = SnapshotCacheSync()
+            with ThreadPoolExecutor(max_workers=len(clients)) as executor:
                 tasks = [
                     executor.submit(
-                        scenario_run_queue, client_queue, scenario_config, scenario_name
+                        scenario_run_queue,
+                        client_queue,
+                        scenario_config,
+                        scenario_name,
+                        limit,
+                        snapshot_cache,
                     )
                     for scenario_name, scenario_config in scenarios_config.get(
                         "Scenarios"
@@ -76,6 +122,8 @@ def main(cli_args=None, **kwargs):
                     "Scenarios"
                 ).items():
                     scenario_run(api, scenario_config, scenario_name)
+        stats = sum((PollingStats.for_api(c) for c in clients), PollingStats())
+        logger.info(stats.report())
     except Exception as e:
         logger.error(f"Controller: {e}")
 
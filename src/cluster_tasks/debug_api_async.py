@@ -172,7 +172,7 @@ async def debug_low_level_get_node_status_parallel(api: ProxmoxAPI):
         )
         tasks.append(
             api._async_execute(
-                params=params,
+                request_params=params,
                 filter_keys=["kversion", "cpuinfo", "memory.total", "uptime"],
             )
         )
@@ -1,8 +1,10 @@
 import logging
 import asyncio
+from functools import partial
 from os.path import split
 
 from cluster_tasks.scenarios.scenario_base import ScenarioBase
+from cluster_tasks.scenarios.step_graph import ScenarioStep, StepGraph
 from cluster_tasks.tasks.proxmox_tasks_async import (
     ProxmoxTasksAsync,
 )  # Assuming there's an async version of NodeTasks
@@ -11,9 +13,23 @@ logger = logging.getLogger("CT.{__name__}")
 
 
 class ScenarioCloneTemplateVmBase(ScenarioBase):
+    # The VM is locked while it is cloned, reconfigured and migrated, the remaining
+    # steps are independent of each other once it is on its final node.
+    STEPS = (
+        ScenarioStep("check_existing_destination_vm"),
+        ScenarioStep("vm_clone", ("check_existing_destination_vm",)),
+        ScenarioStep("configure_network", ("vm_clone",)),
+        ScenarioStep("vm_migration", ("configure_network",)),
+        ScenarioStep("configure_tags", ("vm_migration",)),
+        ScenarioStep("vm_replication", ("vm_migration",)),
+        ScenarioStep("vm_ha_setup", ("vm_migration",)),
+        ScenarioStep("vm_pool_setup", ("vm_migration",)),
+    )
+
     def __init__(self, name: str = None):
         super().__init__(name=name)
         self.vm_network = None
+        self.vm_node = None
 
     def configure(self, config):
         """
@@ -61,6 +77,7 @@ class ScenarioCloneTemplateVmBase(ScenarioBase):
         """
         self.name = config.get("name")
         self.node = config.get("node")
+        self.vm_node = self.node
         self.destination_node = config.get("destination_node")
         self.source_vm_id = config.get("source_vm_id")
         self.destination_vm_id = config.get("destination_vm_id")
@@ -78,6 +95,41 @@ class ScenarioCloneTemplateVmBase(ScenarioBase):
         self.ha = config.get("ha")
         self.pool_id = config.get("pool_id")
 
+    def step_graph(self) -> StepGraph:
+        return StepGraph(self.STEPS, name=self.scenario_name)
+
+    def step_functions(self, graph: StepGraph, proxmox_tasks) -> dict:
+        """Bind the scenario methods of the graph steps to the tasks object."""
+        return {
+            name: partial(getattr(self, name), proxmox_tasks) for name in graph.steps
+        }
+
+    def replication_targets(self) -> dict[str, dict]:
+        """Replication job parameters by target node from the scenario config."""
+        targets = {}
+        for replication in self.replications or []:
+            target_node = replication.get("node")
+            if not target_node:
+                logger.warning(
+                    f"vm_replication vm {self.destination_vm_id}, node is not defined, skip"
+                )
+                continue
+            data = {}
+            schedule = replication.get("schedule")
+            comment = replication.get("comment")
+            disable = replication.get("disable")
+            rate = replication.get("rate")
+            if schedule:
+                data["schedule"] = schedule
+            if comment:
+                data["comment"] = comment
+            if rate:
+                data["rate"] = rate
+            if disable is not None:
+                data["disable"] = int(disable)
+            targets[target_node] = data
+        return targets
+
     def calculate_tags(self, tags: str) -> str:
         if self.vm_network:
             try:
@@ -41,29 +41,11 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
         logger.info(f"*** Running Scenario Template VM Clone: '{self.scenario_name}'")
         # Perform the specific API logic for this scenario
         try:
-            # Check if the VM already exists asynchronously
-            self.check_existing_destination_vm(proxmox_tasks)
-
-            # Clone the VM from the template asynchronously
-            self.vm_clone(proxmox_tasks)
-
-            # Configure Network
-            self.configure_network(proxmox_tasks)
-
-            # Configure Tags
-            self.configure_tags(proxmox_tasks)
-
-            # Migration VM
-            self.vm_migration(proxmox_tasks)
-
-            # Replication jobs for VM
-            self.vm_replication(proxmox_tasks)
-
-            # setup HA VM
-            self.vm_ha_setup(proxmox_tasks)
-
-            # setup pool for VM
-            self.vm_pool_setup(proxmox_tasks)
+            # Clone, network and migration run in order, then tags, replication,
+            # HA and pool setup run concurrently
+            graph = self.step_graph()
+            steps = self.step_functions(graph, proxmox_tasks)
+            graph.run_sync(steps)
 
             logger.info(f"*** Scenario '{self.scenario_name}' completed successfully")
             return True
@@ -72,10 +54,10 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
 
     @staticmethod
     def check_vm_is_exists_in_cluster(proxmox_tasks, vm_id) -> str | None:
-        resources = proxmox_tasks.get_resources(resource_type="qemu")
-        for resource in resources:
-            if resource.get("vmid") == vm_id:
-                return resource.get("node")
+        inventory = proxmox_tasks.get_inventory()
+        resource = inventory.get(vm_id) if inventory else None
+        if resource and resource.get("type") == "qemu":
+            return resource.get("node")
         return None
 
     def check_existing_destination_vm(self, proxmox_tasks):
@@ -83,6 +65,9 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
         online_nodes = proxmox_tasks.get_nodes(online=True)
         if self.destination_node not in online_nodes:
             raise Exception(f"Node:'{self.destination_node}' is offline")
+        # queue behind an open circuit for a while, fail fast if it stays open
+        if not proxmox_tasks.wait_node_available_sync(self.destination_node):
+            raise Exception(f"Node:'{self.destination_node}' is failing, circuit open")
         logger.info(f"Checking if VM {self.destination_vm_id} already exists")
         present_node = self.check_vm_is_exists_in_cluster(
             proxmox_tasks, self.destination_vm_id
@@ -132,6 +117,7 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
                 self.node, self.destination_vm_id, self.destination_node
             )
             if is_migrated:
+                self.vm_node = self.destination_node
                 logger.info(f"VM {self.destination_vm_id} migrated successfully")
             else:
                 raise Exception(f"Failed to migrate VM {self.destination_vm_id}")
@@ -157,7 +143,7 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
         tags = self.calculate_tags(self.tags)
         logger.info(f"Configuring tags for VM {self.destination_vm_id}")
         is_configured = proxmox_tasks.vm_config_tags_set(
-            self.node, self.destination_vm_id, tags
+            self.vm_node, self.destination_vm_id, tags
         )
         if is_configured:
             logger.info(
@@ -171,26 +157,9 @@ class ScenarioCloneTemplateVmSync(ScenarioCloneTemplateVmBase):
             return
         logger.info(f"Creating replication jobs for VM {self.destination_vm_id}")
         vm_id = self.destination_vm_id
-        for replication in self.replications:
-            target_node = replication.get("node")
-            if not target_node:
-                logger.warning(f"vm_replication vm {vm_id}, node is not defined, skip")
-                continue
-            data = {}
-            schedule = replication.get("schedule")
-            comment = replication.get("comment")
-            disable = replication.get("disable")
-            rate = replication.get("rate")
-            if schedule:
-                data["schedule"] = schedule
-            if comment:
-                data["comment"] = comment
-            if rate:
-                data["rate"] = rate
-            if disable is not None:
-                data["disable"] = int(disable)
-
-            result = proxmox_tasks.create_replication_job(vm_id, target_node, data=data)
+        targets = self.replication_targets()
+        results = proxmox_tasks.create_replication_jobs(vm_id, targets)
+        for target_node, result in results.items():
             logger.info(
                 f"Created replication job VM {vm_id} for node '{target_node}' with result: {result}"
             )
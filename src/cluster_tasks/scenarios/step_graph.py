@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable
+
+logger = logging.getLogger("CT.{__name__}")
+
+
+@dataclass(frozen=True)
+class ScenarioStep:
+    """
+    A step of a scenario and the steps that must finish before it starts.
+
+    Attributes:
+        name (str): Name of the scenario method that implements the step.
+        depends_on (tuple[str, ...]): Names of the steps it depends on.
+    """
+
+    name: str
+    depends_on: tuple[str, ...] = ()
+
+
+@dataclass
+class StepTiming:
+    name: str
+    started: datetime
+    finished: datetime | None = None
+    error: BaseException | None = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.finished or datetime.now()) - self.started).total_seconds()
+
+
+class StepGraph:
+    """
+    Dependency graph of scenario steps.
+
+    The executors start every step as soon as all its dependencies finished, so
+    independent steps run concurrently. When a step fails no new steps are
+    started, the running ones are awaited and the first error is raised.
+    Start and end times of every step are logged and kept in ``timings``.
+    """
+
+    def __init__(self, steps: Iterable[ScenarioStep], name: str = None):
+        self.steps: dict[str, ScenarioStep] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate scenario step: {step.name}")
+            self.steps[step.name] = step
+        self.name = name or "scenario"
+        self.timings: list[StepTiming] = []
+        self._validate()
+
+    def _validate(self):
+        for step in self.steps.values():
+            unknown = set(step.depends_on) - set(self.steps)
+            if unknown:
+                raise ValueError(
+                    f"Step '{step.name}' depends on unknown steps: {sorted(unknown)}"
+                )
+        done = set()
+        remaining = dict(self.steps)
+        while remaining:
+            ready = [n for n, s in remaining.items() if set(s.depends_on) <= done]
+            if not ready:
+                raise ValueError(f"Cycle in scenario steps: {sorted(remaining)}")
+            for name in ready:
+                done.add(name)
+                del remaining[name]
+
+    def _waiting(self) -> dict[str, set[str]]:
+        return {name: set(step.depends_on) for name, step in self.steps.items()}
+
+    @staticmethod
+    def _ready(waiting: dict[str, set[str]]) -> list[str]:
+        ready = [name for name, depends in waiting.items() if not depends]
+        for name in ready:
+            del waiting[name]
+        return ready
+
+    @staticmethod
+    def _finished(waiting: dict[str, set[str]], name: str):
+        for depends in waiting.values():
+            depends.discard(name)
+
+    def _start(self, name: str) -> StepTiming:
+        timing = StepTiming(name=name, started=datetime.now())
+        self.timings.append(timing)
+        logger.info(
+            f"[{self.name}] step '{name}' started at {timing.started:%H:%M:%S.%f}"
+        )
+        return timing
+
+    def _end(self, timing: StepTiming, error: BaseException | None = None):
+        timing.finished = datetime.now()
+        timing.error = error
+        logger.info(
+            f"[{self.name}] step '{timing.name}' {'failed' if error else 'finished'} "
+            f"at {timing.finished:%H:%M:%S.%f} ({timing.duration:.3f}s)"
+        )
+
+    async def run_async(self, steps: dict[str, Callable[[], Awaitable]]):
+        """Run coroutine functions keyed by step name with maximum parallelism."""
+
+        async def run_step(name: str):
+            timing = self._start(name)
+            try:
+                await steps[name]()
+            except BaseException as e:
+                self._end(timing, e)
+                raise
+            self._end(timing)
+
+        self.timings = []
+        waiting = self._waiting()
+        running: dict[asyncio.Task, str] = {}
+        error = None
+        try:
+            while waiting or running:
+                if error is None:
+                    for name in self._ready(waiting):
+                        running[asyncio.create_task(run_step(name))] = name
+                elif not running:
+                    break
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    else:
+                        self._finished(waiting, name)
+        except asyncio.CancelledError:
+            for task in running:
+                task.cancel()
+            raise
+        if error is not None:
+            raise error
+
+    def run_sync(self, steps: dict[str, Callable[[], object]], max_workers: int = 4):
+        """Run functions keyed by step name, independent steps in worker threads."""
+
+        def run_step(name: str):
+            timing = self._start(name)
+            try:
+                steps[name]()
+            except BaseException as e:
+                self._end(timing, e)
+                raise
+            self._end(timing)
+
+        self.timings = []
+        waiting = self._waiting()
+        running: dict[Future, str] = {}
+        error = None
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="scenario-step"
+        ) as executor:
+            while waiting or running:
+                if error is None:
+                    for name in self._ready(waiting):
+                        running[executor.submit(run_step, name)] = name
+                elif not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    else:
+                        self._finished(waiting, name)
+        if error is not None:
+            raise error
@@ -1,4 +1,6 @@
 from datetime import timedelta
+
+from cluster_tasks.tasks.polling import PollingPolicies
 from ext_api.proxmox_api import ProxmoxAPI
 
 
@@ -10,7 +12,9 @@ class BaseTasks:
 
     Attributes:
         timeout (int): The default timeout in seconds for tasks.
-        loop_sleep (int): The default sleep duration between task loops in seconds.
+        polling_interval (int): The fixed polling interval in seconds.
+        polling_policies (PollingPolicies): Backoff policies per task type used
+            while waiting for tasks.
         _api (ProxmoxAPI): The Proxmox API instance used for interacting with Proxmox.
     """
 
@@ -22,6 +26,7 @@ class BaseTasks:
         api: ProxmoxAPI,
         timeout: int = timeout,
         polling_interval: int = polling_interval,
+        polling_policies: PollingPolicies = None,
     ):
         """
         Initializes the BaseTasks class with the given Proxmox API instance and optional
@@ -30,11 +35,14 @@ class BaseTasks:
         Args:
             api (ProxmoxAPI): The Proxmox API instance for making API calls.
             timeout (int, optional): The timeout value for tasks (default is 60).
-            polling_interval (int, optional): The sleep time between loops in seconds (default is 2).
+            polling_interval (int, optional): The fixed polling interval in seconds (default is 2).
+            polling_policies (PollingPolicies, optional): Backoff policies per task type,
+                loaded from the ``[POLLING]`` config section by default.
         """
         self._api: ProxmoxAPI = api
         self.timeout = timeout
         self.polling_interval = polling_interval
+        self.polling_policies = polling_policies or PollingPolicies.from_config()
 
     @property
     def api(self):
@@ -68,3 +76,36 @@ class BaseTasks:
             str: The formatted duration as HH:MM:SS.
         """
         return str(timedelta(seconds=seconds)).split(".")[0]
+
+    @staticmethod
+    def decode_upid(upid: str) -> dict:
+        """
+        Decodes the sections of a UPID into separate fields
+        https://github.com/proxmoxer/proxmoxer/blob/develop/proxmoxer/tools/tasks.py
+
+        :param upid: a UPID string
+        :type upid: str
+        :return: The decoded information from the UPID
+        :rtype: dict
+        """
+        segments = upid.split(":")
+        if segments[0] != "UPID" or len(segments) != 9:
+            raise ValueError("UPID is not in the correct format")
+
+        data = {
+            "upid": upid,
+            "node": segments[1],
+            "pid": int(segments[2], 16),
+            "pstart": int(segments[3], 16),
+            "starttime": int(segments[4], 16),
+            "type": segments[5],
+            "id": segments[6],
+            "user": segments[7].split("!")[0],
+            "comment": segments[8],
+        }
+        return data
+
+    @staticmethod
+    def shorten_upid(upid: str, start: int = 0, length: int = 7) -> str | None:
+        if upid:
+            return ":".join(upid.split(":")[start:length])
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from typing import Iterable
+
+
+class Inventory:
+    """
+    In-memory view of one ``/cluster/resources`` response with hash indexes.
+
+    The response is walked once to build the indexes, every lookup after that is
+    a dictionary access instead of a scan of the resources list. The inventory
+    is a snapshot: it is never updated, a new one is built from the next response.
+
+    Indexes:
+        - vmid: guests (``qemu`` and ``lxc``) by VM ID.
+        - node: guests by the node they are placed on.
+        - name: guests by name, names are not unique in a cluster.
+        - tag: guests by each of their tags.
+        - pool: guests by pool.
+        - type: all resources by type (``qemu``, ``lxc``, ``node``, ``storage``, ...).
+    """
+
+    GUEST_TYPES = ("qemu", "lxc")
+
+    __slots__ = ("resources", "_vmid", "_node", "_name", "_tag", "_pool", "_type")
+
+    def __init__(self, resources: Iterable[dict] | None = None):
+        self.resources: list[dict] = list(resources or [])
+        self._vmid: dict[int, dict] = {}
+        self._node: dict[str, list[dict]] = defaultdict(list)
+        self._name: dict[str, list[dict]] = defaultdict(list)
+        self._tag: dict[str, list[dict]] = defaultdict(list)
+        self._pool: dict[str, list[dict]] = defaultdict(list)
+        self._type: dict[str, list[dict]] = defaultdict(list)
+        for resource in self.resources:
+            resource_type = resource.get("type")
+            self._type[resource_type].append(resource)
+            if resource_type not in self.GUEST_TYPES:
+                continue
+            vm_id = resource.get("vmid")
+            if vm_id is not None:
+                self._vmid[int(vm_id)] = resource
+            if node := resource.get("node"):
+                self._node[node].append(resource)
+            if name := resource.get("name"):
+                self._name[name].append(resource)
+            if pool := resource.get("pool"):
+                self._pool[pool].append(resource)
+            for tag in self.split_tags(resource.get("tags")):
+                self._tag[tag].append(resource)
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def __contains__(self, vm_id) -> bool:
+        return self.get(vm_id) is not None
+
+    @staticmethod
+    def split_tags(tags: str | None) -> list[str]:
+        """Proxmox returns tags as one string separated by ``;`` (older versions ``,``)."""
+        if not tags:
+            return []
+        return [tag for tag in tags.replace(",", ";").split(";") if tag]
+
+    def get(self, vm_id: int | str) -> dict | None:
+        """Return the guest resource of a VM ID, ``None`` if it is not in the cluster."""
+        try:
+            return self._vmid.get(int(vm_id))
+        except (TypeError, ValueError):
+            return None
+
+    def node_of(self, vm_id: int | str) -> str | None:
+        """Return the node the guest is placed on, ``None`` if it is not in the cluster."""
+        resource = self.get(vm_id)
+        return resource.get("node") if resource else None
+
+    def on_node(self, node: str) -> list[dict]:
+        return self._node.get(node, [])
+
+    def by_name(self, name: str) -> list[dict]:
+        return self._name.get(name, [])
+
+    def by_tag(self, tag: str) -> list[dict]:
+        return self._tag.get(tag, [])
+
+    def in_pool(self, pool_id: str) -> list[dict]:
+        return self._pool.get(pool_id, [])
+
+    def of_type(self, resource_type: str) -> list[dict]:
+        return self._type.get(resource_type, [])
+
+    def nodes(self, online: bool = True) -> list[str]:
+        """Names of the ``node`` resources, only online ones by default."""
+        return sorted(
+            r.get("node")
+            for r in self.of_type("node")
+            if not online or r.get("status") == "online"
+        )
@@ -0,0 +1,184 @@
+import logging
+import random
+import threading
+import weakref
+from dataclasses import dataclass, field, fields
+
+from config_loader.config import configuration
+
+logger = logging.getLogger("CT.{__name__}")
+
+
+@dataclass(frozen=True)
+class PollingPolicy:
+    """
+    Exponential backoff with jitter and a ceiling.
+
+    The n-th check (starting at 0) waits ``initial * factor ** n`` seconds,
+    capped at ``max_interval`` and spread by +/- ``jitter`` (a fraction).
+
+    Attributes:
+        initial (float): Delay before the first check in seconds.
+        factor (float): Growth factor applied after every check.
+        max_interval (float): Ceiling of the delay in seconds.
+        jitter (float): Random spread of the delay, 0.1 means +/- 10%.
+    """
+
+    initial: float = 0.5
+    factor: float = 1.5
+    max_interval: float = 10
+    jitter: float = 0.1
+
+    def interval(self, attempt: int) -> float:
+        delay = min(self.initial * self.factor**attempt, self.max_interval)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0.0)
+
+    @classmethod
+    def from_dict(cls, values: dict, base: "PollingPolicy" = None) -> "PollingPolicy":
+        """Build a policy from a config section, missing keys are taken from ``base``."""
+        base = base or cls()
+        params = {
+            f.name: float(values.get(f.name.upper(), getattr(base, f.name)))
+            for f in fields(cls)
+        }
+        return cls(**params)
+
+
+class PollingPolicies:
+    """
+    Polling policies keyed by task type (the ``type`` field of ``decode_upid``).
+
+    Types without an own policy use the default one. Waits that are not tied to
+    a UPID use a pseudo type, e.g. ``replication`` for ``wait_empty_replications``.
+    """
+
+    DEFAULT_POLICIES = {
+        # config changes and start/stop usually finish in milliseconds
+        "qmconfig": PollingPolicy(initial=0.1, factor=2, max_interval=2),
+        "vzconfig": PollingPolicy(initial=0.1, factor=2, max_interval=2),
+        "qmstart": PollingPolicy(initial=0.25, factor=2, max_interval=5),
+        "qmstop": PollingPolicy(initial=0.25, factor=2, max_interval=5),
+        "qmshutdown": PollingPolicy(initial=0.5, factor=2, max_interval=5),
+        # disk copies take minutes
+        "qmclone": PollingPolicy(initial=1, factor=1.5, max_interval=15),
+        "qmmigrate": PollingPolicy(initial=1, factor=1.5, max_interval=15),
+        "qmdestroy": PollingPolicy(initial=0.5, factor=1.5, max_interval=10),
+        "replication": PollingPolicy(initial=0.5, factor=1.5, max_interval=10),
+    }
+
+    def __init__(
+        self,
+        default: PollingPolicy = None,
+        policies: dict[str, PollingPolicy] = None,
+    ):
+        self.default = default or PollingPolicy()
+        self.policies = dict(self.DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+
+    def get(self, task_type: str | None) -> PollingPolicy:
+        return self.policies.get(task_type, self.default)
+
+    @classmethod
+    def from_config(cls, config: dict | None = None) -> "PollingPolicies":
+        """
+        Load policies from the ``[POLLING]`` section of ``config.toml``::
+
+            [POLLING]
+            INITIAL = 0.5
+            MAX_INTERVAL = 10
+
+            [POLLING.TYPES.qmclone]
+            INITIAL = 2
+        """
+        if config is None:
+            config = configuration.get("POLLING", {})
+        default = PollingPolicy.from_dict(config)
+        policies = {
+            task_type: PollingPolicy.from_dict(
+                values, cls.DEFAULT_POLICIES.get(task_type, default)
+            )
+            for task_type, values in config.get("TYPES", {}).items()
+        }
+        return cls(default=default, policies=policies)
+
+
+@dataclass
+class PollingStats:
+    """
+    Counters of the polling done by one API session.
+
+    The detection delay is the time between the end of a task and the poll that
+    noticed it. It is known only for waits that learn the end time of the task
+    (``endtime`` of ``/cluster/tasks``, whole seconds), other waits count in
+    ``waits`` and ``requests`` only.
+    """
+
+    waits: int = 0
+    requests: int = 0
+    waited: float = 0.0
+    detected: int = 0
+    detection_delay: float = 0.0
+    max_detection_delay: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+    _sessions = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_api(cls, api) -> "PollingStats":
+        """Return the stats of the API session, creating them on first use."""
+        stats = cls._sessions.get(api)
+        if stats is None:
+            stats = cls._sessions[api] = cls()
+        return stats
+
+    def add_requests(self, count: int = 1):
+        with self._lock:
+            self.requests += count
+
+    def add_wait(self, duration: float, detection_delay: float | None = None):
+        """Record a finished wait, with its detection delay when the task end time is known."""
+        with self._lock:
+            self.waits += 1
+            self.waited += duration
+            if detection_delay is not None:
+                detection_delay = max(detection_delay, 0.0)
+                self.detected += 1
+                self.detection_delay += detection_delay
+                self.max_detection_delay = max(
+                    self.max_detection_delay, detection_delay
+                )
+
+    @property
+    def requests_per_wait(self) -> float:
+        return self.requests / self.waits if self.waits else 0.0
+
+    @property
+    def mean_detection_delay(self) -> float | None:
+        return self.detection_delay / self.detected if self.detected else None
+
+    def __add__(self, other: "PollingStats") -> "PollingStats":
+        return PollingStats(
+            waits=self.waits + other.waits,
+            requests=self.requests + other.requests,
+            waited=self.waited + other.waited,
+            detected=self.detected + other.detected,
+            detection_delay=self.detection_delay + other.detection_delay,
+            max_detection_delay=max(
+                self.max_detection_delay, other.max_detection_delay
+            ),
+        )
+
+    def report(self) -> str:
+        report = (
+            f"Polling: {self.waits} waits, {self.requests} status requests "
+            f"({self.requests_per_wait:.1f} per wait), waited {self.waited:.1f}s"
+        )
+        if self.detected:
+            report += (
+                f", detection delay mean {self.mean_detection_delay:.1f}s "
+                f"max {self.max_detection_delay:.1f}s ({self.detected} tasks)"
+            )
+        return report
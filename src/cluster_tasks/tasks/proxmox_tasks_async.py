@@ -5,6 +5,7 @@ import time
 import urllib
 from tokenize import group
 
+from cluster_tasks.tasks.inventory import Inventory
 from cluster_tasks.tasks.proxmox_tasks_base import ProxmoxTasksBase
 
 logger = logging.getLogger("CT.{__name__}")
@@ -79,8 +80,11 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         if force_stop:
             await self.vm_status_set(vm_id, node, "stop", wait=True)
         upid = await self.api.nodes(node).qemu(vm_id).delete()
+        self.snapshot_cache_async.invalidate_resources()
         if wait:
-            return await self.wait_task_done_async(upid, node)
+            result = await self.wait_task_done_async(upid, node)
+            self.snapshot_cache_async.invalidate_resources()
+            return result
         return upid
 
     async def vm_clone(
@@ -101,8 +105,11 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
                                `False` if task timed out.
         """
         upid = await self.api.nodes(node).qemu(vm_id).clone.create(data=data)
+        self.snapshot_cache_async.invalidate_resources()
         if wait:
-            return await self.wait_task_done_async(upid, node)
+            result = await self.wait_task_done_async(upid, node)
+            self.snapshot_cache_async.invalidate_resources()
+            return result
         return upid
 
     async def vm_config_get(
@@ -191,28 +198,53 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
             data = {}
         data["target"] = target_node
         upid = await self.api.nodes(node).qemu(vm_id).migrate.create(data=data)
+        self.snapshot_cache_async.invalidate_resources()
         if wait:
-            return await self.wait_task_done_async(upid, node)
+            result = await self.wait_task_done_async(upid, node)
+            self.snapshot_cache_async.invalidate_resources()
+            return result
         return upid
 
     async def get_nodes(
-        self, online: bool = True, with_status: bool = False
+        self, online: bool = True, with_status: bool = False, cached: bool = True
     ) -> list[str] | list[dict]:
-        nodes = await self.api.nodes.get(filter_keys=["node", "status"])
-        result = []
-        if nodes:
-            if online:
-                result = sorted(
-                    [n.get("node") for n in nodes if n.get("status") == "online"]
-                )
-            else:
-                if with_status:
-                    return nodes
-                else:
-                    result = sorted([n.get("node") for n in nodes])
-        return result
+        """
+        Returns the cluster nodes, online ones by default.
+
+        Taken from the node resources of the session inventory unless ``cached``
+        is False, placement checks don't need a ``/nodes`` request of their own.
+        """
+        if cached:
+            inventory = await self.get_inventory()
+            nodes = inventory.of_type("node") if inventory else None
+        else:
+            nodes = await self.api.nodes.get(filter_keys=["node", "status"])
+        return self.filter_nodes(nodes, online, with_status)
+
+    async def get_inventory(self, cached: bool = True) -> Inventory | None:
+        """
+        Returns the indexed ``/cluster/resources`` snapshot, ``None`` if the request failed.
 
-    async def get_resources(self, resource_type: str) -> list[dict]:
+        Served from the session snapshot cache unless ``cached`` is False.
+        """
+        if cached:
+            return await self.snapshot_cache_async.inventory(self.api)
+        resources = await self.api.cluster.resources.get()
+        return None if resources is None else Inventory(resources)
+
+    async def get_resources(
+        self, resource_type: str, cached: bool = True
+    ) -> list[dict]:
+        """
+        Returns the cluster resources of one type (``qemu``, ``node``, ``storage`` ...).
+
+        The cached snapshot holds all types, so a single ``/cluster/resources``
+        download serves every type until it expires or a VM is cloned, deleted
+        or migrated. With ``cached=False`` the type is filtered by the server.
+        """
+        if cached:
+            inventory = await self.get_inventory()
+            return inventory.of_type(resource_type) if inventory else []
         request_type_map = {
             "qemu": "vm",
             "node": "node",
@@ -223,23 +255,14 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         # prepare params by filter in request
         if resource_type in request_type_map:
             params = {"type": request_type_map[resource_type]}
-        resources = await self.api.cluster.resources.get(params=params)
-        result = []
-        for resource in resources:
-            if resource.get("type") == resource_type:
-                result.append(resource)
-        return result
+        resources = await self.api.cluster.resources.get(
+            params=params, where={"type": resource_type}
+        )
+        return resources or []
 
     async def get_replication_jobs(self, filter_keys: dict = None) -> list[dict]:
-        jobs = await self.api.cluster.replication.get()
-        if filter_keys:
-            result = []
-            for job in jobs:
-                for key, value in filter_keys.items():
-                    if job.get(key) == value:
-                        result.append(job)
-            return result
-        return jobs
+        jobs = await self.api.cluster.replication.get(where=filter_keys)
+        return jobs or []
 
     async def create_replication_job(
         self,
@@ -247,26 +270,47 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         target_node: str,
         data: dict = None,
     ):
-        data_job = data.copy() if data is not None else {}
-        # calculate job id
+        results = await self.create_replication_jobs(vm_id, {target_node: data})
+        return results[target_node]
+
+    async def create_replication_jobs(
+        self,
+        vm_id: int,
+        targets: dict[str, dict | None],
+        max_concurrency: int = None,
+    ) -> dict[str, bool]:
+        """
+        Creates replication jobs of a VM to several target nodes.
+
+        The job list is fetched once and the job IDs are assigned locally, then
+        the jobs are created concurrently, at most ``max_concurrency`` at once.
+
+        Args:
+            vm_id (int): The ID of the virtual machine.
+            targets (dict): Job parameters (schedule, rate, ...) by target node.
+            max_concurrency (int, optional): Limit of concurrent create requests,
+                ``replication_concurrency`` by default.
+
+        Returns:
+            dict[str, bool]: Result by target node, ``False`` if the target already
+            had a job or the request failed.
+        """
+        if not targets:
+            return {}
         jobs = await self.get_replication_jobs(filter_keys={"guest": vm_id})
-        max_job_num = 0
-        for job in jobs:
-            if job.get("target") == target_node:
-                logger.debug(
-                    f"Replication already present for VM '{vm_id}' for '{target_node}', skip"
+        planned, skipped = self.plan_replication_jobs(vm_id, jobs, targets)
+        semaphore = asyncio.Semaphore(max_concurrency or self.replication_concurrency)
+
+        async def create(data_job: dict) -> bool:
+            async with semaphore:
+                result = await self.api.cluster.replication.create(
+                    data=data_job, filter_keys="_raw_"
                 )
-                return False
-            max_job_num = max(max_job_num, int(job.get("jobnum", 0)))
-        job_id = max_job_num + 1 if len(jobs) else 0
-        data_job["id"] = f"{vm_id}-{job_id}"
-        data_job["target"] = target_node
-        data_job["type"] = "local"
-        result = await self.api.cluster.replication.create(
-            data=data_job, filter_keys="_raw_"
-        )
-        # logger.debug(f"finished {result}")
-        return result.get("success")
+            return bool(result and result.get("success"))
+
+        created = await asyncio.gather(*(create(d) for d in planned.values()))
+        results = dict.fromkeys(skipped, False) | dict(zip(planned, created))
+        return {target_node: results[target_node] for target_node in targets}
 
     async def remove_replication_job(
         self,
@@ -312,20 +356,27 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         """
         Asynchronously waits for a replication remove to complete.
         """
+        policy = self.polling_policies.get("replication")
+        attempt = 0
         start_time = time.time()
-        while await self.is_created_replication_job(vm_id, target_node):
+        while True:
+            self.polling_stats.add_requests()
+            if not await self.is_created_replication_job(vm_id, target_node):
+                break
             duration = time.time() - start_time
             formatted_duration = self.format_duration(duration)
             formatted_timeout = self.format_duration(self.timeout)
             logger.info(
                 f"Waiting for replication job ({vm_id} to {target_node or 'any'}) is removed... [ {formatted_duration} / {formatted_timeout} ]"
             )
-            await asyncio.sleep(self.polling_interval)
+            await asyncio.sleep(policy.interval(attempt))
+            attempt += 1
             if time.time() - start_time > self.timeout:
                 logger.warning(
                     f"Timeout reached while waiting for replication job is removed. ({vm_id} to {target_node or 'any'}) ..."
                 )
                 break
+        self.polling_stats.add_wait(time.time() - start_time)
         return False
 
     async def ha_groups_get(self):
@@ -457,19 +508,32 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         result = await self.api.pools.get(params=params, filter_keys=filter_keys)
         return result
 
+    async def get_pool_members(self, pool_id: str) -> tuple[set, bool]:
+        """
+        Returns the VM IDs of a pool and whether the pool exists.
+
+        Members are taken from the pool index of the session inventory, ``/pools``
+        is requested only for a pool without guests there, it may not exist.
+        """
+        inventory = await self.get_inventory()
+        if inventory is not None:
+            members = {r.get("vmid") for r in inventory.in_pool(pool_id)}
+            if members:
+                return members, True
+        pools = await self.get_pools(pool_id=pool_id)
+        return self.extract_pool_members(pools, pool_id), bool(pools)
+
     async def create_pool_member(
         self, pool_id, vm_id=None, overwrite: bool = False, data: dict = None
     ) -> bool:
-        get_pools = await self.get_pools(pool_id=pool_id)
-        # print(get_pools)
-        if get_pools:
-            members_vms = self.extract_pool_members(get_pools, pool_id)
+        members_vms, pool_exists = await self.get_pool_members(pool_id)
+        if pool_exists:
             vm_exist = vm_id in members_vms if vm_id else True
             if vm_exist and not overwrite:
                 return True
         data = data.copy() if data is not None else {}
         data["poolid"] = pool_id
-        if not get_pools:
+        if not pool_exists:
             logger.info(f"Creating pool '{pool_id}' ...")
             result = await self.api.pools.post(data=data, filter_keys="_raw_")
             # print(result, data)
@@ -481,6 +545,7 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
             data["allow-move"] = 1
             logger.info(f"Update pool '{pool_id}' members with VM '{vm_id}' ...")
             result = await self.api.pools.put(data=data, filter_keys="_raw_")
+            self.snapshot_cache_async.invalidate_resources()
             return result.get("success") if result else False
         return created
 
@@ -488,14 +553,14 @@ class ProxmoxTasksAsync(ProxmoxTasksBase):
         if not pool_id or not vm_id:
             logger.debug(f"Deleting pool requires pool_id and vm_id. Skipping ...")
             return False
-        pools = await self.get_pools(pool_id=pool_id)
-        if not pools:
+        members_vms, pool_exists = await self.get_pool_members(pool_id)
+        if not pool_exists:
             return True
-        members_vms = self.extract_pool_members(pools, pool_id)
         vm_exist = vm_id in members_vms if vm_id else False
         if vm_exist:
             logger.info(f"Deleting pool '{pool_id}' member '{vm_id}' ...")
             data = {"poolid": pool_id, "vms": vm_id, "delete": 1}
             result = await self.api.pools.put(data=data, filter_keys="_raw_")
+            self.snapshot_cache_async.invalidate_resources()
             return result.get("success") if result else False
         return True
@@ -3,6 +3,11 @@ import logging
 import time
 
 from cluster_tasks.tasks.base_tasks import BaseTasks
+from cluster_tasks.tasks.polling import PollingStats
+from cluster_tasks.tasks.snapshot_cache import SnapshotCacheAsync, SnapshotCacheSync
+from cluster_tasks.tasks.task_watcher import TaskWatcherAsync, TaskWatcherSync
+from ext_api.circuit_breaker import CircuitBreaker
+from ext_api.rate_limit import Priority
 
 logger = logging.getLogger("CT.{__name__}")
 
@@ -11,20 +16,48 @@ class ProxmoxTasksBase(BaseTasks):
     """
     Base class with shared logic for both sync and async task handling.
     Contains methods for both sync and async API calls.
+
+    Attributes:
+        replication_concurrency (int): Default limit of replication jobs created at once.
+
     Methods:
         get_status_sync(node: str, upid: str) -> str | None:
             Retrieves the status of a task by its UPID.
 
         wait_task_done_sync(node: str, upid: str) -> bool:
-            Waits for a task to complete, checking the status periodically.
+            Waits for a task to complete using the session task watcher.
 
         get_status_async(node: str, upid: str) -> str | None:
             Retrieves the status of a task by its UPID.
 
         wait_task_done_async(node: str, upid: str) -> bool:
-            Waits for a task to complete, checking the status periodically.
+            Waits for a task to complete using the session task watcher.
+
+        node_circuit_state(node: str) -> str:
+            State of the circuit breaker of a node, or of the node of a UPID.
+
+        wait_node_available_sync(node: str, timeout: float) -> bool:
+        wait_node_available_async(node: str, timeout: float) -> bool:
+            Wait while the circuit of a node is open.
     """
 
+    replication_concurrency = 4
+
+    def __init__(
+        self,
+        *args,
+        snapshot_cache: SnapshotCacheSync | SnapshotCacheAsync = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            snapshot_cache (SnapshotCacheSync | SnapshotCacheAsync, optional): Cluster
+                snapshots shared with the tasks of other API sessions, the cache of
+                this API session by default.
+        """
+        super().__init__(*args, **kwargs)
+        self._snapshot_cache = snapshot_cache
+
     def get_status_sync(self, upid: str, node: str = None) -> str | None:
         """
         Retrieve the status of a task synchronously by its UPID (Unique Process ID).
@@ -53,7 +86,11 @@ class ProxmoxTasksBase(BaseTasks):
         if not node:
             node = self.decode_upid(upid).get("node")
         if upid and node:
-            result = self.api.nodes(node).tasks(upid).status.get(filter_keys="status")
+            result = (
+                self.api.nodes(node)
+                .tasks(upid)
+                .status.get(filter_keys="status", priority=Priority.BACKGROUND)
+            )
             return result
 
     async def get_status_async(self, upid: str, node: str = None) -> str | None:
@@ -85,96 +122,178 @@ class ProxmoxTasksBase(BaseTasks):
             node = self.decode_upid(upid).get("node")
         if upid and node:
             result = (
-                await self.api.nodes(node).tasks(upid).status.get(filter_keys="status")
+                await self.api.nodes(node)
+                .tasks(upid)
+                .status.get(filter_keys="status", priority=Priority.BACKGROUND)
             )
             return result
 
+    @property
+    def task_watcher_sync(self) -> TaskWatcherSync:
+        """The task watcher shared by all sync waiters of this API session."""
+        return TaskWatcherSync.for_api(
+            self.api,
+            polling_interval=self.polling_interval,
+            timeout=self.timeout,
+            polling_policies=self.polling_policies,
+        )
+
+    @property
+    def task_watcher_async(self) -> TaskWatcherAsync:
+        """The task watcher shared by all async waiters of this API session."""
+        return TaskWatcherAsync.for_api(
+            self.api,
+            polling_interval=self.polling_interval,
+            timeout=self.timeout,
+            polling_policies=self.polling_policies,
+        )
+
+    @property
+    def snapshot_cache_sync(self) -> SnapshotCacheSync:
+        """Cluster snapshots shared by all sync scenarios of this API session."""
+        if self._snapshot_cache is not None:
+            return self._snapshot_cache
+        return SnapshotCacheSync.for_api(self.api)
+
+    @property
+    def snapshot_cache_async(self) -> SnapshotCacheAsync:
+        """Cluster snapshots shared by all async scenarios of this API session."""
+        if self._snapshot_cache is not None:
+            return self._snapshot_cache
+        return SnapshotCacheAsync.for_api(self.api)
+
+    @property
+    def polling_stats(self) -> PollingStats:
+        """Polling counters of this API session."""
+        return PollingStats.for_api(self.api)
+
     def wait_task_done_sync(self, upid: str, node: str = None) -> bool:
         """
         Synchronously waits for a task to complete.
+
+        The wait is served by the session task watcher, which resolves all
+        outstanding tasks of the session from a single poll per interval.
         """
-        start_time = time.time()
-        while (result := self.get_status_sync(upid, node)) is not None:
-            if result == "stopped":
-                return True
-            duration = time.time() - start_time
-            formatted_duration = self.format_duration(duration)
-            formatted_timeout = self.format_duration(self.timeout)
-            formated_upid = self.shorten_upid(upid, 1, 7)
-            logger.info(
-                f"Waiting for task ({formated_upid}) to finish... [ {formatted_duration} / {formatted_timeout} ]"
-            )
-            time.sleep(self.polling_interval)
-            if time.time() - start_time > self.timeout:
-                logger.warning(
-                    f"Timeout reached while waiting for task to finish. {self.shorten_upid(upid)}..."
-                )
-                break
-        return False
+        if not upid:
+            return False
+        return self.task_watcher_sync.wait(upid, node, timeout=self.timeout)
 
     async def wait_task_done_async(self, upid: str, node: str = None) -> bool:
         """
         Asynchronously waits for a task to complete.
+
+        The wait is served by the session task watcher, which resolves all
+        outstanding tasks of the session from a single poll per interval.
         """
-        start_time = time.time()
-        while (result := await self.get_status_async(upid, node)) is not None:
-            if result == "stopped":
-                return True
-            duration = time.time() - start_time
-            formatted_duration = self.format_duration(duration)
-            formatted_timeout = self.format_duration(self.timeout)
-            formated_upid = self.shorten_upid(upid, 1, 7)
-            logger.info(
-                f"Waiting for task ({formated_upid}) to finish... [ {formatted_duration} / {formatted_timeout} ]"
-            )
-            await asyncio.sleep(self.polling_interval)
-            if time.time() - start_time > self.timeout:
-                logger.warning(
-                    f"Timeout reached while waiting for task to finish. {self.shorten_upid(upid)}..."
-                )
-                break
-        return False
+        if not upid:
+            return False
+        return await self.task_watcher_async.wait(upid, node, timeout=self.timeout)
+
+    def node_circuit_state(self, node: str | None) -> str:
+        """
+        State of the circuit breaker of a node: ``closed``, ``open`` or ``half-open``.
+
+        ``node`` may be a UPID, the state of the node running the task is returned.
+        """
+        breaker: CircuitBreaker | None = getattr(self.api, "circuit_breaker", None)
+        if breaker is None or not node:
+            return CircuitBreaker.CLOSED
+        if node.startswith("UPID:"):
+            node = self.decode_upid(node).get("node")
+        return breaker.state(node)
+
+    def _node_wait(
+        self, node: str, timeout: float | None, started: float
+    ) -> float | None:
+        """Seconds to wait for the node circuit, 0 when available, ``None`` when too long."""
+        if self.node_circuit_state(node) != CircuitBreaker.OPEN:
+            return 0
+        breaker: CircuitBreaker = self.api.circuit_breaker
+        timeout = breaker.reset_timeout if timeout is None else timeout
+        delay = breaker.retry_after(node)
+        if time.monotonic() + delay > started + timeout:
+            return None
+        return delay
+
+    def wait_node_available_sync(self, node: str, timeout: float = None) -> bool:
+        """
+        Wait while the circuit of a node is open, at most ``timeout`` seconds
+        (one ``reset_timeout`` of the breaker by default).
+
+        Returns:
+            bool: True when requests to the node are let through, False when the
+            circuit stays open longer than the timeout.
+        """
+        started = time.monotonic()
+        while delay := self._node_wait(node, timeout, started):
+            logger.info(f"Node {node} circuit is open, waiting {delay:.1f}s")
+            time.sleep(delay)
+        return delay is not None
+
+    async def wait_node_available_async(self, node: str, timeout: float = None) -> bool:
+        """Async counterpart of ``wait_node_available_sync``."""
+        started = time.monotonic()
+        while delay := self._node_wait(node, timeout, started):
+            logger.info(f"Node {node} circuit is open, waiting {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return delay is not None
 
     @staticmethod
-    def decode_upid(upid: str) -> dict:
-        """
-        Decodes the sections of a UPID into separate fields
-        https://github.com/proxmoxer/proxmoxer/blob/develop/proxmoxer/tools/tasks.py
-
-        :param upid: a UPID string
-        :type upid: str
-        :return: The decoded information from the UPID
-        :rtype: dict
-        """
-        segments = upid.split(":")
-        if segments[0] != "UPID" or len(segments) != 9:
-            raise ValueError("UPID is not in the correct format")
-
-        data = {
-            "upid": upid,
-            "node": segments[1],
-            "pid": int(segments[2], 16),
-            "pstart": int(segments[3], 16),
-            "starttime": int(segments[4], 16),
-            "type": segments[5],
-            "id": segments[6],
-            "user": segments[7].split("!")[0],
-            "comment": segments[8],
-        }
-        return data
+    def plan_replication_jobs(
+        vm_id: int, jobs: list[dict], targets: dict[str, dict | None]
+    ) -> tuple[dict[str, dict], list[str]]:
+        """
+        Assign job IDs locally for every target without a replication job.
+
+        Args:
+            vm_id (int): The guest the jobs replicate.
+            jobs (list[dict]): The existing replication jobs of the guest.
+            targets (dict): Job parameters by target node.
+
+        Returns:
+            tuple: The create request data by target node, and the targets that
+            already have a job.
+        """
+        present = {job.get("target") for job in jobs}
+        job_num = max((int(job.get("jobnum", 0)) for job in jobs), default=-1) + 1
+        planned, skipped = {}, []
+        for target_node, data in targets.items():
+            if target_node in present:
+                logger.debug(
+                    f"Replication already present for VM '{vm_id}' for '{target_node}', skip"
+                )
+                skipped.append(target_node)
+                continue
+            data_job = data.copy() if data is not None else {}
+            data_job["id"] = f"{vm_id}-{job_num}"
+            data_job["target"] = target_node
+            data_job["type"] = "local"
+            planned[target_node] = data_job
+            job_num += 1
+        return planned, skipped
 
     @staticmethod
-    def shorten_upid(upid: str, start: int = 0, length: int = 7) -> str | None:
-        if upid:
-            return ":".join(upid.split(":")[start:length])
+    def filter_nodes(
+        nodes: list[dict] | None, online: bool = True, with_status: bool = False
+    ) -> list[str] | list[dict]:
+        if not nodes:
+            return []
+        if online:
+            return sorted([n.get("node") for n in nodes if n.get("status") == "online"])
+        if with_status:
+            return [
+                {key: n[key] for key in ("node", "status") if n.get(key) is not None}
+                for n in nodes
+            ]
+        return sorted([n.get("node") for n in nodes])
 
     @staticmethod
-    def extract_pool_members(get_pools: list, pool_id: str) -> list:
+    def extract_pool_members(get_pools: list, pool_id: str) -> set:
         if not get_pools:
-            return []
+            return set()
         get_pools = get_pools[0]
         if get_pools and pool_id:
-            members = get_pools.get("members")
-            members_vms = [r.get("vmid") for r in members if isinstance(r, dict)]
+            members = get_pools.get("members") or []
+            members_vms = {r.get("vmid") for r in members if isinstance(r, dict)}
             return members_vms
-        return []
+        return set()
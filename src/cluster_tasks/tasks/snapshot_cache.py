@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from cluster_tasks.tasks.inventory import Inventory
+from config_loader.config import configuration
+from ext_api.proxmox_api import ProxmoxAPI
+
+logger = logging.getLogger("CT.{__name__}")
+
+
+class SnapshotCacheBase:
+    """
+    Session scoped cache of cluster wide snapshots such as ``/cluster/resources``
+    (kept as an indexed ``Inventory``) and ``/nodes``, shared by every scenario
+    that uses the same API session. A cache created without an API can be passed
+    to the tasks of several sessions (``ProxmoxTasksSync(snapshot_cache=...)``),
+    fetches are then sent with the API of the caller.
+
+    Entries expire after ``ttl`` seconds and are dropped explicitly by
+    ``invalidate`` after mutating calls. Concurrent callers of an expired key
+    share one in-flight fetch. A fetch started before an invalidation is not
+    stored, so callers never get data older than their own mutation.
+    Failed fetches (``None``) are not cached.
+
+    Attributes:
+        ttl (float): Lifetime of an entry in seconds, ``0`` disables caching.
+        hits (int): Number of values served from the cache or an in-flight fetch.
+        fetches (int): Number of fetches sent to the API.
+    """
+
+    RESOURCES = "cluster/resources"
+    NODES = "nodes"
+    _caches: weakref.WeakKeyDictionary
+
+    def __init__(self, api: ProxmoxAPI = None, ttl: float = None):
+        self._api = api
+        self.ttl = float(configuration.get("CACHE.TTL", 10) if ttl is None else ttl)
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.fetches = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._caches = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_api(cls, api: ProxmoxAPI, **kwargs):
+        """Return the cache of the API session, creating it on first use."""
+        cache = cls._caches.get(api)
+        if cache is None:
+            cache = cls._caches[api] = cls(api, **kwargs)
+        return cache
+
+    @property
+    def api(self) -> ProxmoxAPI:
+        return self._api
+
+    def _fresh(self, key: str) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return True, entry[1]
+        return False, None
+
+    def _store(self, key: str, generation: int, value: Any):
+        if value is not None and self._generations.get(key, 0) == generation:
+            self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, *keys: str):
+        """Drop the given keys, or every key when called without arguments."""
+        for key in keys or list(self._generations | self._entries):
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+        logger.debug(f"Snapshot cache invalidated: {keys or 'all'}")
+
+    def invalidate_resources(self):
+        """Drop ``/cluster/resources`` after a VM was created, removed or moved."""
+        self.invalidate(self.RESOURCES)
+
+
+class SnapshotCacheAsync(SnapshotCacheBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight: dict[str, tuple[int, asyncio.Future]] = {}
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        fresh, value = self._fresh(key)
+        if fresh:
+            self.hits += 1
+            return value
+        generation = self._generations.get(key, 0)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None and in_flight[0] == generation:
+            self.hits += 1
+            return await asyncio.shield(in_flight[1])
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (generation, future)
+        self.fetches += 1
+        try:
+            value = await fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            # the exception is raised to this caller, mark it retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self._store(key, generation, value)
+        finally:
+            if self._in_flight.get(key, (None, None))[1] is future:
+                del self._in_flight[key]
+        return value
+
+    @staticmethod
+    async def _fetch_inventory(api: ProxmoxAPI) -> Inventory | None:
+        resources = await api.cluster.resources.get()
+        return None if resources is None else Inventory(resources)
+
+    async def inventory(self, api: ProxmoxAPI = None) -> Inventory | None:
+        return await self.get(
+            self.RESOURCES, partial(self._fetch_inventory, api or self.api)
+        )
+
+    async def nodes(self, api: ProxmoxAPI = None) -> list[dict] | None:
+        return await self.get(self.NODES, (api or self.api).nodes.get)
+
+
+class SnapshotCacheSync(SnapshotCacheBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        fresh, value = self._fresh(key)
+        if fresh:
+            self.hits += 1
+            return value
+        # threads arriving during a fetch wait for it and reuse its result
+        with self._key_lock(key):
+            with self._lock:
+                fresh, value = self._fresh(key)
+                if fresh:
+                    self.hits += 1
+                    return value
+                generation = self._generations.get(key, 0)
+                self.fetches += 1
+            value = fetch()
+            with self._lock:
+                self._store(key, generation, value)
+        return value
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            super().invalidate(*keys)
+
+    @staticmethod
+    def _fetch_inventory(api: ProxmoxAPI) -> Inventory | None:
+        resources = api.cluster.resources.get()
+        return None if resources is None else Inventory(resources)
+
+    def inventory(self, api: ProxmoxAPI = None) -> Inventory | None:
+        return self.get(self.RESOURCES, partial(self._fetch_inventory, api or self.api))
+
+    def nodes(self, api: ProxmoxAPI = None) -> list[dict] | None:
+        return self.get(self.NODES, (api or self.api).nodes.get)
@@ -0,0 +1,461 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator
+
+from cluster_tasks.tasks.base_tasks import BaseTasks
+from cluster_tasks.tasks.polling import PollingPolicies, PollingPolicy, PollingStats
+from ext_api.proxmox_api import ProxmoxAPI
+from ext_api.rate_limit import Priority
+
+logger = logging.getLogger("CT.{__name__}")
+
+
+@dataclass
+class WatchedTask:
+    """A UPID the watcher is waiting for, with the future handed out to callers."""
+
+    upid: str
+    node: str
+    future: asyncio.Future | concurrent.futures.Future
+    timeout: float
+    policy: PollingPolicy
+    start_time: float = field(default_factory=time.monotonic)
+    attempt: int = 0
+    next_check: float = 0.0
+
+    def __post_init__(self):
+        self.next_check = self.start_time + self.policy.interval(self.attempt)
+
+    @property
+    def deadline(self) -> float:
+        return self.start_time + self.timeout
+
+    @property
+    def due(self) -> float:
+        return min(self.next_check, self.deadline)
+
+    def schedule_next(self, now: float):
+        self.attempt += 1
+        self.next_check = now + self.policy.interval(self.attempt)
+
+
+class TaskWatcherBase:
+    """
+    Shared task completion watcher for one API session.
+
+    Instead of polling ``nodes/{node}/tasks/{upid}/status`` for every UPID, the
+    watcher polls once per tick and resolves all outstanding UPIDs from that
+    single response:
+
+    - ``source="cluster"``: one ``/cluster/tasks`` request per tick. A task is
+      finished when its entry has an ``endtime``; UPIDs that are not listed yet
+      are treated as running (the cluster task list is broadcast with a delay).
+      The list keeps recent tasks only, a UPID still missing ``MISSING_GRACE``
+      seconds after it was registered is checked with its node task status.
+    - ``source="node"``: one ``nodes/{node}/tasks?source=active`` request per node
+      with outstanding tasks. A task is finished when it left the active list.
+
+    A tick is due when the first outstanding task is due for its next check.
+    Each task is scheduled by the polling policy of its type (``decode_upid``),
+    so config changes are checked after milliseconds and clones back off to a
+    ceiling of several seconds. ``stats`` count the polls and, for the cluster
+    source, the delay between the ``endtime`` of a task and its detection.
+
+    Futures resolve to ``True`` when the task stopped and to ``False`` when the
+    timeout is reached or the UPID is malformed, the same contract as
+    ``wait_task_done_*``.
+    """
+
+    SOURCES = ("cluster", "node")
+    MISSING_GRACE = 5.0
+    _watchers: weakref.WeakKeyDictionary
+
+    def __init__(
+        self,
+        api: ProxmoxAPI,
+        polling_interval: float = 2,
+        timeout: float = 10 * 60,
+        source: str = "cluster",
+        polling_policies: PollingPolicies = None,
+    ):
+        if source not in self.SOURCES:
+            raise ValueError(f"Unsupported task watcher source: {source}")
+        self._api = api
+        self.polling_interval = polling_interval
+        self.timeout = timeout
+        self.source = source
+        self.polling_policies = polling_policies or PollingPolicies.from_config()
+        self.stats = PollingStats.for_api(api)
+        self._pending: dict[str, WatchedTask] = {}
+        self.polls = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._watchers = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_api(cls, api: ProxmoxAPI, **kwargs):
+        """
+        Return the watcher of the API session, creating it on first use.
+
+        The watcher is shared by all callers of the session, the settings given
+        by the latest one (``polling_interval``, ``timeout``, ``polling_policies``)
+        replace the former ones. They apply to the UPIDs watched from then on, a
+        watched UPID keeps the timeout and polling policy it was registered with.
+        The ``source`` of an existing watcher can't be changed.
+        """
+        watcher = cls._watchers.get(api)
+        if watcher is None:
+            watcher = cls._watchers[api] = cls(api, **kwargs)
+            return watcher
+        source = kwargs.pop("source", None)
+        if source is not None and source != watcher.source:
+            raise ValueError(
+                f"The task watcher of this session polls the {watcher.source!r} source"
+            )
+        watcher.configure(**kwargs)
+        return watcher
+
+    def configure(
+        self,
+        polling_interval: float = None,
+        timeout: float = None,
+        polling_policies: PollingPolicies = None,
+    ):
+        """Replace the given settings for the UPIDs watched from now on."""
+        if polling_interval is not None:
+            self.polling_interval = polling_interval
+        if timeout is not None:
+            self.timeout = timeout
+        if polling_policies is not None:
+            self.polling_policies = polling_policies
+
+    @property
+    def api(self) -> ProxmoxAPI:
+        return self._api
+
+    @property
+    def pending(self) -> list[str]:
+        return list(self._pending)
+
+    def _register(self, upid: str, node: str | None, timeout: float | None, future):
+        watched = self._pending.get(upid)
+        if watched is not None:
+            return watched.future
+        try:
+            decoded = BaseTasks.decode_upid(upid)
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Can't wait for task {upid!r}: {e}")
+            future.set_result(False)
+            return future
+        self._pending[upid] = WatchedTask(
+            upid=upid,
+            node=node or decoded.get("node"),
+            future=future,
+            timeout=timeout or self.timeout,
+            policy=self.polling_policies.get(decoded.get("type")),
+        )
+        return future
+
+    def _next_due(self) -> float | None:
+        """Monotonic time of the next tick, ``None`` if nothing is watched."""
+        return min((w.due for w in self._pending.values()), default=None)
+
+    def _circuit_open(self, node: str | None) -> bool:
+        breaker = getattr(self._api, "circuit_breaker", None)
+        return breaker is not None and breaker.state(node) == breaker.OPEN
+
+    def _nodes_due(self, now: float) -> list[str]:
+        # nodes with an open circuit would fail fast, skip them until it half-opens
+        nodes = {w.node for w in self._pending.values() if w.due <= now}
+        return sorted(node for node in nodes if not self._circuit_open(node))
+
+    def _missing_upids(self, tasks: list | None, now: float) -> dict[str, str]:
+        """Due UPIDs missing from the cluster task list for too long, with their node."""
+        if tasks is None:
+            return {}
+        listed = {task.get("upid") for task in tasks}
+        return {
+            upid: watched.node
+            for upid, watched in self._pending.items()
+            if upid not in listed
+            and watched.due <= now
+            and now - watched.start_time >= self.MISSING_GRACE
+            and not self._circuit_open(watched.node)
+        }
+
+    def _finished_upids(
+        self, responses: dict[str | None, list | dict | None], poll_started: float
+    ) -> dict[str, float | None]:
+        """
+        Collect finished UPIDs from one tick of responses, with their end time
+        (epoch seconds) when the response tells it.
+
+        Args:
+            responses (dict): ``{None: cluster_tasks, upid: task_status, ...}`` for
+                the cluster source, with the status of the missing UPIDs, or
+                ``{node: active_tasks}`` for the node source. A ``None`` value means
+                the request failed and nothing can be resolved from it.
+            poll_started (float): Monotonic time the poll was sent. Tasks watched
+                after that may be missing from an active list only because the
+                list is older than them.
+        """
+        finished = {}
+        if self.source == "cluster":
+            tasks = responses.get(None)
+            if tasks is None:
+                return finished
+            for task in tasks:
+                upid = task.get("upid")
+                if upid in self._pending and task.get("endtime"):
+                    finished[upid] = task["endtime"]
+            for upid, status in responses.items():
+                if (
+                    upid in self._pending
+                    and status
+                    and status.get("status") == "stopped"
+                ):
+                    finished[upid] = status.get("endtime")
+            return finished
+        for node, active in responses.items():
+            if active is None:
+                continue
+            active_upids = {task.get("upid") for task in active}
+            for upid, watched in self._pending.items():
+                if (
+                    watched.node == node
+                    and watched.start_time <= poll_started
+                    and upid not in active_upids
+                ):
+                    finished[upid] = None
+        return finished
+
+    def _process(
+        self, responses: dict[str | None, list | dict | None], poll_started: float
+    ):
+        """Resolve finished and expired tasks, reschedule and log the due ones."""
+        self.polls += 1
+        self.stats.add_requests(len(responses))
+        now = time.monotonic()
+        finished = self._finished_upids(responses, poll_started)
+        for upid in list(self._pending):
+            watched = self._pending[upid]
+            if upid in finished:
+                self._resolve(self._pending.pop(upid), True, now, finished[upid])
+            elif now >= watched.deadline:
+                logger.warning(
+                    f"Timeout reached while waiting for task to finish. {BaseTasks.shorten_upid(upid)}..."
+                )
+                self._resolve(self._pending.pop(upid), False, now)
+            elif watched.next_check <= now:
+                watched.schedule_next(now)
+                formatted_duration = BaseTasks.format_duration(now - watched.start_time)
+                formatted_timeout = BaseTasks.format_duration(watched.timeout)
+                circuit = (
+                    f", node {watched.node} circuit open"
+                    if self._circuit_open(watched.node)
+                    else ""
+                )
+                logger.info(
+                    f"Waiting for task ({BaseTasks.shorten_upid(upid, 1, 7)}) to finish... [ {formatted_duration} / {formatted_timeout} ]{circuit}"
+                )
+
+    def _resolve(
+        self, watched: WatchedTask, result: bool, now: float, end_time: float = None
+    ):
+        detection_delay = time.time() - end_time if end_time else None
+        self.stats.add_wait(now - watched.start_time, detection_delay)
+        if not watched.future.done():
+            watched.future.set_result(result)
+
+
+class TaskWatcherAsync(TaskWatcherBase):
+    """
+    Asynchronous task watcher. A single background task polls while there are
+    outstanding UPIDs and stops when the last one is resolved.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._runner: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def watch(
+        self, upid: str, node: str = None, timeout: float = None
+    ) -> asyncio.Future:
+        """Start watching a UPID and return the future resolved on completion."""
+        loop = asyncio.get_running_loop()
+        if self._runner is not None and self._runner.get_loop() is not loop:
+            # Futures of a previous event loop can never be resolved
+            self._pending.clear()
+            self._runner = None
+            self._wakeup = None
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        future = self._register(upid, node, timeout, loop.create_future())
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        else:
+            # the new task may be due before the one the runner sleeps for
+            self._wakeup.set()
+        return future
+
+    async def wait(self, upid: str, node: str = None, timeout: float = None) -> bool:
+        """Wait for a single task. Cancelling the caller does not affect other waiters."""
+        return await asyncio.shield(self.watch(upid, node, timeout))
+
+    async def as_completed(
+        self, upids: list[str], timeout: float = None
+    ) -> AsyncIterator[tuple[str, bool]]:
+        """Yield ``(upid, result)`` pairs in the order the tasks finish."""
+        futures = {self.watch(upid, timeout=timeout): upid for upid in upids}
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                yield futures[future], future.result()
+
+    async def poll(self) -> dict[str | None, list | dict | None]:
+        if self.source == "cluster":
+            tasks = await self.api.cluster.tasks.get(priority=Priority.BACKGROUND)
+            missing = self._missing_upids(tasks, time.monotonic())
+            statuses = await asyncio.gather(
+                *(
+                    self.api.nodes(node)
+                    .tasks(upid)
+                    .status.get(priority=Priority.BACKGROUND)
+                    for upid, node in missing.items()
+                )
+            )
+            return {None: tasks, **dict(zip(missing, statuses))}
+        nodes = self._nodes_due(time.monotonic())
+        results = await asyncio.gather(
+            *(
+                self.api.nodes(node).tasks.get(
+                    params={"source": "active"}, priority=Priority.BACKGROUND
+                )
+                for node in nodes
+            )
+        )
+        return dict(zip(nodes, results))
+
+    async def _run(self):
+        while self._pending:
+            delay = self._next_due() - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            poll_started = time.monotonic()
+            try:
+                responses = await self.poll()
+            except Exception as e:
+                logger.debug(f"Task watcher poll failed: {e}")
+                responses = {}
+            self._process(responses, poll_started)
+
+
+class TaskWatcherSync(TaskWatcherBase):
+    """
+    Synchronous task watcher. There is no background thread: whichever waiting
+    thread finds the next tick due performs the poll, all the others wait on
+    their futures.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+    def watch(
+        self, upid: str, node: str = None, timeout: float = None
+    ) -> concurrent.futures.Future:
+        """Start watching a UPID and return the future resolved on completion."""
+        with self._lock:
+            return self._register(upid, node, timeout, concurrent.futures.Future())
+
+    def wait(self, upid: str, node: str = None, timeout: float = None) -> bool:
+        """Wait for a single task, polling on behalf of all waiters when due."""
+        future = self.watch(upid, node, timeout)
+        while not future.done():
+            self._tick()
+            try:
+                future.result(timeout=self._wait_timeout())
+            except concurrent.futures.TimeoutError:
+                continue
+        return future.result()
+
+    def as_completed(
+        self, upids: list[str], timeout: float = None
+    ) -> Iterator[tuple[str, bool]]:
+        """Yield ``(upid, result)`` pairs in the order the tasks finish."""
+        futures = {self.watch(upid, timeout=timeout): upid for upid in upids}
+        pending = set(futures)
+        while pending:
+            self._tick()
+            done, pending = concurrent.futures.wait(
+                pending,
+                timeout=self._wait_timeout(),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                yield futures[future], future.result()
+
+    def poll(self) -> dict[str | None, list | dict | None]:
+        if self.source == "cluster":
+            tasks = self.api.cluster.tasks.get(priority=Priority.BACKGROUND)
+            with self._lock:
+                missing = self._missing_upids(tasks, time.monotonic())
+            return {
+                None: tasks,
+                **{
+                    upid: self.api.nodes(node)
+                    .tasks(upid)
+                    .status.get(priority=Priority.BACKGROUND)
+                    for upid, node in missing.items()
+                },
+            }
+        with self._lock:
+            nodes = self._nodes_due(time.monotonic())
+        return {
+            node: self.api.nodes(node).tasks.get(
+                params={"source": "active"}, priority=Priority.BACKGROUND
+            )
+            for node in nodes
+        }
+
+    def _wait_timeout(self) -> float:
+        with self._lock:
+            due = self._next_due()
+        if due is None:
+            return 0.01
+        return max(due - time.monotonic(), 0.01)
+
+    def _tick(self):
+        with self._lock:
+            due = self._next_due()
+        if due is None or time.monotonic() < due:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            poll_started = time.monotonic()
+            try:
+                responses = self.poll()
+            except Exception as e:
+                logger.debug(f"Task watcher poll failed: {e}")
+                responses = {}
+            with self._lock:
+                self._process(responses, poll_started)
+        finally:
+            self._poll_lock.release()
@@ -1,21 +1,51 @@
 import os
 import logging
 import tomllib as toml
-import yaml
 from pathlib import Path
 
-from dotenv import load_dotenv
-
 logger = logging.getLogger("CT.{__name__}")
 
+_UNSET = object()
+
 
 class ConfigLoader:
+    """
+    Configuration of a TOML or YAML file, overridden by environment variables.
+
+    Nothing is read when the loader is created: the config folder is searched
+    and the file parsed on first access, so importing modules that hold the
+    shared ``configuration`` costs nothing until a value is needed.
+    """
+
     def __init__(self, file_path: Path = None, env_var_prefix: str = ""):
-        self.config_folder = self.find_config_folder()
-        self.file_path = file_path or self.config_folder / "config.toml"
+        self._file_path = file_path
+        self._config_folder = _UNSET
+        self._settings: dict | None = None
         self.env_var_prefix = env_var_prefix
-        self.settings = self.load_config()
-        self.build_token()
+
+    @property
+    def config_folder(self) -> Path | None:
+        if self._config_folder is _UNSET:
+            self._config_folder = self.find_config_folder()
+        return self._config_folder
+
+    @property
+    def file_path(self) -> Path:
+        return self._file_path or self.config_folder / "config.toml"
+
+    @property
+    def settings(self) -> dict:
+        if self._settings is None:
+            self._settings = self.load_config()
+            self.build_token()
+        return self._settings
+
+    def load(self, file_path: Path = None) -> dict:
+        """(Re)load the settings now, from ``file_path`` if given."""
+        if file_path is not None:
+            self._file_path = file_path
+        self._settings = None
+        return self.settings
 
     @staticmethod
     def find_config_folder():
@@ -57,6 +87,8 @@ class ConfigLoader:
             return config
         if self.file_path.suffix == ".yaml":
             try:
+                import yaml
+
                 with self.file_path.open("rb") as f:
                     config = yaml.safe_load(f)
                 return config
@@ -114,6 +146,8 @@ class ConfigLoader:
         Returns:
             dict: The configuration dictionary with overridden values.
         """
+        from dotenv import load_dotenv
+
         load_dotenv()
         for section, values in config.items():
             # print(f"override_with_env_vars: {section} - {values}")
@@ -147,17 +181,16 @@ class ConfigLoader:
         return value
 
 
+# loaded on first access
 configuration = ConfigLoader()
-# configuration = None
 
 
 def initialize(file_path: Path = None):
-    global configuration
     if not file_path or file_path.is_file() is False:
         logger.error(f"Config file ({file_path}) not found")
         return None
-    configuration = ConfigLoader(file_path=file_path)
-    return len(configuration.settings.keys())
+    # reloaded in place, the modules that imported it see the new settings
+    return len(configuration.load(file_path).keys())
 
 
 if __name__ == "__main__":
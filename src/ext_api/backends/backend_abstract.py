@@ -1,7 +1,21 @@
+import json
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator
+
+from ext_api.backends.response import Response
+
+
+class StreamError(Exception):
+    """A streamed request failed: HTTP error status or non-zero exit status."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class ProxmoxBackend(ABC):
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, *args, **kwargs): ...
 
     def connect(self, *args, **kwargs):
@@ -16,3 +30,39 @@ class ProxmoxBackend(ABC):
         """Perform an asynchronous API request."""
         raise NotImplementedError("Async request not implemented for this backend")
         # return {"response": {"data": {}}, "status_code": 0, "success": True}
+
+    def host_of(self, endpoint: str = None, endpoint_params: dict = None) -> str:
+        """The host a request to the endpoint is sent to, the key of its rate limit."""
+        return "local"
+
+    def stream(self, *args, **kwargs) -> Iterator[bytes]:
+        """
+        Perform a synchronous request and yield the body as byte chunks.
+
+        Backends that can't stream send the whole body of ``request`` as one chunk.
+        A failed request raises ``StreamError``.
+        """
+        result = self.request(*args, **kwargs)
+        self.check_stream_result(result)
+        yield self.body_bytes(result)
+
+    async def async_stream(self, *args, **kwargs) -> AsyncIterator[bytes]:
+        """Perform an asynchronous request and yield the body as byte chunks."""
+        result = await self.async_request(*args, **kwargs)
+        self.check_stream_result(result)
+        yield self.body_bytes(result)
+
+    @staticmethod
+    def check_stream_result(result: Response | dict | None):
+        if not result or not result.get("success"):
+            status_code = result.get("status_code") if result else None
+            error = (result or {}).get("error") or f"status {status_code}"
+            raise StreamError(f"Stream failed: {error}", status_code)
+
+    @staticmethod
+    def body_bytes(result: Response | dict) -> bytes:
+        """The body of a result as bytes, the received ones if it was not decoded."""
+        if isinstance(result, Response) and result.raw and not result.decoded:
+            raw = result.raw
+            return raw if isinstance(raw, bytes) else raw.encode()
+        return json.dumps(result.get("response")).encode()
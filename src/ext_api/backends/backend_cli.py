@@ -1,15 +1,18 @@
 import asyncio
-import json
 import logging
 import shlex
 import subprocess
+from functools import partial
 
-from ext_api.backends.backend_abstract import ProxmoxBackend
+from ext_api.backends.backend_abstract import ProxmoxBackend, StreamError
+from ext_api.backends.batch_session import AsyncBatchWorkerPool, BatchWorkerPool
+from ext_api.backends.response import Response
 
 logger = logging.getLogger("CT.{__name__}")
 
 
 class ProxmoxCLIBaseBackend(ProxmoxBackend):
+    LOG_PREFIX = "CLI"
     METHOD_MAP = {
         "post": "create",
         "put": "set",
@@ -18,11 +21,40 @@ class ProxmoxCLIBaseBackend(ProxmoxBackend):
     def __init__(
         self,
         entry_point: str,
+        workers: int = 0,
+        worker_command: list[str] | None = None,
         *args,
         **kwargs,
     ):
+        """
+        Args:
+            entry_point (str): The ``pvesh`` command.
+            workers (int): Long-lived helper processes answering GET requests,
+                0 runs ``pvesh`` for every request.
+            worker_command (list[str] | None): Command line of a helper, the perl
+                batch helper by default.
+        """
         super().__init__(*args, **kwargs)
         self.entry_point = entry_point.strip("/")
+        self.workers: int = workers or 0
+        self.worker_command: list[str] | None = worker_command or None
+        self.batch: bool = self.workers > 0
+        self._workers: BatchWorkerPool | AsyncBatchWorkerPool | None = None
+
+    def batch_path(
+        self, method: str, endpoint: str, endpoint_params: dict = None
+    ) -> str | None:
+        """
+        Path of a request a batch helper answers, ``None`` to run ``pvesh``.
+
+        Only GET requests go to the helpers, mutations (which may fork a task
+        worker) run ``pvesh`` through a shell for every call.
+        """
+        if not self.batch or not endpoint or (method or "").lower() != "get":
+            return None
+        if endpoint_params:
+            endpoint = endpoint.format(**endpoint_params)
+        return endpoint.strip("/")
 
     def format_command(
         self,
@@ -53,43 +85,37 @@ class ProxmoxCLIBaseBackend(ProxmoxBackend):
         logger.debug("Formatted command: %s", command)
         return command
 
-    @staticmethod
-    def result_analyze(output, error, exit_status) -> dict:
-        success = exit_status == 0
+    @classmethod
+    def result_analyze(cls, output, error, exit_status) -> Response:
         if error:
             if hasattr(error, "decode"):
-                error = output.decode().strip()
-            logger.debug(f"CLI Error: {repr(error)}")
-        if hasattr(output, "decode"):
-            output = output.decode("utf-8")
-        decoded = output.strip() if isinstance(output, str) else None
-        if not decoded:
-            return {
-                "response": {"data": {}},
-                "status_code": exit_status,
-                "success": success,
-                "error": error,
-            }
-        try:
-            json.loads(decoded)
-        except json.JSONDecodeError:
-            logger.debug(
-                f"CLI Error of decode JSON result: {decoded.splitlines()[-1]}..."
-            )
-            return {
-                "response": {"data": decoded.splitlines()[-1]},
-                "status_code": exit_status,
-                "success": success,
-            }
-        return {
-            "response": {"data": json.loads(decoded)},
-            "status_code": exit_status,
-            "success": success,
-        }
+                error = error.decode(errors="replace").strip()
+            logger.debug(f"{cls.LOG_PREFIX} Error: {repr(error)}")
+        if not isinstance(output, (bytes, str)):
+            output = None
+        # parsed once, straight from the bytes of the process output, on first use
+        return Response(output, exit_status, exit_status == 0, error, envelope=False)
 
 
 class ProxmoxCLIBackend(ProxmoxCLIBaseBackend):
 
+    @property
+    def worker_pool(self) -> BatchWorkerPool:
+        if self._workers is None:
+            self._workers = BatchWorkerPool(self.workers, self.worker_command)
+        return self._workers
+
+    def close(self):
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def request(
         self,
         method: str = None,
@@ -103,9 +129,24 @@ class ProxmoxCLIBackend(ProxmoxCLIBaseBackend):
         command = self.format_command(endpoint, params, method, data, endpoint_params)
         if command is None:
             return {"response": None, "status_code": -1, "success": False}
+        batch_path = self.batch_path(method, endpoint, endpoint_params)
+        if batch_path:
+            try:
+                return self.worker_pool.request(batch_path, params)
+            except (ConnectionError, OSError) as e:
+                # the worker died, the next request gets a new one
+                return {
+                    "response": None,
+                    "status_code": 1,
+                    "error": str(e),
+                    "success": False,
+                    "network_error": True,
+                    "sent": True,
+                }
         try:
+            # bytes, decoded once by json_codec as the output of the async path
             process = subprocess.run(
-                command, shell=True, capture_output=True, text=True, check=True
+                command, shell=True, capture_output=True, check=True
             )
             output = process.stdout
             error = process.stderr
@@ -114,9 +155,54 @@ class ProxmoxCLIBackend(ProxmoxCLIBaseBackend):
         except subprocess.CalledProcessError as e:
             return {"response": None, "status_code": e.returncode, "success": False}
 
+    def stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Run ``pvesh``, yields its output as byte chunks."""
+        command = self.format_command(endpoint, params, method, None, endpoint_params)
+        if command is None:
+            raise StreamError(f"Stream {method} {endpoint}: unsupported request")
+        process = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            yield from iter(partial(process.stdout.read1, self.STREAM_CHUNK_SIZE), b"")
+            if process.wait() != 0:
+                raise StreamError(
+                    f"Stream {command}: exit status {process.returncode}",
+                    process.returncode,
+                )
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+
 
 class ProxmoxAsyncCLIBackend(ProxmoxCLIBaseBackend):
 
+    @property
+    def worker_pool(self) -> AsyncBatchWorkerPool:
+        if self._workers is None:
+            self._workers = AsyncBatchWorkerPool(self.workers, self.worker_command)
+        return self._workers
+
+    async def close(self):
+        if self._workers is not None:
+            await self._workers.close()
+            self._workers = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
     async def async_request(
         self,
         method: str = None,
@@ -131,6 +217,20 @@ class ProxmoxAsyncCLIBackend(ProxmoxCLIBaseBackend):
 
         if command is None:
             return {"response": None, "status_code": -1, "success": False}
+        batch_path = self.batch_path(method, endpoint, endpoint_params)
+        if batch_path:
+            try:
+                return await self.worker_pool.request(batch_path, params)
+            except (ConnectionError, OSError) as e:
+                # the worker died, the next request gets a new one
+                return {
+                    "response": None,
+                    "status_code": 1,
+                    "error": str(e),
+                    "success": False,
+                    "network_error": True,
+                    "sent": True,
+                }
         try:
             process = await asyncio.create_subprocess_shell(
                 command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
@@ -144,3 +244,31 @@ class ProxmoxAsyncCLIBackend(ProxmoxCLIBaseBackend):
             return self.result_analyze(output, error, exit_status)
         except subprocess.CalledProcessError as e:
             return {"response": None, "status_code": e.returncode, "success": False}
+
+    async def async_stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Run ``pvesh``, yields its output as byte chunks."""
+        command = self.format_command(endpoint, params, method, None, endpoint_params)
+        if command is None:
+            raise StreamError(f"Stream {method} {endpoint}: unsupported request")
+        process = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            while chunk := await process.stdout.read(self.STREAM_CHUNK_SIZE):
+                yield chunk
+            if await process.wait() != 0:
+                raise StreamError(
+                    f"Stream {command}: exit status {process.returncode}",
+                    process.returncode,
+                )
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
@@ -1,15 +1,20 @@
 import logging
+from urllib.parse import urlsplit
 
-logger = logging.getLogger("CT.{__name__}")
-
-try:
-    import httpx
-except ImportError as e:
-    logger.error(f"HTTPS Backend require load module: {e}")
-    exit(1)
+import httpx
 
-from ext_api.backends.backend_abstract import ProxmoxBackend
+from ext_api.backends import json_codec
+from ext_api.backends.backend_abstract import ProxmoxBackend, StreamError
+from ext_api.backends.endpoints import (
+    Endpoint,
+    EndpointPool,
+    NodeAffinity,
+    is_gateway_error,
+)
+from ext_api.backends.response import Response
+from ext_api.backends.session import AsyncPersistentSession, PersistentSession
 
+logger = logging.getLogger("CT.{__name__}")
 
 """
 Proxmox backends for http/https protocols.
@@ -29,31 +34,106 @@ http protocol.
 
 
 class ProxmoxHTTPBaseBackend(ProxmoxBackend):
+    # the connection was never established, the request did not leave
+    UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    session_cls = PersistentSession
+
     def __init__(
         self,
-        base_url: str,
+        base_url: str | list[str],
         entry_point: str,
         token: str,
         verify_ssl: bool = True,
+        endpoint_strategy: str = "round_robin",
+        endpoint_max_failures: int = 3,
+        endpoint_cooldown: float = 30.0,
+        node_affinity: bool = False,
+        node_affinity_ttl: float = 300.0,
+        http2: bool = True,
+        max_connections: int | None = 100,
+        max_keepalive_connections: int | None = 20,
+        keepalive_expiry: float | None = 5.0,
+        timeout_connect: float | None = 5.0,
+        timeout_read: float | None = 5.0,
+        timeout_write: float | None = 5.0,
+        timeout_pool: float | None = 5.0,
+        session_idle_timeout: float = 60.0,
         *args,
         **kwargs,
     ):
         """
         Initialize a ProxmoxHTTPBaseBackend instance.
         Args:
-            base_url (str): The base URL for the Proxmox API.
+            base_url (str | list[str]): The base URL for the Proxmox API, or the URLs
+                of several cluster nodes (a list or a comma separated string).
             entry_point (str): The entry point for the Proxmox API.
             token (str): The token used for authentication with the Proxmox API.
+            verify_ssl (bool): Verify the TLS certificate of the API.
+            endpoint_strategy (str): How requests are spread over several base URLs,
+                "round_robin" or "least_outstanding".
+            endpoint_max_failures (int): Consecutive failures that take a base URL
+                out of rotation.
+            endpoint_cooldown (float): Seconds a failed base URL stays out of rotation.
+            node_affinity (bool): Send ``nodes/{node}/...`` requests straight to the
+                API of that node, the addresses are learned from ``/cluster/status``.
+            node_affinity_ttl (float): Seconds the learned node addresses are kept.
+            http2 (bool): Negotiate HTTP/2, requests are then multiplexed as streams
+                over the pooled connections.
+            max_connections (int | None): Connection pool size, ``None`` is unlimited.
+            max_keepalive_connections (int | None): Idle connections kept open.
+            keepalive_expiry (float | None): Seconds an idle connection is kept open.
+            timeout_connect (float | None): Connect timeout in seconds.
+            timeout_read (float | None): Read timeout in seconds.
+            timeout_write (float | None): Write timeout in seconds.
+            timeout_pool (float | None): Seconds to wait for a free pool connection.
+            session_idle_timeout (float): Seconds the client opened by a request
+                outside ``with`` is kept without requests, 0 keeps it open.
             *args: Additional positional arguments.
             **kwargs: Additional keyword arguments.
         """
         super().__init__(*args, **kwargs)
-        self.base_url = base_url
+        urls = EndpointPool.parse_urls(base_url) or [""]
+        self.base_url = urls[0]
+        self.endpoints = EndpointPool(
+            urls,
+            strategy=endpoint_strategy,
+            max_failures=endpoint_max_failures,
+            cooldown=endpoint_cooldown,
+        )
+        self.api_host = ",".join(urlsplit(url).netloc for url in urls)
+        self.node_affinity = (
+            NodeAffinity(self.base_url, ttl=node_affinity_ttl)
+            if node_affinity
+            else None
+        )
         self.entry_point = entry_point.strip("/") if entry_point else []
         self.token = token
         self.token_delimiter = "="
         self.verify_ssl = verify_ssl
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=timeout_connect,
+            read=timeout_read,
+            write=timeout_write,
+            pool=timeout_pool,
+        )
         self._client: httpx.Client | httpx.AsyncClient | None = None
+        self.persistent = self.session_cls(self, session_idle_timeout)
+
+    def client_params(self) -> dict:
+        """Keyword arguments of the httpx client."""
+        return {
+            "headers": self.build_headers(),
+            "http2": self.http2,
+            "verify": self.verify_ssl,
+            "limits": self.limits,
+            "timeout": self.timeout,
+        }
 
     def get_authorization(self, token: str | None = None):
         return f"PVEAPIToken{self.token_delimiter}{token or self.token}"
@@ -65,26 +145,107 @@ class ProxmoxHTTPBaseBackend(ProxmoxBackend):
         }
         return headers
 
-    def format_url(self, endpoint: str, endpoint_params: dict = None) -> str:
+    @staticmethod
+    def format_path(endpoint: str, endpoint_params: dict = None) -> str:
         if not endpoint:
             raise ValueError("HTTPS backend: Endpoint is required")
-        """Format the full URL for a given endpoint."""
         endpoint = endpoint.strip("/")
         if endpoint_params:
             endpoint = endpoint.format(**endpoint_params)
+        return endpoint.lstrip("/")
+
+    def format_url(
+        self, endpoint: str, endpoint_params: dict = None, base_url: str = None
+    ) -> str:
+        """Format the full URL for a given endpoint."""
+        endpoint = self.format_path(endpoint, endpoint_params)
         logger.debug(f"Formatted endpoint: /{self.entry_point}/{endpoint}")
-        return f"{self.base_url}/{self.entry_point}/{endpoint.lstrip('/')}"
+        base_url = self.base_url if base_url is None else base_url
+        return f"{base_url}/{self.entry_point}/{endpoint}"
 
-    @staticmethod
-    def response_analyze(response: httpx.Response):
-        success = response.status_code < 400
+    def affinity_path(self, endpoint: str, endpoint_params: dict = None) -> str | None:
+        """The request path when it is scoped to a node and node affinity is on."""
+        if self.node_affinity is None or not endpoint:
+            return None
+        path = self.format_path(endpoint, endpoint_params)
+        return path if self.node_affinity.node_of(path) else None
+
+    def learn_nodes(self, response: httpx.Response | None):
+        data = None
+        try:
+            if response is not None and response.status_code < 400:
+                data = json_codec.loads(response.content).get("data")
+        except ValueError as exc:
+            logger.warning(f"Node affinity: {exc}")
+        if data is None:
+            logger.warning("Node affinity: could not read /cluster/status")
+        self.node_affinity.learn(data)
+
+    def host_of(self, endpoint: str = None, endpoint_params: dict = None) -> str:
+        """
+        The node host of a request sent there by node affinity, otherwise the
+        hosts of the API endpoints, which share one rate limit.
+        """
+        path = self.affinity_path(endpoint, endpoint_params)
+        node_endpoint = self.node_affinity.endpoint_for(path) if path else None
+        if node_endpoint is not None:
+            return urlsplit(node_endpoint.url).netloc
+        return self.api_host
+
+    def select_endpoint(
+        self, tried: list[Endpoint], affinity_path: str = None
+    ) -> Endpoint:
+        if affinity_path and not tried:
+            endpoint = self.node_affinity.endpoint_for(affinity_path)
+            if endpoint is not None:
+                return endpoint
+        return self.endpoints.select(exclude=tried)
+
+    def can_failover(self, method: str, exc: Exception, tried: list[Endpoint]) -> bool:
+        """
+        Whether a failed request may be sent to the next endpoint.
+
+        Requests that never reached the server (connect errors) can always be
+        sent again, any other transport error only for reads.
+        """
+        if all(e in tried for e in self.endpoints.endpoints):
+            return False
+        if isinstance(exc, self.UNSENT_ERRORS):
+            return True
+        return (method or "").lower() == "get"
+
+    def endpoint_failed(
+        self, method: str, exc: Exception, endpoint: Endpoint, tried: list[Endpoint]
+    ) -> bool:
+        """Report the failure and return True if the request should fail over."""
+        self.endpoints.report(endpoint, ok=False)
+        if not self.can_failover(method, exc, tried):
+            return False
+        logger.warning(f"API endpoint {endpoint.url} failed: {exc}, trying next one")
+        return True
+
+    @classmethod
+    def error_result(cls, exc: Exception) -> dict:
+        """Result of a request that raised, transport errors tell if it was sent."""
         result = {
-            "response": response.json() if success else {},
-            "status_code": response.status_code,
-            "success": success,
+            "response": {},
+            "status_code": 999,
+            "error": str(exc),
+            "success": False,
         }
+        if isinstance(exc, httpx.TransportError):
+            result["network_error"] = True
+            result["sent"] = not isinstance(exc, cls.UNSENT_ERRORS)
         return result
 
+    @staticmethod
+    def response_analyze(response: httpx.Response) -> Response:
+        success = response.status_code < 400
+        # the body is decoded when its data is first read
+        return Response(
+            response.content if success else None, response.status_code, success
+        )
+
     @property
     def client(self):
         return self._client
@@ -103,9 +264,7 @@ class ProxmoxHTTPSBackend(ProxmoxHTTPBaseBackend):
 
     def connect(self):
         # logger.debug(f"Connecting to Proxmox API... {self.verify_ssl=}")
-        self._client = httpx.Client(
-            headers=self.build_headers(), http2=True, verify=self.verify_ssl
-        )
+        self._client = httpx.Client(**self.client_params())
 
     def close(self):
         if self._client:
@@ -113,15 +272,33 @@ class ProxmoxHTTPSBackend(ProxmoxHTTPBaseBackend):
             self._client = None
 
     def __enter__(self):
-        """Initialize the HTTP session for synchronous usage."""
-        self.connect()
+        """Initialize the HTTP session for synchronous usage, nested blocks share it."""
+        self.persistent.enter()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Close the HTTP session for synchronous usage."""
-        self.close()
+        """Close the HTTP session when the outermost block exits."""
+        self.persistent.exit()
         return True
 
+    def refresh_nodes(self):
+        """Learn the node addresses for node affinity, once ``start_refresh`` claimed it."""
+        response = None
+        try:
+            try:
+                response = self._client.request(
+                    "get",
+                    self.format_url(
+                        "cluster/status", base_url=self.endpoints.select().url
+                    ),
+                )
+            except Exception as exc:
+                logger.warning(f"Node affinity: {exc}")
+            self.learn_nodes(response)
+        finally:
+            # a cancelled request must not leave the refresh claimed forever
+            self.node_affinity.abort_refresh()
+
     def request(
         self,
         method: str = None,
@@ -133,37 +310,76 @@ class ProxmoxHTTPSBackend(ProxmoxHTTPBaseBackend):
         **kwargs,
     ):
         """Make a synchronous HTTP request."""
-        one_time = False
-        if not self._client:
-            self.connect()
-            logger.warning(
-                "HTTP client session is not initialized. Use 'with' context to start a session. Creating onetime client instance."
-            )
-            one_time = True
+        self.persistent.begin()
         try:
             # logger.debug(f"Request: {method=}, {url=}, {data=}, {params=}")
             try:
-                url = self.format_url(endpoint, endpoint_params)
-                response = self._client.request(method, url, data=data, params=params)
-                return self.response_analyze(response)
+                affinity_path = self.affinity_path(endpoint, endpoint_params)
+                if affinity_path and self.node_affinity.start_refresh():
+                    self.refresh_nodes()
+                tried = []
+                while True:
+                    node_endpoint = self.select_endpoint(tried, affinity_path)
+                    tried.append(node_endpoint)
+                    url = self.format_url(endpoint, endpoint_params, node_endpoint.url)
+                    try:
+                        with self.endpoints.track(node_endpoint):
+                            response = self._client.request(
+                                method, url, data=data, params=params
+                            )
+                    except httpx.TransportError as exc:
+                        if self.endpoint_failed(method, exc, node_endpoint, tried):
+                            continue
+                        raise
+                    self.endpoints.report(
+                        node_endpoint, not is_gateway_error(response.status_code)
+                    )
+                    return self.response_analyze(response)
             except Exception as exc:
-                return {
-                    "response": {},
-                    "status_code": 999,
-                    "error": str(exc),
-                    "success": False,
-                }
+                return self.error_result(exc)
+        finally:
+            self.persistent.end()
+
+    def stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Make a synchronous HTTP request, yields the body as byte chunks."""
+        self.persistent.begin()
+        try:
+            affinity_path = self.affinity_path(endpoint, endpoint_params)
+            if affinity_path and self.node_affinity.start_refresh():
+                self.refresh_nodes()
+            node_endpoint = self.select_endpoint([], affinity_path)
+            url = self.format_url(endpoint, endpoint_params, node_endpoint.url)
+            with self.endpoints.track(node_endpoint):
+                try:
+                    with self._client.stream(method, url, params=params) as response:
+                        self.endpoints.report(
+                            node_endpoint, not is_gateway_error(response.status_code)
+                        )
+                        if response.status_code >= 400:
+                            raise StreamError(
+                                f"Stream {url}: HTTP {response.status_code}",
+                                response.status_code,
+                            )
+                        yield from response.iter_bytes(self.STREAM_CHUNK_SIZE)
+                except httpx.TransportError:
+                    self.endpoints.report(node_endpoint, ok=False)
+                    raise
         finally:
-            if one_time:
-                self.close()
+            self.persistent.end()
 
 
 class ProxmoxAsyncHTTPSBackend(ProxmoxHTTPBaseBackend):
+    session_cls = AsyncPersistentSession
 
     async def connect(self):
-        self._client = httpx.AsyncClient(
-            headers=self.build_headers(), http2=True, verify=self.verify_ssl
-        )
+        self._client = httpx.AsyncClient(**self.client_params())
 
     async def close(self):
         if self._client:
@@ -171,15 +387,33 @@ class ProxmoxAsyncHTTPSBackend(ProxmoxHTTPBaseBackend):
             self._client = None
 
     async def __aenter__(self):
-        """Initialize the HTTP session for asynchronous usage."""
-        await self.connect()
+        """Initialize the HTTP session for asynchronous usage, nested blocks share it."""
+        await self.persistent.enter()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Close the HTTP session for asynchronous usage."""
-        await self.close()
+        """Close the HTTP session when the outermost block exits."""
+        await self.persistent.exit()
         return True
 
+    async def refresh_nodes(self):
+        """Learn the node addresses for node affinity, once ``start_refresh`` claimed it."""
+        response = None
+        try:
+            try:
+                response = await self._client.request(
+                    "get",
+                    self.format_url(
+                        "cluster/status", base_url=self.endpoints.select().url
+                    ),
+                )
+            except Exception as exc:
+                logger.warning(f"Node affinity: {exc}")
+            self.learn_nodes(response)
+        finally:
+            # a cancelled request must not leave the refresh claimed forever
+            self.node_affinity.abort_refresh()
+
     async def async_request(
         self,
         method: str = None,
@@ -191,29 +425,70 @@ class ProxmoxAsyncHTTPSBackend(ProxmoxHTTPBaseBackend):
         **kwargs,
     ):
         """Make an asynchronous HTTP request."""
-        one_time = False
-        if not self._client:
-            await self.connect()
-            logger.warning(
-                "HTTP client session is not initialized. Use 'with' context to start a session. Creating onetime client instance."
-            )
-            one_time = True
+        await self.persistent.begin()
         try:
             try:
-                url = self.format_url(endpoint, endpoint_params)
-                # logger.debug(f"Request: {method=}, {url=}, {data=}, {params=}")
-                response = await self._client.request(
-                    method, url, data=data, params=params
-                )
-                return self.response_analyze(response)
+                affinity_path = self.affinity_path(endpoint, endpoint_params)
+                if affinity_path and self.node_affinity.start_refresh():
+                    await self.refresh_nodes()
+                tried = []
+                while True:
+                    node_endpoint = self.select_endpoint(tried, affinity_path)
+                    tried.append(node_endpoint)
+                    url = self.format_url(endpoint, endpoint_params, node_endpoint.url)
+                    # logger.debug(f"Request: {method=}, {url=}, {data=}, {params=}")
+                    try:
+                        with self.endpoints.track(node_endpoint):
+                            response = await self._client.request(
+                                method, url, data=data, params=params
+                            )
+                    except httpx.TransportError as exc:
+                        if self.endpoint_failed(method, exc, node_endpoint, tried):
+                            continue
+                        raise
+                    self.endpoints.report(
+                        node_endpoint, not is_gateway_error(response.status_code)
+                    )
+                    return self.response_analyze(response)
             except Exception as exc:
-                return {
-                    "response": {},
-                    "status_code": 999,
-                    "error": str(exc),
-                    "success": False,
-                }
+                return self.error_result(exc)
+
+        finally:
+            self.persistent.end()
 
+    async def async_stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Make an asynchronous HTTP request, yields the body as byte chunks."""
+        await self.persistent.begin()
+        try:
+            affinity_path = self.affinity_path(endpoint, endpoint_params)
+            if affinity_path and self.node_affinity.start_refresh():
+                await self.refresh_nodes()
+            node_endpoint = self.select_endpoint([], affinity_path)
+            url = self.format_url(endpoint, endpoint_params, node_endpoint.url)
+            with self.endpoints.track(node_endpoint):
+                try:
+                    async with self._client.stream(
+                        method, url, params=params
+                    ) as response:
+                        self.endpoints.report(
+                            node_endpoint, not is_gateway_error(response.status_code)
+                        )
+                        if response.status_code >= 400:
+                            raise StreamError(
+                                f"Stream {url}: HTTP {response.status_code}",
+                                response.status_code,
+                            )
+                        async for chunk in response.aiter_bytes(self.STREAM_CHUNK_SIZE):
+                            yield chunk
+                except httpx.TransportError:
+                    self.endpoints.report(node_endpoint, ok=False)
+                    raise
         finally:
-            if one_time:
-                await self.close()
+            self.persistent.end()
@@ -1,9 +1,14 @@
+import importlib
+import logging
+import sys
 from collections import namedtuple
 from enum import StrEnum
 from typing import TypeVar, Type
 
 from ext_api.backends.backend_abstract import ProxmoxBackend
 
+logger = logging.getLogger(f"CT.{__name__}")
+
 T = TypeVar("T", bound=ProxmoxBackend)
 
 BackendKey = namedtuple("BackendKey", ["name", "backend_type"])
@@ -15,16 +20,39 @@ class BackendType(StrEnum):
 
 
 class BackendRegistry:
-    registered_backends: dict[BackendKey, Type[T]] = {}
+    """
+    Backend classes by name and type.
+
+    A backend may be registered by its import path (``"module:Class"``), the
+    module and its dependencies are imported when the backend is first used.
+    """
+
+    registered_backends: dict[BackendKey, Type[T] | str] = {}
 
     @classmethod
     def register_backend(
-        cls, name: str, backend_type: BackendType, backend_cls: Type[T]
+        cls, name: str, backend_type: BackendType, backend_cls: Type[T] | str
     ):
-        """Register a backend class."""
+        """Register a backend class, or its ``"module:Class"`` import path."""
         key = BackendKey(name, backend_type)
         cls.registered_backends[key] = backend_cls
 
+    @classmethod
+    def _resolve(cls, key: BackendKey) -> Type[T] | None:
+        backend_cls = cls.registered_backends.get(key)
+        if not isinstance(backend_cls, str):
+            return backend_cls
+        module_name, _, class_name = backend_cls.partition(":")
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            logger.error(f"Failed to import {key.name} {key.backend_type} backend: {e}")
+            raise ImportError(
+                f"The {key.name} backend requires a missing module: {e}"
+            ) from e
+        backend_cls = cls.registered_backends[key] = getattr(module, class_name)
+        return backend_cls
+
     @classmethod
     def unregister_backend(cls, name: str, backend_type: BackendType):
         """Unregister a backend class."""
@@ -36,8 +64,7 @@ class BackendRegistry:
         cls, name: str, backend_type: BackendType = BackendType.SYNC
     ) -> Type[T]:
         """Retrieve a registered backend class by name."""
-        key = BackendKey(name, backend_type)
-        return cls.registered_backends.get(key)
+        return cls._resolve(BackendKey(name, backend_type))
 
     @classmethod
     def get_backends_names(cls):
@@ -57,7 +84,12 @@ class BackendRegistry:
 
     @classmethod
     def get_name_type(cls, backend) -> tuple[str, BackendType] | tuple[None, None]:
-        for key, value in cls.registered_backends.items():
+        for key, value in list(cls.registered_backends.items()):
+            if isinstance(value, str):
+                if value.partition(":")[0] not in sys.modules:
+                    # no instance of a class that was never imported
+                    continue
+                value = cls._resolve(key)
             if isinstance(backend, value):
                 return (key.name, key.backend_type)
         return None, None
@@ -1,26 +1,27 @@
-import json
+import asyncio
 import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
 
-logger = logging.getLogger(f"CT.{__name__}")
-
-try:
-    import paramiko  # for Sync SSH
-except ImportError as e:
-    logger.error(f"SSH Backend require load module: {e}")
-    exit(1)
-try:
-    import asyncssh  # for Async SSH
-except ImportError as e:
-    logger.error(f"Async SSH Backend require load module: {e}")
-    exit(1)
-
+import asyncssh  # for Async SSH
+import paramiko  # for Sync SSH
 
+from ext_api.backends.backend_abstract import StreamError
 from ext_api.backends.backend_cli import (
     ProxmoxCLIBaseBackend,
 )
+from ext_api.backends.batch_session import AsyncBatchSession, BatchSession
+from ext_api.backends.session import AsyncPersistentSession, PersistentSession
+from ext_api.backends.ssh_pool import AsyncSSHConnectionPool, SSHConnectionPool
+
+logger = logging.getLogger(f"CT.{__name__}")
 
 
 class ProxmoxSSHBaseBackend(ProxmoxCLIBaseBackend):
+    LOG_PREFIX = "SSH"
+    session_cls = PersistentSession
+
     def __init__(
         self,
         hostname: str,
@@ -30,9 +31,23 @@ class ProxmoxSSHBaseBackend(ProxmoxCLIBaseBackend):
         agent: bool = False,
         disable_host_key_checking: bool = False,
         port: int = 22,
+        pool_size: int = 2,
+        max_channels: int = 8,
+        batch: bool = False,
+        session_idle_timeout: float = 300.0,
         *args,
         **kwargs,
     ):
+        """
+        Args:
+            pool_size (int): SSH connections opened on demand inside a session.
+            max_channels (int): Concurrent channels (commands) per connection,
+                keep it below ``MaxSessions`` of the server sshd.
+            batch (bool): Answer GET requests by one long-lived helper process per
+                connection instead of a ``pvesh`` process per request.
+            session_idle_timeout (float): Seconds the connections opened by a
+                request outside ``with`` are kept without requests, 0 keeps them open.
+        """
         super().__init__(*args, **kwargs)
         self.hostname: str = hostname
         self.port: int = port or 22
@@ -41,62 +56,45 @@ class ProxmoxSSHBaseBackend(ProxmoxCLIBaseBackend):
         self.key_filename: str = key_filename
         self.agent: bool = agent
         self.disable_host_key_checking: bool = disable_host_key_checking
+        self.pool_size: int = pool_size or 2
+        self.max_channels: int = max_channels or 8
         self._client: (
             paramiko.client.SSHClient | asyncssh.SSHClientConnection | None
         ) = None
+        self._pool: SSHConnectionPool | AsyncSSHConnectionPool | None = None
+        self.batch: bool = batch
+        # batch helper per SSH connection, dropped when the pool discards it
+        self._batch_sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.persistent = self.session_cls(self, session_idle_timeout)
         if disable_host_key_checking:
             logger.warning(
                 "SSH host key checking is disabled. This is not recommended for production use."
             )
 
-    @staticmethod
-    def result_analyze(output, error, exit_status) -> dict:
-        success = exit_status == 0
-        if error:
-            if hasattr(error, "decode"):
-                error = error.decode().strip()
-            logger.debug(f"SSH Error: {repr(error)}")
-        if hasattr(output, "decode"):
-            output = output.decode()
-        decoded = output.strip() if isinstance(output, str) else output
-        if not decoded:
-            return {
-                "response": {"data": {}},
-                "status_code": exit_status,
-                "success": success,
-                "error": error,
-            }
-        try:
-            json.loads(decoded)
-        except json.JSONDecodeError:
-            logger.debug(
-                f"SSH Error of decode JSON result: {decoded.splitlines()[-1]}..."
-            )
-            return {
-                "response": {"data": decoded.splitlines()[-1]},
-                "status_code": exit_status,
-                "success": success,
-            }
-        return {
-            "response": {"data": json.loads(decoded)},
-            "status_code": exit_status,
-            "success": success,
-        }
-
     @property
     def client(self):
         return self._client
 
+    @property
+    def pool(self):
+        return self._pool
+
+    def host_of(self, endpoint: str = None, endpoint_params: dict = None) -> str:
+        return self.hostname
+
 
 class ProxmoxSSHBackend(ProxmoxSSHBaseBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._batch_lock = threading.Lock()
 
-    def connect(self):
-        self._client = paramiko.SSHClient()
+    def open_client(self) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
         if self.disable_host_key_checking:
-            self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self._client.preferred_keys = ["ssh-ed25519", "ssh-rsa"]
-        self._client.load_system_host_keys()
-        self._client.connect(
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.preferred_keys = ["ssh-ed25519", "ssh-rsa"]
+        client.load_system_host_keys()
+        client.connect(
             self.hostname,
             port=self.port,
             username=self.username,
@@ -104,24 +102,75 @@ class ProxmoxSSHBackend(ProxmoxSSHBaseBackend):
             key_filename=self.key_filename or None,
         )
 
-        self.show_host_key(self._client)
-
         if self.agent:
             # use System Agent
-            s = self._client.get_transport().open_session()
+            s = client.get_transport().open_session()
             paramiko.agent.AgentRequestHandler(s)
+        return client
+
+    @staticmethod
+    def client_is_alive(client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def connect(self):
+        self._pool = SSHConnectionPool(
+            self.open_client,
+            is_alive=self.client_is_alive,
+            close=self.discard_client,
+            size=self.pool_size,
+            max_channels=self.max_channels,
+        )
+        self._client = self._pool.start()
+        self.show_host_key(self._client)
+
+    def discard_client(self, client: paramiko.SSHClient):
+        """Close a connection the pool discarded, with its batch helper."""
+        with self._batch_lock:
+            batch_session = self._batch_sessions.pop(client, None)
+        if batch_session is not None:
+            batch_session.close()
+        client.close()
 
     def close(self):
-        if self._client:
+        sessions, self._batch_sessions = (
+            self._batch_sessions,
+            weakref.WeakKeyDictionary(),
+        )
+        for batch_session in list(sessions.values()):
+            batch_session.close()
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+        elif self._client:
             self._client.close()
-            self._client = None
+        self._client = None
+
+    def batch_session(self, client: paramiko.SSHClient) -> BatchSession:
+        """The batch helper of the connection, started on first use."""
+        with self._batch_lock:
+            batch_session = self._batch_sessions.get(client)
+            if batch_session is None or batch_session.closed:
+                batch_session = BatchSession.over_ssh(client)
+                self._batch_sessions[client] = batch_session
+            return batch_session
+
+    @contextmanager
+    def session(self):
+        """Hold a channel of the connection pool, yields the SSH client."""
+        if self._pool is None:
+            # client assigned without connect()
+            yield self._client
+            return
+        with self._pool.acquire() as client:
+            yield client
 
     def __enter__(self):
-        self.connect()
+        self.persistent.enter()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        self.persistent.exit()
         return True
 
     def request(
@@ -133,26 +182,80 @@ class ProxmoxSSHBackend(ProxmoxSSHBaseBackend):
         endpoint_params: dict = None,
         **kwargs,
     ):
-        one_time = False
-        if not self._client:
-            self.connect()
-            logger.warning(
-                "SSH client session is not initialized. Use 'with' context to start a session. Creating onetime client instance."
-            )
-            one_time = True
         command = self.format_command(endpoint, params, method, data, endpoint_params)
+        batch_path = self.batch_path(method, endpoint, endpoint_params)
+        sent = False
+        try:
+            self.persistent.begin()
+        except Exception as e:
+            logger.debug(f"SSH Error: {e}")
+            return {
+                "response": {},
+                "status_code": 1,
+                "error": str(e),
+                "success": False,
+                "network_error": True,
+                "sent": False,
+            }
         try:
             if not command:
                 raise ValueError("SSH command is empty")
-            stdin, stdout, stderr = self._client.exec_command(command)
-        except Exception as e:
+            with self.session() as client:
+                if batch_path:
+                    batch_session = self.batch_session(client)
+                    sent = True
+                    return batch_session.request(batch_path, params)
+                stdin, stdout, stderr = client.exec_command(command)
+                sent = True
+                # read before the exit status, a full channel window blocks the command
+                output, error = stdout.read(), stderr.read()
+                exit_status = stdout.channel.recv_exit_status()
+        except ValueError as e:
             logger.debug(f"SSH Error: {e}")
             return {"response": {}, "status_code": 1, "error": str(e), "success": False}
+        except Exception as e:
+            logger.debug(f"SSH Error: {e}")
+            return {
+                "response": {},
+                "status_code": 1,
+                "error": str(e),
+                "success": False,
+                "network_error": True,
+                "sent": sent,
+            }
+        finally:
+            self.persistent.end()
+        return self.result_analyze(output, error, exit_status)
+
+    def stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Run ``pvesh`` over SSH, yields its output as byte chunks."""
+        command = self.format_command(endpoint, params, method, None, endpoint_params)
+        if not command:
+            raise StreamError(f"Stream {method} {endpoint}: unsupported request")
+        self.persistent.begin()
+        try:
+            with self.session() as client:
+                stdin, stdout, stderr = client.exec_command(command)
+                channel = stdout.channel
+                try:
+                    while chunk := channel.recv(self.STREAM_CHUNK_SIZE):
+                        yield chunk
+                    exit_status = channel.recv_exit_status()
+                    if exit_status != 0:
+                        raise StreamError(
+                            f"Stream {command}: exit status {exit_status}", exit_status
+                        )
+                finally:
+                    channel.close()
         finally:
-            if one_time:
-                self.close()
-        exit_status = stdout.channel.recv_exit_status()
-        return self.result_analyze(stdout.read(), stderr.read(), exit_status)
+            self.persistent.end()
 
     def show_host_key(self, client):
         if self.disable_host_key_checking:
@@ -168,8 +271,9 @@ class ProxmoxSSHBackend(ProxmoxSSHBaseBackend):
 
 
 class ProxmoxAsyncSSHBackend(ProxmoxSSHBaseBackend):
+    session_cls = AsyncPersistentSession
 
-    async def connect(self):
+    async def open_client(self) -> asyncssh.SSHClientConnection:
         params = {
             "host": self.hostname,
             "username": self.username,
@@ -183,23 +287,90 @@ class ProxmoxAsyncSSHBackend(ProxmoxSSHBaseBackend):
             params["known_hosts"] = None
             params["server_host_key_algs"] = ["ssh-ed25519", "ssh-rsa"]
 
-        self._client = await asyncssh.connect(**params)
+        return await asyncssh.connect(**params)
+
+    @staticmethod
+    async def close_client(client: asyncssh.SSHClientConnection):
+        client.close()
+        await client.wait_closed()
 
+    async def connect(self):
+        self._pool = AsyncSSHConnectionPool(
+            self.open_client,
+            is_alive=lambda client: not client.is_closed(),
+            close=self.discard_client,
+            size=self.pool_size,
+            max_channels=self.max_channels,
+        )
+        self._client = await self._pool.start()
         self.show_host_key(self._client)
 
+    @staticmethod
+    async def close_batch_session(batch_session: AsyncBatchSession | asyncio.Task):
+        if isinstance(batch_session, asyncio.Task):
+            batch_session.cancel()
+        else:
+            await batch_session.close()
+
+    async def discard_client(self, client: asyncssh.SSHClientConnection):
+        """Close a connection the pool discarded, with its batch helper."""
+        batch_session = self._batch_sessions.pop(client, None)
+        if batch_session is not None:
+            await self.close_batch_session(batch_session)
+        await self.close_client(client)
+
     async def close(self):
-        if self._client:
-            self._client.close()
-            await self._client.wait_closed()
-            self._client = None
+        sessions, self._batch_sessions = (
+            self._batch_sessions,
+            weakref.WeakKeyDictionary(),
+        )
+        for batch_session in list(sessions.values()):
+            await self.close_batch_session(batch_session)
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+        elif self._client:
+            await self.close_client(self._client)
+        self._client = None
+
+    async def batch_session(
+        self, client: asyncssh.SSHClientConnection
+    ) -> AsyncBatchSession:
+        """The batch helper of the connection, started on first use."""
+        batch_session = self._batch_sessions.get(client)
+        if isinstance(batch_session, asyncio.Task):
+            return await asyncio.shield(batch_session)
+        if batch_session is None or batch_session.closed:
+            # concurrent first requests wait for the same helper
+            starting = asyncio.ensure_future(AsyncBatchSession.over_ssh(client))
+            self._batch_sessions[client] = starting
+            try:
+                batch_session = await asyncio.shield(starting)
+            except BaseException:
+                if self._batch_sessions.get(client) is starting:
+                    self._batch_sessions.pop(client, None)
+                raise
+            if self._batch_sessions.get(client) is starting:
+                self._batch_sessions[client] = batch_session
+        return batch_session
+
+    @asynccontextmanager
+    async def session(self):
+        """Hold a channel of the connection pool, yields the SSH connection."""
+        if self._pool is None:
+            # connection assigned without connect()
+            yield self._client
+            return
+        async with self._pool.acquire() as client:
+            yield client
 
     async def __aenter__(self):
         # Setup async SSH context
-        await self.connect()
+        await self.persistent.enter()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.close()
+        await self.persistent.exit()
         return True
 
     async def async_request(
@@ -212,25 +383,77 @@ class ProxmoxAsyncSSHBackend(ProxmoxSSHBaseBackend):
         **kwargs,
     ):
         # Implement async SSH command execution here
-        one_time = False
-        if not self._client:
-            await self.connect()
-            logger.warning(
-                "Async SSH client session is not initialized. Use 'with' context to start a session. Creating onetime client instance."
-            )
-            one_time = True
-
         command = self.format_command(endpoint, params, method, data, endpoint_params)
+        batch_path = self.batch_path(method, endpoint, endpoint_params)
+        sent = False
         try:
-            result = await self._client.run(command, check=True)
+            await self.persistent.begin()
+        except (OSError, asyncssh.Error) as e:
+            logger.debug(f"Async SSH Error: {e}")
+            return {
+                "response": {},
+                "status_code": 1,
+                "error": str(e),
+                "success": False,
+                "network_error": True,
+                "sent": False,
+            }
+        try:
+            async with self.session() as client:
+                if batch_path:
+                    batch_session = await self.batch_session(client)
+                    sent = True
+                    return await batch_session.request(batch_path, params)
+                # a channel that could not be opened never ran the command
+                sent = True
+                result = await client.run(command, check=True)
         except asyncssh.ProcessError as e:
             logger.debug(f"Async SSH Error: {e}")
             return {"response": {}, "status_code": e.exit_status, "error": e.stderr}
+        except (ConnectionError, asyncssh.Error) as e:
+            logger.debug(f"Async SSH Error: {e}")
+            return {
+                "response": {},
+                "status_code": 1,
+                "error": str(e),
+                "success": False,
+                "network_error": True,
+                "sent": sent and not isinstance(e, asyncssh.ChannelOpenError),
+            }
         finally:
-            if one_time:
-                await self.close()
+            self.persistent.end()
         return self.result_analyze(result.stdout, result.stderr, result.exit_status)
 
+    async def async_stream(
+        self,
+        method: str = None,
+        endpoint: str = None,
+        params: dict = None,
+        endpoint_params: dict = None,
+        **kwargs,
+    ):
+        """Run ``pvesh`` over SSH, yields its output as byte chunks."""
+        command = self.format_command(endpoint, params, method, None, endpoint_params)
+        if not command:
+            raise StreamError(f"Stream {method} {endpoint}: unsupported request")
+        await self.persistent.begin()
+        try:
+            async with self.session() as client:
+                process = await client.create_process(command, encoding=None)
+                try:
+                    while chunk := await process.stdout.read(self.STREAM_CHUNK_SIZE):
+                        yield chunk
+                    await process.wait_closed()
+                    if process.exit_status:
+                        raise StreamError(
+                            f"Stream {command}: exit status {process.exit_status}",
+                            process.exit_status,
+                        )
+                finally:
+                    process.close()
+        finally:
+            self.persistent.end()
+
     def show_host_key(self, client):
         if self.disable_host_key_checking:
             host_key = client.get_server_host_key()
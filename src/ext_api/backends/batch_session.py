@@ -0,0 +1,373 @@
+import asyncio
+import inspect
+import json
+import logging
+import shlex
+import subprocess
+import threading
+from concurrent.futures import Future
+from itertools import count
+from typing import Any, Awaitable, Callable
+
+from ext_api.backends import json_codec
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+"""
+Batch sessions of the CLI and SSH backends.
+
+A long-lived helper process, per SSH connection or as local worker of the CLI
+backend, loads the Proxmox API modules once and answers GET requests read as
+newline delimited JSON from stdin:
+
+    {"id": 1, "path": "nodes/pve1/status", "params": {}}
+    {"id": 1, "ok": true, "data": {...}, "error": null}
+
+Requests carry an id, so any number of them can be written before the answers
+are read (pipelining). Requests of a node-scoped path for another cluster node
+are passed to ``pvesh``, which proxies them to that node.
+"""
+
+HELPER_SCRIPT = r"""
+use strict;
+use warnings;
+use JSON;
+use PVE::API2;
+use PVE::Cluster;
+use PVE::INotify;
+use PVE::RPCEnvironment;
+
+open(my $out, '>&', \*STDOUT) or die "dup stdout: $!\n";
+$out->autoflush(1);
+open(STDOUT, '>', '/dev/null');
+open(STDERR, '>', '/dev/null');
+
+PVE::RPCEnvironment->setup_default_cli_env();
+my $nodename = PVE::INotify::nodename();
+my $json = JSON->new->utf8->allow_nonref->allow_blessed->convert_blessed;
+
+sub pvesh_get {
+    my ($path, $param) = @_;
+    my @cmd = ('pvesh', 'get', $path, (map { "--$_=$param->{$_}" } sort keys %$param),
+        '--output-format=json');
+    open(my $fh, '-|', @cmd) or die "pvesh: $!\n";
+    my $output = do { local $/; <$fh> };
+    close($fh) or die "pvesh exited with status " . ($? >> 8) . "\n";
+    return defined($output) && $output =~ /\S/ ? $json->decode($output) : undef;
+}
+
+while (my $line = <STDIN>) {
+    my $req = eval { $json->decode($line) };
+    next if ref($req) ne 'HASH';
+    my $path = $req->{path} // '';
+    my $param = $req->{params} // {};
+    my $data = eval {
+        PVE::Cluster::cfs_update();
+        my $uri_param = {};
+        my ($handler, $info) = PVE::API2->find_handler('GET', $path, $uri_param);
+        die "no 'GET' handler for '$path'\n" if !$handler || !$info;
+        my $p = { %$param, %$uri_param };
+        if (my $proxyto = $info->{proxyto}) {
+            my $node = $p->{$proxyto};
+            return pvesh_get($path, $param)
+                if defined($node) && $node ne 'localhost' && $node ne $nodename;
+        }
+        $handler->handle($info, $p);
+    };
+    my $err = $@;
+    print $out $json->encode({
+        id => $req->{id},
+        ok => $err ? JSON::false : JSON::true,
+        data => $err ? undef : $data,
+        error => $err ? "$err" : undef,
+    }), "\n";
+}
+"""
+
+HELPER_ARGS = ["perl", "-e", HELPER_SCRIPT]
+HELPER_COMMAND = shlex.join(HELPER_ARGS)
+
+
+class BatchSessionBase:
+    """Request ids and answer routing shared by the sync and async sessions."""
+
+    def __init__(self):
+        self._ids = count(1)
+        self._pending: dict[int, Any] = {}
+        self.closed = False
+        self.requests = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def encode(req_id: int, path: str, params: dict = None) -> bytes:
+        params = {
+            k: str(int(v)) if isinstance(v, bool) else str(v)
+            for k, v in (params or {}).items()
+        }
+        return (
+            json.dumps({"id": req_id, "path": path, "params": params}).encode() + b"\n"
+        )
+
+    def _answer(self, line: bytes) -> tuple[Any, dict] | None:
+        try:
+            answer = json_codec.loads(line)
+        except ValueError:
+            logger.debug(f"Batch session: unexpected output {line[:200]!r}")
+            return None
+        waiter = self._pending.pop(answer.get("id"), None)
+        return (waiter, answer) if waiter is not None else None
+
+    def _drain(self) -> list:
+        self.closed = True
+        waiters, self._pending = list(self._pending.values()), {}
+        return waiters
+
+    @staticmethod
+    def result(answer: dict) -> dict:
+        if answer.get("ok"):
+            data = answer.get("data")
+            return {
+                "response": {"data": {} if data is None else data},
+                "status_code": 0,
+                "success": True,
+            }
+        return {
+            "response": {},
+            "status_code": 1,
+            "error": (answer.get("error") or "").strip(),
+            "success": False,
+        }
+
+
+class BatchSession(BatchSessionBase):
+    """
+    Helper process behind a pair of binary streams, shared by any number of threads.
+
+    ``over_ssh`` starts the helper in a channel of a paramiko client, ``spawn``
+    as local process.
+    """
+
+    def __init__(self, stdin, stdout, close: Callable[[], Any]):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._stdin = stdin
+        self._stdout = stdout
+        self._close = close
+        self._reader = threading.Thread(
+            target=self._read, name="batch-session-reader", daemon=True
+        )
+        self._reader.start()
+
+    @classmethod
+    def over_ssh(cls, client, command: str = HELPER_COMMAND) -> "BatchSession":
+        channel = client.get_transport().open_session()
+        channel.exec_command(command)
+        return cls(channel.makefile_stdin("wb"), channel.makefile("rb"), channel.close)
+
+    @classmethod
+    def spawn(cls, args: list[str] = None) -> "BatchSession":
+        process = subprocess.Popen(
+            args or HELPER_ARGS,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+        def close():
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+        return cls(process.stdin, process.stdout, close)
+
+    def _read(self):
+        try:
+            for line in self._stdout:
+                with self._lock:
+                    answered = self._answer(line)
+                if answered:
+                    future, answer = answered
+                    future.set_result(answer)
+        except Exception as e:
+            logger.debug(f"Batch session reader: {e}")
+        finally:
+            with self._lock:
+                waiters = self._drain()
+            for future in waiters:
+                future.set_exception(ConnectionError("Batch helper exited"))
+
+    def request(self, path: str, params: dict = None, timeout: float = None) -> dict:
+        future = Future()
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("Batch helper is not running")
+            req_id = next(self._ids)
+            self._pending[req_id] = future
+            self.requests += 1
+            try:
+                self._stdin.write(self.encode(req_id, path, params))
+                self._stdin.flush()
+            except (OSError, ValueError) as e:
+                self._pending.pop(req_id, None)
+                raise ConnectionError(f"Batch helper is not running: {e}") from e
+        return self.result(future.result(timeout))
+
+    def close(self):
+        self.closed = True
+        try:
+            self._close()
+        except Exception as e:
+            logger.debug(f"Batch session close: {e}")
+
+
+class AsyncBatchSession(BatchSessionBase):
+    """
+    Helper process behind a pair of async streams, shared by the tasks of one loop.
+
+    ``over_ssh`` starts the helper on an asyncssh connection, ``spawn`` as local
+    process.
+    """
+
+    def __init__(self, stdin, stdout, close: Callable[[], Any | Awaitable[Any]]):
+        super().__init__()
+        self._stdin = stdin
+        self._stdout = stdout
+        self._close = close
+        self._reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def over_ssh(
+        cls, connection, command: str = HELPER_COMMAND
+    ) -> "AsyncBatchSession":
+        process = await connection.create_process(command, encoding=None)
+        return cls(process.stdin, process.stdout, process.close)
+
+    @classmethod
+    async def spawn(cls, args: list[str] = None) -> "AsyncBatchSession":
+        process = await asyncio.create_subprocess_exec(
+            *(args or HELPER_ARGS),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+        async def close():
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+        return cls(process.stdin, process.stdout, close)
+
+    async def _read(self):
+        try:
+            while line := await self._stdout.readline():
+                answered = self._answer(line)
+                if answered:
+                    future, answer = answered
+                    if not future.done():
+                        future.set_result(answer)
+        except Exception as e:
+            logger.debug(f"Async batch session reader: {e}")
+        finally:
+            for future in self._drain():
+                if not future.done():
+                    future.set_exception(ConnectionError("Batch helper exited"))
+
+    async def request(self, path: str, params: dict = None) -> dict:
+        if self.closed:
+            raise ConnectionError("Batch helper is not running")
+        req_id = next(self._ids)
+        future = self._pending[req_id] = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        try:
+            try:
+                self._stdin.write(self.encode(req_id, path, params))
+                await self._stdin.drain()
+            except (OSError, ValueError) as e:
+                raise ConnectionError(f"Batch helper is not running: {e}") from e
+            return self.result(await future)
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def close(self):
+        self.closed = True
+        try:
+            result = self._close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.debug(f"Async batch session close: {e}")
+        self._reader.cancel()
+
+
+class BatchWorkerPool:
+    """
+    Up to ``size`` local helper processes started on demand.
+
+    A request goes to the helper with the fewest requests in flight, a new one
+    is started while every helper is busy and the pool is not full. Helpers that
+    exited are replaced.
+    """
+
+    def __init__(self, size: int = 2, args: list[str] = None):
+        self.size = max(int(size), 1)
+        self.args = args or HELPER_ARGS
+        self.sessions: list[BatchSession] = []
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def _session(self) -> BatchSession:
+        with self._lock:
+            self.sessions = [s for s in self.sessions if not s.closed]
+            if len(self.sessions) < self.size and all(s.pending for s in self.sessions):
+                self.sessions.append(BatchSession.spawn(self.args))
+                self.started += 1
+            return min(self.sessions, key=lambda s: s.pending)
+
+    def request(self, path: str, params: dict = None) -> dict:
+        return self._session().request(path, params)
+
+    def close(self):
+        with self._lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            session.close()
+
+
+class AsyncBatchWorkerPool:
+    """``BatchWorkerPool`` for the tasks of one event loop."""
+
+    def __init__(self, size: int = 2, args: list[str] = None):
+        self.size = max(int(size), 1)
+        self.args = args or HELPER_ARGS
+        self.sessions: list[AsyncBatchSession] = []
+        self.started = 0
+        self._lock: asyncio.Lock | None = None
+
+    async def _session(self) -> AsyncBatchSession:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self.sessions = [s for s in self.sessions if not s.closed]
+            if len(self.sessions) < self.size and all(s.pending for s in self.sessions):
+                self.sessions.append(await AsyncBatchSession.spawn(self.args))
+                self.started += 1
+            return min(self.sessions, key=lambda s: s.pending)
+
+    async def request(self, path: str, params: dict = None) -> dict:
+        session = await self._session()
+        return await session.request(path, params)
+
+    async def close(self):
+        sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            await session.close()
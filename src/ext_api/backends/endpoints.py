@@ -0,0 +1,207 @@
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import count
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("CT.{__name__}")
+
+# pveproxy answers 500 to application errors of a healthy node (VM locked,
+# already exists, failed config check), only gateway errors tell it is unhealthy
+GATEWAY_ERRORS = frozenset({502, 503, 504})
+
+
+def is_gateway_error(status_code: int | None) -> bool:
+    """Whether an HTTP status tells the server is unhealthy, not the request wrong."""
+    return status_code in GATEWAY_ERRORS
+
+
+@dataclass(eq=False)
+class Endpoint:
+    """One API endpoint (``https://node:8006``) and its health."""
+
+    url: str
+    outstanding: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+    requests: int = 0
+
+    def is_up(self, now: float) -> bool:
+        return self.down_until <= now
+
+
+class EndpointPool:
+    """
+    API endpoints of the cluster nodes with load distribution and failover.
+
+    ``select`` picks one of the healthy endpoints, either in turn
+    (``round_robin``) or the one with the fewest requests in flight
+    (``least_outstanding``). After ``max_failures`` consecutive failures an
+    endpoint is taken out of rotation for ``cooldown`` seconds, when every
+    endpoint is down the one that comes back first is used. Safe to use from
+    threads and from async tasks.
+    """
+
+    STRATEGIES = ("round_robin", "least_outstanding")
+
+    def __init__(
+        self,
+        urls: list[str],
+        strategy: str = "round_robin",
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+    ):
+        if not urls:
+            raise ValueError("EndpointPool: at least one endpoint URL is required")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(
+                f"Unsupported endpoint strategy: {strategy}, available: {self.STRATEGIES}"
+            )
+        self.endpoints = [Endpoint(url.rstrip("/")) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max(int(max_failures), 1)
+        self.cooldown = float(cooldown)
+        self._counter = count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    @staticmethod
+    def parse_urls(base_url: str | list[str] | None) -> list[str]:
+        """Accept a list of URLs or a comma separated string (env overrides)."""
+        if not base_url:
+            return []
+        if isinstance(base_url, str):
+            base_url = base_url.split(",")
+        return [url.strip() for url in base_url if url and url.strip()]
+
+    def select(self, exclude: list[Endpoint] = ()) -> Endpoint:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in exclude] or list(
+                self.endpoints
+            )
+            healthy = [e for e in candidates if e.is_up(now)]
+            if not healthy:
+                return min(candidates, key=lambda e: e.down_until)
+            turn = next(self._counter)
+            if self.strategy == "least_outstanding":
+                least = min(e.outstanding for e in healthy)
+                healthy = [e for e in healthy if e.outstanding == least]
+            return healthy[turn % len(healthy)]
+
+    @contextmanager
+    def track(self, endpoint: Endpoint):
+        """Count the request as outstanding on the endpoint while it runs."""
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        try:
+            yield endpoint
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def report(self, endpoint: Endpoint, ok: bool):
+        with self._lock:
+            if ok:
+                endpoint.failures = 0
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures and endpoint.is_up(
+                time.monotonic()
+            ):
+                endpoint.down_until = time.monotonic() + self.cooldown
+                logger.warning(
+                    f"API endpoint {endpoint.url} taken out of rotation for {self.cooldown}s "
+                    f"after {endpoint.failures} failures"
+                )
+
+
+class NodeAffinity:
+    """
+    API endpoints of the individual cluster nodes, learned from ``/cluster/status``.
+
+    Requests to ``nodes/{node}/...`` can be sent straight to the node instead of
+    being proxied by pveproxy of the entry node. The node addresses are kept for
+    ``ttl`` seconds, a node that failed is left out until the next refresh.
+    """
+
+    NODE_PATH = re.compile(r"^/?nodes/([^/]+)/")
+
+    def __init__(self, base_url: str, ttl: float = 300.0):
+        parts = urlsplit(base_url or "")
+        self.scheme = parts.scheme or "https"
+        self.port = parts.port
+        self.ttl = float(ttl)
+        self.nodes: dict[str, Endpoint] = {}
+        self.loaded_at: float | None = None
+        self.refreshing = False
+        self._lock = threading.Lock()
+
+    def node_of(self, path: str) -> str | None:
+        match = self.NODE_PATH.match(path or "")
+        return match.group(1) if match else None
+
+    def is_stale(self) -> bool:
+        """True when the addresses should be refreshed and nobody is doing it yet."""
+        if self.refreshing:
+            return False
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def start_refresh(self) -> bool:
+        """
+        Claim the refresh of stale addresses, True for the one caller that must
+        fetch ``/cluster/status`` and hand it to ``learn``.
+        """
+        with self._lock:
+            if not self.is_stale():
+                return False
+            self.refreshing = True
+            return True
+
+    def abort_refresh(self):
+        """Release a claim that did not reach ``learn``, the next request refreshes."""
+        with self._lock:
+            self.refreshing = False
+
+    def node_url(self, address: str) -> str:
+        if ":" in address:
+            address = f"[{address}]"
+        port = f":{self.port}" if self.port else ""
+        return f"{self.scheme}://{address}{port}"
+
+    def learn(self, cluster_status: list[dict] | None):
+        """
+        Update the node addresses from the data of ``/cluster/status``,
+        ``None`` (the request failed) keeps the known ones until the next refresh.
+        """
+        with self._lock:
+            self.refreshing = False
+            self.loaded_at = time.monotonic()
+        if cluster_status is None:
+            return
+        nodes = {}
+        for item in cluster_status or []:
+            if item.get("type") != "node" or not item.get("ip"):
+                continue
+            if not item.get("online", 1):
+                continue
+            url = self.node_url(item["ip"])
+            known = self.nodes.get(item.get("name"))
+            nodes[item.get("name")] = (
+                known if known and known.url == url else Endpoint(url)
+            )
+        self.nodes = nodes
+        logger.debug(f"Node affinity: {({n: e.url for n, e in nodes.items()})}")
+
+    def endpoint_for(self, path: str) -> Endpoint | None:
+        node = self.node_of(path)
+        endpoint = self.nodes.get(node) if node else None
+        if endpoint is None or not endpoint.is_up(time.monotonic()):
+            return None
+        return endpoint
@@ -0,0 +1,194 @@
+"""
+JSON decoding shared by all backends.
+
+Bodies are parsed once, straight from the bytes received, with the fastest
+library installed: orjson, msgspec or the standard library. Install one of them
+(``pip install orjson``, or the ``fast-json`` extra) to speed up large responses
+such as ``/cluster/resources``.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Callable
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+LIBRARIES = ("orjson", "msgspec", "json")
+
+
+def _orjson() -> Callable[[bytes | str], Any]:
+    import orjson
+
+    return orjson.loads
+
+
+def _msgspec() -> Callable[[bytes | str], Any]:
+    import msgspec
+
+    decode = msgspec.json.Decoder().decode
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return loads
+
+
+def _json() -> Callable[[bytes | str], Any]:
+    return json.loads
+
+
+_LOADERS = {"orjson": _orjson, "msgspec": _msgspec, "json": _json}
+
+library: str = "json"
+_loads: Callable[[bytes | str], Any] = json.loads
+
+
+def use(name: str | None = None) -> str:
+    """
+    Select the JSON library, the first installed one of ``LIBRARIES`` by default.
+
+    Returns:
+        str: Name of the library in use.
+    """
+    global library, _loads
+    for candidate in (name,) if name else LIBRARIES:
+        if candidate not in _LOADERS:
+            raise ValueError(f"Unsupported JSON library: {candidate}")
+        try:
+            _loads = _LOADERS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        library = candidate
+        break
+    logger.debug(f"JSON decoding with {library}")
+    return library
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse a JSON document, raises ``ValueError`` on invalid input."""
+    return _loads(data)
+
+
+class JSONArrayStream:
+    """
+    Incremental parser of the items of a JSON array.
+
+    Byte chunks are fed as they arrive and every complete item is parsed on its
+    own, so memory stays at the size of one item plus one chunk. The array is the
+    body itself (``pvesh``) or the ``data`` value of the top-level object
+    (``{"data": [...]}`` of the HTTPS API). A body without that array is kept
+    and ``close`` returns it as a single item.
+    """
+
+    STRUCTURE = re.compile(rb'["\[\]{},]')
+    STRING = re.compile(rb'["\\]')
+    DATA_KEY = re.compile(rb'"data"\s*:\s*\Z')
+
+    def __init__(self):
+        self._buffer = b""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._array_depth: int | None = None
+        self._item_start = 0
+        self.done = False
+        self.items = 0
+
+    def feed(self, chunk: bytes) -> list:
+        """Add a chunk, returns the items it completed."""
+        if self.done or not chunk:
+            return []
+        buffer = self._buffer + chunk if self._buffer else chunk
+        pos, depth, in_string = self._pos, self._depth, self._in_string
+        array_depth, item_start = self._array_depth, self._item_start
+        items = []
+        size = len(buffer)
+        while pos < size:
+            if in_string:
+                match = self.STRING.search(buffer, pos)
+                if match is None:
+                    pos = size
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= size:
+                        # escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                in_string = False
+                pos = match.end()
+                continue
+            match = self.STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = size
+                break
+            char = match.group()
+            pos = match.end()
+            if char == b'"':
+                in_string = True
+            elif char in b"[{":
+                depth += 1
+                if (
+                    array_depth is None
+                    and char == b"["
+                    and self._is_list(buffer, match.start(), depth)
+                ):
+                    array_depth, item_start = depth, pos
+            elif char in b"]}":
+                if depth == array_depth:
+                    self._emit(buffer[item_start : match.start()], items)
+                    self.done = True
+                    break
+                depth -= 1
+            elif depth == array_depth:
+                self._emit(buffer[item_start : match.start()], items)
+                item_start = pos
+        # keep only the unfinished item, or the whole body until the array starts
+        cut = item_start if array_depth is not None else 0
+        self._buffer = b"" if self.done else buffer[cut:]
+        self._pos, self._item_start = pos - cut, item_start - cut
+        self._depth, self._in_string, self._array_depth = depth, in_string, array_depth
+        return items
+
+    def close(self) -> list:
+        """
+        End of the body, returns the body as one item if it had no array to stream:
+        the ``data`` value of the top-level object, or the object itself.
+        """
+        if self.done or self._array_depth is not None:
+            self.done = True
+            return []
+        body, self._buffer = self._buffer, b""
+        self.done = True
+        if not body or body.isspace():
+            return []
+        value = loads(body)
+        if isinstance(value, dict) and "data" in value:
+            value = value["data"]
+        if value is None:
+            return []
+        self.items += 1
+        return [value]
+
+    @classmethod
+    def _is_list(cls, buffer: bytes, start: int, depth: int) -> bool:
+        if depth == 1:
+            return True
+        return depth == 2 and bool(
+            cls.DATA_KEY.search(buffer, max(0, start - 64), start)
+        )
+
+    def _emit(self, segment: bytes, items: list):
+        if segment and not segment.isspace():
+            items.append(loads(segment))
+            self.items += 1
+
+
+use()
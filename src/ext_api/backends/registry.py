@@ -10,7 +10,27 @@ logger = logging.getLogger(f"CT.{__name__}")
 BACKENDS_NAMES = ["https", "cli", "ssh"]
 
 
+BACKENDS = {
+    "https": {
+        BackendType.SYNC: "ext_api.backends.backend_https:ProxmoxHTTPSBackend",
+        BackendType.ASYNC: "ext_api.backends.backend_https:ProxmoxAsyncHTTPSBackend",
+    },
+    "cli": {
+        BackendType.SYNC: "ext_api.backends.backend_cli:ProxmoxCLIBackend",
+        BackendType.ASYNC: "ext_api.backends.backend_cli:ProxmoxAsyncCLIBackend",
+    },
+    "ssh": {
+        BackendType.SYNC: "ext_api.backends.backend_ssh:ProxmoxSSHBackend",
+        BackendType.ASYNC: "ext_api.backends.backend_ssh:ProxmoxAsyncSSHBackend",
+    },
+}
+
+
 def register_backends(names: list[str] | str = None):
+    """
+    Register the backends by their import paths, a backend module and its
+    dependencies (httpx, paramiko, asyncssh) are imported when it is first used.
+    """
     if names is None:
         names = BACKENDS_NAMES
     if isinstance(names, str):
@@ -23,54 +43,8 @@ def register_backends(names: list[str] | str = None):
         if name not in BACKENDS_NAMES:
             logger.error(f"Unsupported backend: {name}")
             continue
-        match name:
-            case "https":
-                try:
-                    from ext_api.backends.backend_https import (
-                        ProxmoxHTTPSBackend,
-                        ProxmoxAsyncHTTPSBackend,
-                    )
-
-                    BackendRegistry.register_backend(
-                        "https", BackendType.SYNC, ProxmoxHTTPSBackend
-                    )
-                    BackendRegistry.register_backend(
-                        "https", BackendType.ASYNC, ProxmoxAsyncHTTPSBackend
-                    )
-                except ImportError:
-                    logger.error("Failed to import HTTPS Backend")
-            case "cli":
-                try:
-                    from ext_api.backends.backend_cli import (
-                        ProxmoxCLIBackend,
-                        ProxmoxAsyncCLIBackend,
-                    )
-
-                    BackendRegistry.register_backend(
-                        "cli", BackendType.SYNC, ProxmoxCLIBackend
-                    )
-                    BackendRegistry.register_backend(
-                        "cli", BackendType.ASYNC, ProxmoxAsyncCLIBackend
-                    )
-                except ImportError:
-                    logger.error("Failed to import CLI Backend")
-            case "ssh":
-                try:
-                    from ext_api.backends.backend_ssh import (
-                        ProxmoxSSHBackend,
-                        ProxmoxAsyncSSHBackend,
-                    )
-
-                    BackendRegistry.register_backend(
-                        "ssh", BackendType.SYNC, ProxmoxSSHBackend
-                    )
-                    BackendRegistry.register_backend(
-                        "ssh", BackendType.ASYNC, ProxmoxAsyncSSHBackend
-                    )
-                except ImportError:
-                    logger.error("Failed to import SSH Backend")
-            case _:
-                logger.error(f"Unknown backend: {name}")
+        for backend_type, backend_path in BACKENDS[name].items():
+            BackendRegistry.register_backend(name, backend_type, backend_path)
 
 
 # def get_backends_names():
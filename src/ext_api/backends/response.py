@@ -0,0 +1,116 @@
+import logging
+from typing import Any
+
+from ext_api.backends import json_codec
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+_UNDECODED = object()
+
+
+class Response:
+    """
+    Result of one backend request, with the body decoded on first use.
+
+    The body is kept as received and parsed the first time ``data`` (or the
+    ``"response"`` key) is read, so callers that only check ``success`` or
+    ``status_code`` never pay for JSON parsing.
+
+    The keys of the former result dictionary stay readable, ``result["success"]``
+    and ``result.get("response")`` work as before.
+
+    Attributes:
+        raw (bytes | str | None): The body as received.
+        status_code (int): HTTP status code or exit status of the command.
+        success (bool): Whether the request succeeded.
+        error (str | None): Error output of the command.
+        envelope (bool): The body is ``{"data": ...}`` (HTTPS), otherwise it is
+            the data itself (``pvesh`` output).
+    """
+
+    __slots__ = ("raw", "status_code", "success", "error", "envelope", "_body")
+
+    KEYS = ("response", "status_code", "success", "error")
+
+    def __init__(
+        self,
+        raw: bytes | str | None,
+        status_code: int,
+        success: bool,
+        error: str | None = None,
+        envelope: bool = True,
+    ):
+        self.raw = raw
+        self.status_code = status_code
+        self.success = success
+        self.error = error
+        self.envelope = envelope
+        self._body = _UNDECODED
+
+    @classmethod
+    def of(cls, data: Any, status_code: int = 200, success: bool = True) -> "Response":
+        """A response whose data is already decoded."""
+        response = cls(None, status_code, success)
+        response._body = {"data": data}
+        return response
+
+    @property
+    def decoded(self) -> bool:
+        return self._body is not _UNDECODED
+
+    @property
+    def body(self) -> dict:
+        """The decoded body, ``{"data": ...}``."""
+        if self._body is _UNDECODED:
+            self._body = self._decode()
+        return self._body
+
+    @property
+    def data(self) -> Any:
+        """The decoded ``data`` of the body, ``None`` if there is none."""
+        body = self.body
+        return body.get("data") if isinstance(body, dict) else None
+
+    def _decode(self) -> dict:
+        raw = self.raw
+        if not raw or raw.isspace():
+            return {} if self.envelope else {"data": {}}
+        try:
+            decoded = json_codec.loads(raw)
+        except ValueError as e:
+            if self.envelope:
+                logger.warning(f"Error of decode JSON body: {e}")
+                return {}
+            # pvesh prints plain text for some commands, keep its last line
+            if isinstance(raw, bytes):
+                raw = raw.decode(errors="replace")
+            last_line = raw.strip().splitlines()[-1]
+            logger.debug(f"Error of decode JSON result: {last_line}...")
+            return {"data": last_line}
+        return decoded if self.envelope else {"data": decoded}
+
+    def __getitem__(self, key: str):
+        if key == "response":
+            return self.body
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __repr__(self) -> str:
+        size = len(self.raw) if self.raw is not None else 0
+        return (
+            f"{self.__class__.__name__}(status_code={self.status_code}, "
+            f"success={self.success}, size={size})"
+        )
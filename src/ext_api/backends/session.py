@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class PersistentSessionBase:
+    """
+    Reference-counted connection of a backend, opened on first use.
+
+    ``with`` blocks take a reference: the outermost one opens the connection
+    (unless it is open already) and closes it when it exits, nested blocks
+    share it. Requests outside any block open the connection lazily and keep
+    it for the requests that follow, instead of a connection per request. It
+    is closed after ``idle_timeout`` seconds without requests, 0 keeps it open
+    as long as the backend.
+
+    Attributes:
+        refs (int): ``with`` blocks inside the session.
+        active (int): Requests using the connection.
+        opened (int): Times the connection was opened.
+    """
+
+    def __init__(self, backend, idle_timeout: float = 60.0):
+        self.backend = backend
+        self.idle_timeout = idle_timeout or 0
+        self.refs = 0
+        self.active = 0
+        self.opened = 0
+        self.last_used = 0.0
+        self._timer = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.backend.client is not None
+
+    def _idle(self) -> float | None:
+        """Seconds until the idle connection is due to close, ``None`` if it is in use."""
+        if self.refs or self.active or not self.is_open:
+            return None
+        return self.last_used + self.idle_timeout - time.monotonic()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class PersistentSession(PersistentSessionBase):
+    """``PersistentSessionBase`` of a sync backend, for any number of threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+
+    def _open(self):
+        self.backend.connect()
+        self.opened += 1
+
+    def _close(self):
+        self._cancel_timer()
+        if self.is_open:
+            self.backend.close()
+
+    def enter(self):
+        with self._lock:
+            self.refs += 1
+            if not self.is_open:
+                self._open()
+
+    def exit(self):
+        with self._lock:
+            self.refs -= 1
+            if not self.refs and not self.active:
+                self._close()
+
+    def begin(self):
+        """Take the connection for a request, opening it if needed."""
+        with self._lock:
+            self.active += 1
+            if not self.is_open:
+                try:
+                    self._open()
+                except BaseException:
+                    self.active -= 1
+                    raise
+                if not self.refs:
+                    logger.debug("Opened a persistent session outside 'with'")
+
+    def end(self):
+        with self._lock:
+            self.active -= 1
+            self.last_used = time.monotonic()
+            if not self.refs and self.idle_timeout and self._timer is None:
+                self._schedule(self.idle_timeout)
+
+    def _schedule(self, delay: float):
+        self._timer = threading.Timer(delay, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expire(self):
+        with self._lock:
+            self._timer = None
+            idle = self._idle()
+            if idle is None:
+                return
+            if idle > 0:
+                self._schedule(idle)
+                return
+            logger.debug(f"Closing the session idle for {self.idle_timeout}s")
+            self._close()
+
+    def close(self):
+        """Close the connection whatever uses it."""
+        with self._lock:
+            self._close()
+
+
+class AsyncPersistentSession(PersistentSessionBase):
+    """
+    ``PersistentSessionBase`` of an async backend.
+
+    The connection belongs to the event loop that opened it, a request from
+    another loop (a new ``asyncio.run``) opens a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._lock_loop: asyncio.AbstractEventLoop | None = None
+        self._closing: asyncio.Task | None = None
+
+    def _usable(self, loop: asyncio.AbstractEventLoop) -> bool:
+        if self.is_open and self._loop is None:
+            # a connection assigned without connect() is adopted
+            self._loop = loop
+        return self.is_open and self._loop is loop
+
+    async def _ensure(self):
+        loop = asyncio.get_running_loop()
+        if self._usable(loop):
+            return
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            if self._usable(loop):
+                return
+            self._cancel_timer()
+            if self.is_open:
+                logger.debug("Session of another event loop left, opening a new one")
+                await self._close_stale()
+            await self.backend.connect()
+            self._loop = loop
+            self.opened += 1
+            if not self.refs:
+                logger.debug("Opened a persistent session outside 'async with'")
+
+    async def _close(self):
+        self._cancel_timer()
+        if self.is_open:
+            await self.backend.close()
+
+    async def _close_stale(self):
+        """Close the connection of another event loop before it is replaced."""
+        self._closing = None
+        try:
+            await self.backend.close()
+        except Exception as exc:
+            # its transport may be bound to a closed loop, connect() drops it anyway
+            logger.debug(f"Closing the session of another event loop failed: {exc!r}")
+
+    async def _close_idle(self):
+        # a request may have taken the connection since the close was scheduled
+        idle = self._idle()
+        if idle is not None and idle <= 0:
+            await self._close()
+
+    def _closed(self, task: asyncio.Task):
+        if self._closing is task:
+            self._closing = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Closing the idle session failed: {task.exception()!r}")
+
+    async def enter(self):
+        self.refs += 1
+        try:
+            await self._ensure()
+        except BaseException:
+            self.refs -= 1
+            raise
+
+    async def exit(self):
+        self.refs -= 1
+        if not self.refs and not self.active:
+            await self._close()
+
+    async def begin(self):
+        """Take the connection for a request, opening it if needed."""
+        self.active += 1
+        try:
+            await self._ensure()
+        except BaseException:
+            self.active -= 1
+            raise
+
+    def end(self):
+        self.active -= 1
+        self.last_used = time.monotonic()
+        if not self.refs and self.idle_timeout and self._timer is None:
+            self._schedule(self.idle_timeout)
+
+    def _schedule(self, delay: float):
+        self._timer = self._loop.call_later(delay, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        idle = self._idle()
+        if idle is None:
+            return
+        if idle > 0:
+            self._schedule(idle)
+            return
+        logger.debug(f"Closing the session idle for {self.idle_timeout}s")
+        self._closing = self._loop.create_task(self._close_idle())
+        self._closing.add_done_callback(self._closed)
+
+    async def close(self):
+        """Close the connection whatever uses it."""
+        closing, self._closing = self._closing, None
+        if closing is not None and not closing.done():
+            if self._loop is asyncio.get_running_loop():
+                await asyncio.wait([closing])
+            else:
+                closing.cancel()
+        await self._close()
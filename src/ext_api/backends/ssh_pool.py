@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class PooledConnection:
+    __slots__ = ("client", "channels", "requests")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.channels = 0
+        self.requests = 0
+
+
+class SSHPoolBase:
+    """
+    Selection logic shared by the sync and async SSH connection pools.
+
+    Up to ``size`` connections are opened on demand, each carries at most
+    ``max_channels`` concurrent channels (keep it below ``MaxSessions`` of the
+    server sshd, 10 by default). A request takes the least busy connection while
+    it is idle or the pool is full, otherwise a new connection is opened. When
+    every channel is in use, callers wait for a free one. Connections found
+    dropped are discarded and replaced by new ones.
+
+    Attributes:
+        connects (int): Connections opened.
+        dropped (int): Connections found dead and replaced.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        is_alive: Callable[[Any], bool],
+        size: int = 2,
+        max_channels: int = 8,
+    ):
+        self._connect = connect
+        self._is_alive = is_alive
+        self.size = max(int(size), 1)
+        self.max_channels = max(int(max_channels), 1)
+        self.connections: list[PooledConnection] = []
+        self.connects = 0
+        self.dropped = 0
+        self._opening = 0
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def _drop_dead(self) -> list[PooledConnection]:
+        dead = [c for c in self.connections if not self._is_alive(c.client)]
+        for conn in dead:
+            self.connections.remove(conn)
+            self.dropped += 1
+            logger.warning(
+                f"SSH connection dropped, {conn.channels} channels in use, reconnecting"
+            )
+        return dead
+
+    def _pick(self) -> PooledConnection | None:
+        free = [c for c in self.connections if c.channels < self.max_channels]
+        if free:
+            best = min(free, key=lambda c: c.channels)
+            if best.channels == 0 or not self._can_open():
+                return best
+        return None
+
+    def _can_open(self) -> bool:
+        return len(self.connections) + self._opening < self.size
+
+    @staticmethod
+    def _use(conn: PooledConnection) -> PooledConnection:
+        conn.channels += 1
+        conn.requests += 1
+        return conn
+
+    def _opened(self, client: Any) -> PooledConnection:
+        self._opening -= 1
+        self.connects += 1
+        conn = self._use(PooledConnection(client))
+        self.connections.append(conn)
+        return conn
+
+    def report(self) -> str:
+        channels = sum(c.channels for c in self.connections)
+        return (
+            f"SSH pool: {len(self.connections)}/{self.size} connections, "
+            f"{channels} channels in use, {self.connects} opened, {self.dropped} dropped"
+        )
+
+
+class SSHConnectionPool(SSHPoolBase):
+    """SSH connection pool for threads, ``connect`` returns a new client."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        is_alive: Callable[[Any], bool],
+        close: Callable[[Any], None],
+        size: int = 2,
+        max_channels: int = 8,
+    ):
+        super().__init__(connect, is_alive, size, max_channels)
+        self._close = close
+        self._cond = threading.Condition()
+
+    def _checkout(self) -> PooledConnection:
+        with self._cond:
+            while True:
+                for conn in self._drop_dead():
+                    self._close_quietly(conn.client)
+                conn = self._pick()
+                if conn is not None:
+                    return self._use(conn)
+                if self._can_open():
+                    self._opening += 1
+                    break
+                self._cond.wait()
+        try:
+            client = self._connect()
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            return self._opened(client)
+
+    def _release(self, conn: PooledConnection):
+        with self._cond:
+            conn.channels -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def acquire(self):
+        """Hold one channel of a pooled connection, yields the client."""
+        conn = self._checkout()
+        try:
+            yield conn.client
+        finally:
+            self._release(conn)
+
+    def start(self) -> Any:
+        """Open the first connection, returns its client."""
+        conn = self._checkout()
+        self._release(conn)
+        return conn.client
+
+    def _close_quietly(self, client: Any):
+        try:
+            self._close(client)
+        except Exception as e:
+            logger.debug(f"SSH pool close: {e}")
+
+    def close(self):
+        with self._cond:
+            connections, self.connections = self.connections, []
+            self._cond.notify_all()
+        for conn in connections:
+            self._close_quietly(conn.client)
+
+
+class AsyncSSHConnectionPool(SSHPoolBase):
+    """SSH connection pool for the tasks of one event loop, ``connect`` is a coroutine function."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        is_alive: Callable[[Any], bool],
+        close: Callable[[Any], Awaitable[None]],
+        size: int = 2,
+        max_channels: int = 8,
+    ):
+        super().__init__(connect, is_alive, size, max_channels)
+        self._close = close
+        self._cond: asyncio.Condition | None = None
+
+    @property
+    def cond(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _checkout(self) -> PooledConnection:
+        async with self.cond:
+            while True:
+                for conn in self._drop_dead():
+                    await self._close_quietly(conn.client)
+                conn = self._pick()
+                if conn is not None:
+                    return self._use(conn)
+                if self._can_open():
+                    self._opening += 1
+                    break
+                await self.cond.wait()
+        try:
+            client = await self._connect()
+        except BaseException:
+            async with self.cond:
+                self._opening -= 1
+                self.cond.notify_all()
+            raise
+        async with self.cond:
+            return self._opened(client)
+
+    async def _release(self, conn: PooledConnection):
+        async with self.cond:
+            conn.channels -= 1
+            self.cond.notify_all()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Hold one channel of a pooled connection, yields the client."""
+        conn = await self._checkout()
+        try:
+            yield conn.client
+        finally:
+            await self._release(conn)
+
+    async def start(self) -> Any:
+        """Open the first connection, returns its client."""
+        conn = await self._checkout()
+        await self._release(conn)
+        return conn.client
+
+    async def _close_quietly(self, client: Any):
+        try:
+            await self._close(client)
+        except Exception as e:
+            logger.debug(f"SSH pool close: {e}")
+
+    async def close(self):
+        connections, self.connections = self.connections, []
+        for conn in connections:
+            await self._close_quietly(conn.client)
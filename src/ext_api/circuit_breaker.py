@@ -0,0 +1,224 @@
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from ext_api.backends.endpoints import is_gateway_error
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+@dataclass
+class Circuit:
+    """State of the circuit of one node."""
+
+    node: str
+    state: str = "closed"
+    failures: int = 0
+    opened_at: float = 0.0
+    probes: int = 0
+    opened: int = 0
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per cluster node.
+
+    The node of a request is taken from its path (``nodes/{node}/...``), requests
+    without a node are never blocked. ``failure_threshold`` consecutive
+    failures (transport errors, HTTP 502-504, 595) open the circuit of
+    the node: its
+    requests fail at once, without being sent, for ``reset_timeout`` seconds.
+    Then the circuit is half-open and lets ``half_open_probes`` requests through
+    at a time, the first success closes it, a failure opens it again.
+
+    Failed-fast requests return a result with ``status_code`` ``CIRCUIT_OPEN``
+    and ``circuit_open`` set, they are not retried.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+    CIRCUIT_OPEN = 998
+    # pveproxy of the entry node can't reach the node
+    NODE_UNREACHABLE = 595
+    NODE_PATH = re.compile(r"^/?nodes/([^/{}]+)")
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1 or half_open_probes < 1:
+            raise ValueError("failure_threshold and half_open_probes must be positive")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._circuits: dict[str, Circuit] = {}
+
+    @classmethod
+    def node_of(cls, endpoint: str | None) -> str | None:
+        match = cls.NODE_PATH.match(endpoint or "")
+        return match.group(1) if match else None
+
+    @classmethod
+    def is_failure(cls, result) -> bool:
+        """Whether the result tells the node is unhealthy, not just the request wrong."""
+        if not result:
+            return True
+        if result.get("network_error"):
+            return True
+        status_code = result.get("status_code")
+        return is_gateway_error(status_code) or status_code == cls.NODE_UNREACHABLE
+
+    def _circuit(self, node: str) -> Circuit:
+        circuit = self._circuits.get(node)
+        if circuit is None:
+            circuit = self._circuits[node] = Circuit(node)
+        return circuit
+
+    def _refresh(self, circuit: Circuit):
+        if (
+            circuit.state == self.OPEN
+            and self._clock() - circuit.opened_at >= self.reset_timeout
+        ):
+            circuit.state = self.HALF_OPEN
+            circuit.probes = 0
+            logger.info(f"Circuit of node {circuit.node} half-open, probing")
+
+    def state(self, node: str | None) -> str:
+        """State of the circuit of a node, ``closed`` for unknown nodes."""
+        if not node:
+            return self.CLOSED
+        with self._lock:
+            circuit = self._circuits.get(node)
+            if circuit is None:
+                return self.CLOSED
+            self._refresh(circuit)
+            return circuit.state
+
+    def states(self) -> dict[str, str]:
+        """State of every node that had a request."""
+        with self._lock:
+            for circuit in self._circuits.values():
+                self._refresh(circuit)
+            return {node: c.state for node, c in self._circuits.items()}
+
+    def retry_after(self, node: str) -> float:
+        """Seconds until the open circuit of the node lets a probe through."""
+        with self._lock:
+            circuit = self._circuits.get(node)
+            if circuit is None or circuit.state != self.OPEN:
+                return 0.0
+            return max(0.0, circuit.opened_at + self.reset_timeout - self._clock())
+
+    def allow(self, node: str) -> bool:
+        """Whether a request to the node may be sent, takes a probe slot when half-open."""
+        with self._lock:
+            circuit = self._circuit(node)
+            self._refresh(circuit)
+            if circuit.state == self.CLOSED:
+                return True
+            if (
+                circuit.state == self.HALF_OPEN
+                and circuit.probes < self.half_open_probes
+            ):
+                circuit.probes += 1
+                return True
+            circuit.rejected += 1
+            return False
+
+    def record(self, node: str, result) -> None:
+        """
+        Record the outcome of an allowed request.
+
+        ``result`` is ``None`` when the request ended without an outcome
+        (cancelled), only its probe slot is released then.
+        """
+        with self._lock:
+            circuit = self._circuit(node)
+            if circuit.state == self.HALF_OPEN:
+                circuit.probes = max(0, circuit.probes - 1)
+            if result is None:
+                return
+            if not self.is_failure(result):
+                # a request allowed before the circuit opened may succeed late,
+                # only the probe of a half-open circuit closes it
+                if circuit.state == self.HALF_OPEN:
+                    logger.info(f"Circuit of node {node} closed")
+                    circuit.state = self.CLOSED
+                if circuit.state == self.CLOSED:
+                    circuit.failures = 0
+                return
+            circuit.failures += 1
+            if circuit.state == self.HALF_OPEN or (
+                circuit.state == self.CLOSED
+                and circuit.failures >= self.failure_threshold
+            ):
+                circuit.state = self.OPEN
+                circuit.opened_at = self._clock()
+                circuit.opened += 1
+                logger.warning(
+                    f"Circuit of node {node} open after {circuit.failures} failures, "
+                    f"failing fast for {self.reset_timeout}s"
+                )
+
+    def open_result(self, node: str) -> dict:
+        """Result of a request that was not sent because the circuit is open."""
+        return {
+            "response": {},
+            "status_code": self.CIRCUIT_OPEN,
+            "error": f"Circuit of node {node} is open",
+            "success": False,
+            "circuit_open": True,
+            "sent": False,
+        }
+
+    def call(self, endpoint: str | None, send: Callable[[], dict]) -> dict:
+        """Send a sync request through the circuit of its node."""
+        node = self.node_of(endpoint)
+        if node is None:
+            return send()
+        if not self.allow(node):
+            return self.open_result(node)
+        result = None
+        try:
+            result = send()
+        finally:
+            self.record(node, result)
+        return result
+
+    async def call_async(self, endpoint: str | None, send) -> dict:
+        """Send an async request through the circuit of its node."""
+        node = self.node_of(endpoint)
+        if node is None:
+            return await send()
+        if not self.allow(node):
+            return self.open_result(node)
+        result = None
+        try:
+            result = await send()
+        finally:
+            self.record(node, result)
+        return result
+
+    @property
+    def stats(self) -> dict[str, dict]:
+        """Counters per node: state, consecutive failures, times opened, rejected requests."""
+        with self._lock:
+            for circuit in self._circuits.values():
+                self._refresh(circuit)
+            return {
+                node: {
+                    "state": c.state,
+                    "failures": c.failures,
+                    "opened": c.opened,
+                    "rejected": c.rejected,
+                }
+                for node, c in self._circuits.items()
+            }
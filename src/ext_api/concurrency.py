@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import math
+import threading
+from collections import deque
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class AdaptiveLimitBase:
+    """
+    Concurrency limit adapted by AIMD (additive increase, multiplicative decrease).
+
+    Every finished request is recorded with its latency and whether it failed
+    (transport error, HTTP 5xx). After each ``window`` samples the limit is
+    decided again: when the p95 latency of the window is above ``target_p95``
+    or its error rate above ``max_error_rate`` the limit is multiplied by
+    ``backoff``; when both are healthy and the limit was reached during the
+    window, it grows by one. It stays between ``min_limit`` and ``max_limit``.
+
+    ``followers`` are other limits fed the same samples, e.g. the limit of
+    concurrent scenarios follows the requests of the API they use.
+
+    Attributes:
+        limit (int): Current limit.
+        in_flight (int): Slots taken.
+        increased (int): Times the limit was raised.
+        decreased (int): Times the limit was cut.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        target_p95: float = 2.0,
+        max_error_rate: float = 0.1,
+        window: int = 20,
+        backoff: float = 0.5,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"invalid limits: {min_limit}..{max_limit}")
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1: {backoff}")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.target_p95 = target_p95
+        self.max_error_rate = max_error_rate
+        self.window = max(window, 1)
+        self.backoff = backoff
+        self.in_flight = 0
+        self.increased = 0
+        self.decreased = 0
+        self.followers: list["AdaptiveLimitBase"] = []
+        self._samples_lock = threading.Lock()
+        self._latencies: deque[float] = deque()
+        self._failures = 0
+        self._saturated = False
+
+    def _taken(self):
+        self.in_flight += 1
+        if self.in_flight >= self.limit:
+            self._saturated = True
+
+    def record(self, latency: float, failed: bool = False):
+        """Record a finished request, adapting the limit after each window."""
+        with self._samples_lock:
+            self._latencies.append(latency)
+            self._failures += int(failed)
+            if len(self._latencies) >= self.window:
+                latencies = sorted(self._latencies)
+                failures, saturated = self._failures, self._saturated
+                self._latencies.clear()
+                self._failures = 0
+                self._saturated = self.in_flight >= self.limit
+            else:
+                latencies = None
+        if latencies is not None:
+            self._decide(latencies, failures, saturated)
+        for follower in self.followers:
+            follower.record(latency, failed)
+
+    def _decide(self, latencies: list[float], failures: int, saturated: bool):
+        p95 = latencies[math.ceil(0.95 * len(latencies)) - 1]
+        error_rate = failures / len(latencies)
+        health = f"p95 {p95:.3f}s, errors {error_rate:.0%}"
+        if p95 > self.target_p95 or error_rate > self.max_error_rate:
+            limit = max(self.min_limit, int(self.limit * self.backoff))
+            if limit < self.limit:
+                self.decreased += 1
+                logger.warning(
+                    f"Concurrency of {self.name} cut {self.limit} -> {limit}: {health}"
+                )
+                self._set_limit(limit)
+        elif saturated and self.limit < self.max_limit:
+            self.increased += 1
+            logger.info(
+                f"Concurrency of {self.name} raised {self.limit} -> {self.limit + 1}: {health}"
+            )
+            self._set_limit(self.limit + 1)
+        else:
+            logger.debug(f"Concurrency of {self.name} kept at {self.limit}: {health}")
+
+    def _set_limit(self, limit: int):
+        self.limit = limit
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "increased": self.increased,
+            "decreased": self.decreased,
+        }
+
+
+class AdaptiveLimit(AdaptiveLimitBase):
+    """``AdaptiveLimitBase`` for any number of threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self._taken()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def _set_limit(self, limit: int):
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class AsyncAdaptiveLimit(AdaptiveLimitBase):
+    """``AdaptiveLimitBase`` for the tasks of one event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if not self._waiters and self.in_flight < self.limit:
+            self._taken()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over already, pass it on
+                self.release()
+            else:
+                self._waiters.remove(future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._taken()
+                future.set_result(None)
+
+    def _set_limit(self, limit: int):
+        self.limit = limit
+        self._wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
@@ -0,0 +1,165 @@
+import inspect
+from typing import Any, Callable
+
+
+class RequestContext:
+    """
+    A request passing the interceptors.
+
+    ``args`` and ``kwargs`` are the backend call, ``before_request`` hooks may
+    change them. ``state`` keeps what an interceptor needs between its hooks.
+    """
+
+    __slots__ = ("args", "kwargs", "priority", "state")
+
+    def __init__(self, args: tuple, kwargs: dict, priority=None):
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.state: dict[str, Any] = {}
+
+    @property
+    def method(self) -> str | None:
+        return self.kwargs.get("method", self.args[0] if self.args else None)
+
+    @property
+    def endpoint(self) -> str | None:
+        endpoint = self.kwargs.get(
+            "endpoint", self.args[1] if len(self.args) > 1 else None
+        )
+        endpoint_params = self.kwargs.get("endpoint_params")
+        if endpoint and endpoint_params:
+            endpoint = endpoint.format(**endpoint_params)
+        return endpoint
+
+    def __repr__(self):
+        return f"RequestContext({(self.method or '').upper()} {self.endpoint})"
+
+
+class Interceptor:
+    """
+    Hooks around the backend requests of a ``ProxmoxBaseAPI``, override the ones
+    needed. Hooks of an interceptor of an async API may be coroutines.
+
+    - ``before_request(context)``: called in chain order before the request,
+      a result other than ``None`` is used instead of sending the request and
+      the interceptors after this one are skipped.
+    - ``after_response(context, result)``: called in reverse order with the
+      result, returns the result passed on. Failed requests arrive here too,
+      the backends report transport errors as results.
+    - ``on_error(context, error)``: called in reverse order when the request
+      raised, a result other than ``None`` is returned instead of the error.
+    """
+
+    def before_request(self, context: RequestContext):
+        return None
+
+    def after_response(self, context: RequestContext, result):
+        return result
+
+    def on_error(self, context: RequestContext, error: Exception):
+        return None
+
+
+class InterceptorChain:
+    """
+    Ordered interceptors of an API.
+
+    Only the hooks an interceptor overrides are called, an empty chain is
+    false and is not entered at all.
+    """
+
+    HOOKS = ("before_request", "after_response", "on_error")
+
+    def __init__(self, interceptors: list[Interceptor] | None = None):
+        self.interceptors: list[Interceptor] = list(interceptors or [])
+        self._build()
+
+    def _build(self):
+        hooks = {name: [] for name in self.HOOKS}
+        for index, interceptor in enumerate(self.interceptors):
+            for name in self.HOOKS:
+                hook = getattr(interceptor, name)
+                if getattr(type(interceptor), name) is not getattr(Interceptor, name):
+                    hooks[name].append((index, hook, inspect.iscoroutinefunction(hook)))
+        self._before = hooks["before_request"]
+        # responses and errors unwind the chain
+        self._after = hooks["after_response"][::-1]
+        self._error = hooks["on_error"][::-1]
+        self.asynchronous = any(
+            is_async for name in self.HOOKS for _, _, is_async in hooks[name]
+        )
+
+    def add(self, interceptor: Interceptor):
+        """Append an interceptor, its ``before_request`` runs after the others."""
+        self.interceptors.append(interceptor)
+        self._build()
+
+    def remove(self, interceptor: Interceptor):
+        self.interceptors.remove(interceptor)
+        self._build()
+
+    def __bool__(self):
+        return bool(self.interceptors)
+
+    def __len__(self):
+        return len(self.interceptors)
+
+    def __iter__(self):
+        return iter(self.interceptors)
+
+    def call(self, send: Callable, args: tuple, kwargs: dict, priority=None):
+        """Send a sync request through the interceptors."""
+        if self.asynchronous:
+            raise TypeError("Async interceptors need an async API")
+        context = RequestContext(args, kwargs, priority)
+        answered = len(self.interceptors)
+        for index, hook, _ in self._before:
+            result = hook(context)
+            if result is not None:
+                answered = index
+                break
+        else:
+            try:
+                result = send(context.args, context.kwargs, context.priority)
+            except Exception as error:
+                for _, hook, _ in self._error:
+                    result = hook(context, error)
+                    if result is not None:
+                        break
+                else:
+                    raise
+        for index, hook, _ in self._after:
+            if index < answered:
+                result = hook(context, result)
+        return result
+
+    async def call_async(
+        self, send: Callable, args: tuple, kwargs: dict, priority=None
+    ):
+        """Send an async request through the interceptors, sync or async ones."""
+        context = RequestContext(args, kwargs, priority)
+        answered = len(self.interceptors)
+        for index, hook, is_async in self._before:
+            result = await hook(context) if is_async else hook(context)
+            if result is not None:
+                answered = index
+                break
+        else:
+            try:
+                result = await send(context.args, context.kwargs, context.priority)
+            except Exception as error:
+                for _, hook, is_async in self._error:
+                    result = (
+                        await hook(context, error) if is_async else hook(context, error)
+                    )
+                    if result is not None:
+                        break
+                else:
+                    raise
+        for index, hook, is_async in self._after:
+            if index < answered:
+                result = (
+                    await hook(context, result) if is_async else hook(context, result)
+                )
+        return result
@@ -1,152 +1,100 @@
-import asyncio
 import logging
-import threading
-import uuid
-from typing import Self
+from typing import Any, AsyncIterator, Callable, Iterator, Self
 
 from cluster_tasks.configure_logging import config_logger
 from config_loader.config import configuration
+from ext_api.backends.backend_registry import BackendType
+from ext_api.backends.json_codec import JSONArrayStream
+from ext_api.backends.response import Response
 from ext_api.backends.registry import register_backends
 from ext_api.proxmox_base_api import ProxmoxBaseAPI
+from ext_api.query import Query, accessor
+from ext_api.rate_limit import Priority
 
 logger = logging.getLogger(f"CT.{__name__}")
 
 
-class ProxmoxAPI(ProxmoxBaseAPI):
-    METHODS = ["get", "post", "put", "delete"]
-    METHOD_MAP = {"create": "post", "set": "put"}
-    _PRIVATE_METHODS = ["api", "shape", "request", "async_request"]
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._context_path: dict[str, list] = {}
-        self._lock = threading.Lock()
-        self._task_id: str | None = None
-
-    def _new_task(self) -> str:
-        with self._lock:
-            self._task_id = str(uuid.uuid4())
-        logger.debug(f"Forced a new task_id: {self._task_id}")
-        return self._task_id
-
-    def _get_task_id(self, is_async: bool) -> str:
-        if is_async:
-            if self._task_id is None:
-                self._task_id = str(uuid.uuid4())
-                logger.debug(f"Generated a new task ID: {self._task_id}")
-        else:
-            if self._task_id is None:
-                with self._lock:
-                    self._task_id = str(uuid.uuid4())
-                logger.debug(f"Generated a new task ID: {self._task_id}")
-        return self._task_id
-
-    def _cleanup(self, task_id: str, is_async: bool = None):
-        """Callback to clean up context when a task finishes."""
-        # task_id = id(task)
-        if is_async:
-            self._context_path.pop(task_id, None)
-        else:
-            with self._lock:
-                self._context_path.pop(task_id, None)
-        self._task_id = None
+class ProxmoxAPIPath:
+    """
+    Immutable path builder returned by every attribute hop on ProxmoxAPI.
 
-    def __getattr__(self, name) -> Self:
-        if name.startswith("_") or (name in self._PRIVATE_METHODS):
-            # Ignore private methods
-            return self
-        is_async = self._is_async()
-        task_id = self._get_task_id(is_async)
-        if is_async:
-            if task_id not in self._context_path:
-                self._context_path[task_id] = []
-            self._context_path[task_id].append(name)
-        else:
-            with self._lock:
-                if task_id not in self._context_path:
-                    self._context_path[task_id] = []
-                self._context_path[task_id].append(name)
-        return self
+    Each ``api.nodes(node).qemu(vm_id)...`` chain owns its own tuple of path
+    segments, so any number of threads and tasks can build requests on the same
+    client without locks or shared state.
+    """
 
-    @staticmethod
-    def _is_async():
-        try:
-            return asyncio.get_running_loop().is_running()
-        except RuntimeError:
-            return False
+    __slots__ = ("_api", "_path")
+
+    def __init__(self, api: "ProxmoxAPI", path: tuple[str, ...] = ()):
+        self._api = api
+        self._path = path
+
+    def __getattr__(self, name) -> Self:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return ProxmoxAPIPath(self._api, self._path + (name,))
 
     def __call__(self, *args, **kwargs):
-        is_async = self._is_async()
-        if is_async:
-            return self.__acall__(*args, **kwargs)
-        if "_task_id" in kwargs:
-            task_id = kwargs.pop("_task_id")
-        else:
-            task_id = self._get_task_id(is_async)
-        if args and not kwargs:
-            # all args force to string type
-            args = map(str, args)
-            with self._lock:
-                self._context_path[task_id].extend(args)
-            return self
-        if kwargs.get("get_request_param"):
-            kwargs.pop("get_request_param")
-            return self._request_prepare(*args, **kwargs)
-        kwargs["task_id"] = task_id
-        with self._lock:
-            self._task_id = None
-        result = self._execute(*args, **kwargs)
-        return result
-
-    def __acall__(self, *args, **kwargs):
-        if "_task_id" in kwargs:
-            task_id = kwargs.pop("_task_id")
-        else:
-            task_id = self._get_task_id(True)
         if args and not kwargs:
             # all args force to string type
-            args = map(str, args)
-            self._context_path[task_id].extend(args)
+            return ProxmoxAPIPath(self._api, self._path + tuple(map(str, args)))
+        return self._api._dispatch(self._path, *args, **kwargs)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({'/'.join(self._path)!r})"
+
+
+class ProxmoxAPI(ProxmoxBaseAPI):
+    METHODS = ["get", "post", "put", "delete"]
+    METHOD_MAP = {"create": "post", "set": "put"}
+    _PRIVATE_METHODS = [
+        "api",
+        "shape",
+        "request",
+        "async_request",
+        "stream_request",
+        "async_stream_request",
+    ]
+    STREAM_ACTION = "stream"
+
+    def __getattr__(self, name) -> ProxmoxAPIPath | Self:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._PRIVATE_METHODS:
             return self
-        if kwargs.get("get_request_param"):
-            kwargs.pop("get_request_param")
-            return self._request_prepare(*args, **kwargs)
-        # pulled task_id information to later use in _async_execute, and forgot in class instance
-        kwargs["task_id"] = task_id
-        self._task_id = None
-        # logger.debug("ACALL before execute")
-        # here async code will be wait real awaited execution
-        result = self._async_execute(*args, **kwargs)
-        return result
+        return ProxmoxAPIPath(self, (name,))
+
+    def __call__(self, *args, **kwargs):
+        return ProxmoxAPIPath(self)(*args, **kwargs)
+
+    def _dispatch(self, path: tuple[str, ...], *args, **kwargs):
+        if path and path[-1] == self.STREAM_ACTION:
+            # stream is a GET whose list items are parsed as they arrive
+            path = path[:-1] + ("get",)
+            if kwargs.pop("get_request_param", False):
+                return self._request_prepare(path, *args, **kwargs)
+            if self.backend_type == BackendType.ASYNC:
+                return self._async_stream(*args, path=path, **kwargs)
+            return self._stream(*args, path=path, **kwargs)
+        if kwargs.pop("get_request_param", False):
+            return self._request_prepare(path, *args, **kwargs)
+        if self.backend_type == BackendType.ASYNC:
+            # here async code will be wait real awaited execution
+            return self._async_execute(*args, path=path, **kwargs)
+        return self._execute(*args, path=path, **kwargs)
 
     def _request_prepare(
-        self, data=None, task_id: str = None, params: dict = None
+        self, path: tuple[str, ...], data=None, params: dict = None
     ) -> dict:
-        is_async = self._is_async()
-        # used task_id or pulled for later async run code or directly in class instance for sync code
-        task_id = task_id or self._task_id
-        # logger.debug(f"_request_prepare: {task_id}")
-        if task_id is None:
-            raise ValueError("_request_prepare: Task ID must be defied")
-        if is_async:
-            action = self._context_path[task_id].pop()
-            endpoint = "/".join(self._context_path[task_id])
-            self._context_path[task_id] = (
-                []
-            )  # Clear the path after generating the endpoint
-            self._cleanup(task_id, is_async)
-        else:
-            action = self._context_path[task_id][-1]
-            endpoint = "/".join(self._context_path[task_id][:-1])
-            with self._lock:
-                self._context_path[task_id] = []
-            self._cleanup(task_id, is_async)
+        if not path:
+            raise ValueError("_request_prepare: Path must be defined")
+        action = path[-1]
         method = self.METHOD_MAP.get(action, action)
         if method not in self.METHODS:
             raise ValueError(f"Unsupported action: {action}")
         return {
             "method": method,
-            "endpoint": endpoint,
+            "endpoint": "/".join(path[:-1]),
             "data": data,
             "params": params,
         }
@@ -160,104 +108,171 @@ class ProxmoxAPI(ProxmoxBaseAPI):
         :param key_path: The dotted key path (e.g., "kernel.cpu").
         :return: The value found at the specified key path, or None if not found.
         """
-        keys = key_path.split(".")  # Split the dotted path into individual keys
-        for key in keys:
-            if isinstance(data, dict):
-                data = data.get(key, None)
-            elif isinstance(data, list) and key.isdigit():  # If key is an index
-                try:
-                    data = data[int(key)]
-                except (ValueError, IndexError):
-                    return None
-            else:
-                return None
-            if data is None:
-                return None
-        return data
+        return accessor(key_path)(data)
 
-    def _filter_response(self, response_data, filter_keys=None):
+    def _filter_response(self, response_data, filter_keys=None, query: Query = None):
         """
         Filters the response data based on the specified filter_keys, allowing for nested dotted keys.
 
         :param response_data: The data to filter (could be a list or dictionary).
         :param filter_keys: A string or list of strings specifying the keys to filter.
+        :param query: Compiled query (``where``, ``order_by``, ``limit``) used instead of filter_keys.
         :return: The filtered data.
         """
-        if not filter_keys:
+        query = query or Query(filter_keys)
+        if not query:
             return response_data
+        return query.apply(response_data)
 
-        if isinstance(response_data, list):
-            if isinstance(filter_keys, str):
-                response_data = [
-                    self._get_nested_value(item, filter_keys) for item in response_data
-                ]
-            else:
-                response_data = [
-                    {
-                        key: self._get_nested_value(item, key)
-                        for key in filter_keys
-                        if self._get_nested_value(item, key) is not None
-                    }
-                    for item in response_data
-                ]
-        elif isinstance(response_data, dict):
-            if isinstance(filter_keys, str):
-                response_data = self._get_nested_value(response_data, filter_keys)
-            else:
-                response_data = {
-                    key: self._get_nested_value(response_data, key)
-                    for key in filter_keys
-                    if self._get_nested_value(response_data, key) is not None
-                }
-
-        return response_data
+    @staticmethod
+    def _response_data(response: Response | dict):
+        """The ``data`` of a backend result, a ``Response`` or a result dictionary."""
+        if isinstance(response, Response):
+            return response.data
+        body = response.get("response")
+        return body.get("data") if isinstance(body, dict) else None
 
-    def _response_analyze(self, response, filter_keys=None) -> str | list | dict | None:
-        try:
-            if filter_keys and isinstance(filter_keys, str) and filter_keys == "_raw_":
-                return response
-            if response is None or not response.get("success"):
-                raise Exception(response)
-            response = response.get("response", {})
-            if response is None:
-                raise Exception(response)
-            response_data = response.get("data")
-            if response_data is None:
-                return None
-            return self._filter_response(response_data, filter_keys)
-        except Exception as e:
-            logger.debug(f"WARING: Failed to execute: {e}")
+    def _response_analyze(
+        self, response, filter_keys=None, query: Query = None
+    ) -> str | list | dict | None:
+        if filter_keys == "_raw_":
+            # callers only check success, the body is never decoded
+            return response
+        if response is None or not response.get("success"):
+            logger.debug(f"WARNING: Failed to execute: {response}")
+            return None
+        response_data = self._response_data(response)
+        if response_data is None:
             return None
+        return self._filter_response(response_data, filter_keys, query)
 
     def _execute(
         self,
         data=None,
         filter_keys=None,
         params: dict = None,
-        task_id: str = None,
+        path: tuple[str, ...] = None,
         request_params: dict = None,
+        where: dict | Callable[[Any], bool] = None,
+        order_by: str | list[str] = None,
+        limit: int = None,
+        priority: Priority | str = None,
     ) -> str | list | dict | None:
+        """
+        Perform the request and return its data.
+
+        ``filter_keys`` projects the fields of each item, ``where`` selects the
+        items, ``order_by`` sorts them (``"-key"`` descending) and ``limit`` caps
+        their number, all evaluated in one pass over the list. ``priority`` sets
+        the rate limit class of the request (``Priority.BACKGROUND`` for polling).
+        """
         # logger.debug("_execute")
+        query = Query(filter_keys, where, order_by, limit)
         request_params = request_params or self._request_prepare(
-            data, task_id=task_id, params=params
+            path, data=data, params=params
         )
+        if priority is not None:
+            request_params = {**request_params, "priority": priority}
         response = self.request(**request_params)
-        return self._response_analyze(response, filter_keys=filter_keys)
+        return self._response_analyze(response, filter_keys=filter_keys, query=query)
 
     async def _async_execute(
         self,
         data=None,
         filter_keys=None,
         params: dict = None,
-        task_id: str = None,
+        path: tuple[str, ...] = None,
         request_params: dict = None,
+        where: dict | Callable[[Any], bool] = None,
+        order_by: str | list[str] = None,
+        limit: int = None,
+        priority: Priority | str = None,
     ) -> str | list | dict | None:
+        """Async counterpart of ``_execute``."""
         # logger.debug("_async_execute")
+        query = Query(filter_keys, where, order_by, limit)
         request_params = request_params or self._request_prepare(
-            data, task_id=task_id, params=params
+            path, data=data, params=params
         )
+        if priority is not None:
+            request_params = {**request_params, "priority": priority}
         response = await self.async_request(**request_params)
-        return self._response_analyze(response, filter_keys=filter_keys)
+        return self._response_analyze(response, filter_keys=filter_keys, query=query)
+
+    def _stream(
+        self,
+        filter_keys=None,
+        params: dict = None,
+        path: tuple[str, ...] = None,
+        where: dict | Callable[[Any], bool] = None,
+        limit: int = None,
+    ) -> Iterator:
+        """
+        Yield the items of a list endpoint as they are received, with ``filter_keys``
+        applied to each of them. Memory stays flat however long the list is.
+
+        ``where`` and ``limit`` select the items as for ``get``, the download
+        stops once ``limit`` items were yielded. Sorting needs the whole list,
+        use ``get`` with ``order_by`` for it. A response that is not a list is
+        yielded as one item.
+
+        A failed request raises ``StreamError``. The stream goes straight to the
+        backend, without the retries, circuit breaker, rate limit, concurrency
+        limit and interceptors of ``request``: items already yielded can't be
+        taken back by a retry.
+        """
+        query, remaining = Query(filter_keys, where), limit
+        request_params = self._request_prepare(path, params=params)
+        parser = JSONArrayStream()
+        chunks = self.stream_request(**request_params)
+        try:
+            for chunk in chunks:
+                for item in query.scan(parser.feed(chunk)):
+                    if remaining == 0:
+                        return
+                    yield item
+                    if remaining is not None:
+                        remaining -= 1
+                if parser.done or remaining == 0:
+                    break
+            else:
+                # the body had no array
+                for item in query.scan(parser.close()):
+                    if remaining != 0:
+                        yield item
+        finally:
+            chunks.close()
+
+    async def _async_stream(
+        self,
+        filter_keys=None,
+        params: dict = None,
+        path: tuple[str, ...] = None,
+        where: dict | Callable[[Any], bool] = None,
+        limit: int = None,
+    ) -> AsyncIterator:
+        """Async generator counterpart of ``_stream``."""
+        query, remaining = Query(filter_keys, where), limit
+        request_params = self._request_prepare(path, params=params)
+        parser = JSONArrayStream()
+        chunks = self.async_stream_request(**request_params)
+        try:
+            async for chunk in chunks:
+                for item in query.scan(parser.feed(chunk)):
+                    if remaining == 0:
+                        return
+                    yield item
+                    if remaining is not None:
+                        remaining -= 1
+                if parser.done or remaining == 0:
+                    break
+            else:
+                # the body had no array
+                for item in query.scan(parser.close()):
+                    if remaining != 0:
+                        yield item
+        finally:
+            await chunks.aclose()
 
 
 if __name__ == "__main__":
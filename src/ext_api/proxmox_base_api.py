@@ -1,4 +1,7 @@
 import logging
+import time
+from functools import partial
+from typing import AsyncIterator, Iterator
 
 from config_loader.config import configuration
 from ext_api.backends.backend_abstract import ProxmoxBackend
@@ -7,18 +10,79 @@ from ext_api.backends.backend_registry import (
     BackendRegistry,
     BackendType,
 )
+from ext_api.circuit_breaker import CircuitBreaker
+from ext_api.concurrency import AdaptiveLimit, AdaptiveLimitBase, AsyncAdaptiveLimit
+from ext_api.interceptors import Interceptor, InterceptorChain
+from ext_api.rate_limit import Priority, RateLimiter
+from ext_api.retry import RetryPolicy
+from ext_api.single_flight import SingleFlight
 
 logger = logging.getLogger(f"CT.{__name__}")
 
 
 class ProxmoxBaseAPI:
+    HTTPS_POOL_KEYS = (
+        "http2",
+        "max_connections",
+        "max_keepalive_connections",
+        "keepalive_expiry",
+        "timeout_connect",
+        "timeout_read",
+        "timeout_write",
+        "timeout_pool",
+        "endpoint_strategy",
+        "endpoint_max_failures",
+        "endpoint_cooldown",
+        "node_affinity",
+        "node_affinity_ttl",
+        "session_idle_timeout",
+    )
+
     def __init__(
         self,
         backend: ProxmoxBackend | None = None,
         backend_type: str | BackendType | None = BackendType.SYNC,
         backend_name: str = "https",
+        single_flight: bool | None = None,
+        retry: RetryPolicy | bool | None = None,
+        circuit_breaker: CircuitBreaker | bool | None = None,
+        rate_limit: RateLimiter | bool | None = None,
+        concurrency: AdaptiveLimitBase | bool | None = None,
+        interceptors: list[Interceptor] | None = None,
         **kwargs,
     ):
+        """
+        Args:
+            backend (ProxmoxBackend, optional): Ready backend instance to use.
+            backend_type (str | BackendType, optional): "sync" or "async".
+            backend_name (str, optional): Registered backend name ("https", "cli", "ssh").
+            single_flight (bool, optional): Coalesce identical GET requests that are
+                in flight at the same time, ``API.SINGLE_FLIGHT`` config by default.
+            retry (RetryPolicy | bool, optional): Retry policy of failed requests,
+                False disables retries, built from the ``API.RETRY_*`` config by default.
+            circuit_breaker (CircuitBreaker | bool, optional): Circuit breaker per node,
+                True enables it with the ``API.CIRCUIT_*`` settings, False disables it,
+                ``API.CIRCUIT_BREAKER`` config (off) by default.
+            rate_limit (RateLimiter | bool, optional): Token buckets per endpoint host,
+                False disables them, built from the ``API.RATE_*`` config by default.
+            concurrency (AdaptiveLimitBase | bool, optional): Adaptive limit of requests
+                in flight, False disables it, built from the ``API.CONCURRENCY_*``
+                config by default.
+            interceptors (list[Interceptor], optional): Hooks called in order around
+                every request, more can be added with ``interceptors.add``.
+            **kwargs: Backend parameters overriding the config.
+        """
+        if single_flight is None:
+            single_flight = configuration.get("API.SINGLE_FLIGHT", False)
+        self.single_flight: SingleFlight | None = (
+            SingleFlight() if single_flight else None
+        )
+        if retry is None or retry is True:
+            retry = self.retry_policy()
+        self.retry: RetryPolicy | None = retry or None
+        if circuit_breaker is None or circuit_breaker is True:
+            circuit_breaker = self.circuit_breaker_policy(enabled=circuit_breaker)
+        self.circuit_breaker: CircuitBreaker | None = circuit_breaker or None
         try:
             self.backend_type = (
                 BackendType(backend_type.strip().lower())
@@ -39,6 +103,13 @@ class ProxmoxBaseAPI:
                 self._backend = backend
         else:
             self._backend = self._create_backend(**kwargs)
+        if rate_limit is None or rate_limit is True:
+            rate_limit = self.rate_limiter(self.backend_type == BackendType.ASYNC)
+        self.rate_limit: RateLimiter | None = rate_limit or None
+        if concurrency is None or concurrency is True:
+            concurrency = self.concurrency_limit(self.backend_type == BackendType.ASYNC)
+        self.concurrency: AdaptiveLimitBase | None = concurrency or None
+        self.interceptors = InterceptorChain(interceptors)
 
     def _create_backend(self, **kwargs) -> ProxmoxBackend:
         """Factory method to create the appropriate backend."""
@@ -58,10 +129,20 @@ class ProxmoxBaseAPI:
                     "token": kwargs.get("token") or configuration.get("API.TOKEN"),
                     "verify_ssl": verify_ssl,
                 }
+                # endpoints, connection pool and timeouts, backend defaults when not configured
+                for key in self.HTTPS_POOL_KEYS:
+                    value = kwargs.get(key, configuration.get(f"API.{key.upper()}"))
+                    if value is not None:
+                        params[key] = value
             case "cli":
                 params = {
                     "entry_point": kwargs.get("entry_point")
                     or configuration.get("CLI.ENTRY_POINT"),
+                    "workers": kwargs.get(
+                        "workers", configuration.get("CLI.WORKERS", 0)
+                    ),
+                    "worker_command": kwargs.get("worker_command")
+                    or configuration.get("CLI.WORKER_COMMAND"),
                 }
             case "ssh":
                 params = {
@@ -81,6 +162,17 @@ class ProxmoxBaseAPI:
                         "disable_host_key_checking",
                         configuration.get("SSH.DISABLE_HOST_KEY_CHECKING", False),
                     ),
+                    "pool_size": kwargs.get(
+                        "pool_size", configuration.get("SSH.POOL_SIZE", 2)
+                    ),
+                    "max_channels": kwargs.get(
+                        "max_channels", configuration.get("SSH.MAX_CHANNELS", 8)
+                    ),
+                    "batch": kwargs.get("batch", configuration.get("SSH.BATCH", False)),
+                    "session_idle_timeout": kwargs.get(
+                        "session_idle_timeout",
+                        configuration.get("SSH.SESSION_IDLE_TIMEOUT", 300.0),
+                    ),
                 }
             case _:
                 params = {}
@@ -127,17 +219,211 @@ class ProxmoxBaseAPI:
             if hasattr(self._backend, "__aexit__"):
                 await self._backend.__aexit__(exc_type, exc_val, exc_tb)
 
+    def _single_flight_key(self, args: tuple, kwargs: dict) -> tuple | None:
+        """Key of a plain keyword GET request, ``None`` if it must not be coalesced."""
+        if self.single_flight is None or args or kwargs.get("data"):
+            return None
+        if (kwargs.get("method") or "").lower() != "get":
+            return None
+        if not set(kwargs) <= {"method", "endpoint", "params", "data"}:
+            return None
+        return self.single_flight.make_key(
+            kwargs.get("method"), kwargs.get("endpoint"), kwargs.get("params")
+        )
+
+    @staticmethod
+    def retry_policy() -> RetryPolicy | None:
+        """The retry policy of the ``API.RETRY_*`` config, ``None`` if retries are off."""
+        max_retries = configuration.get("API.RETRIES", 2)
+        if not max_retries:
+            return None
+        params = {"max_retries": max_retries}
+        for key in ("backoff", "backoff_max", "jitter", "statuses"):
+            value = configuration.get(f"API.RETRY_{key.upper()}")
+            if value is not None:
+                params[key] = value
+        return RetryPolicy(**params)
+
+    @staticmethod
+    def circuit_breaker_policy(enabled: bool | None = None) -> CircuitBreaker | None:
+        """
+        The circuit breaker of the ``API.CIRCUIT_*`` config, ``None`` if it is off.
+
+        ``enabled`` overrides ``API.CIRCUIT_BREAKER``.
+        """
+        if enabled is None:
+            enabled = configuration.get("API.CIRCUIT_BREAKER", False)
+        if not enabled:
+            return None
+        params = {}
+        for key in ("failure_threshold", "reset_timeout", "half_open_probes"):
+            value = configuration.get(f"API.CIRCUIT_{key.upper()}")
+            if value is not None:
+                params[key] = value
+        return CircuitBreaker(**params)
+
+    @staticmethod
+    def rate_limiter(asynchronous: bool) -> RateLimiter | None:
+        """The rate limiter of the ``API.RATE_*`` config, ``None`` if it is off."""
+        rate = configuration.get("API.RATE_LIMIT", 0)
+        if not rate:
+            return None
+        return RateLimiter(
+            rate,
+            burst=configuration.get("API.RATE_BURST", 10),
+            background_reserve=configuration.get("API.RATE_BACKGROUND_RESERVE", 0),
+            asynchronous=asynchronous,
+        )
+
+    @staticmethod
+    def concurrency_limit(asynchronous: bool) -> AdaptiveLimitBase | None:
+        """
+        The adaptive limit of requests in flight of the ``API.CONCURRENCY_*``
+        config, ``None`` if it is off.
+        """
+        if not configuration.get("API.ADAPTIVE_CONCURRENCY", False):
+            return None
+        limit_cls = AsyncAdaptiveLimit if asynchronous else AdaptiveLimit
+        return limit_cls(
+            "requests",
+            initial=configuration.get("API.CONCURRENCY_INITIAL", 8),
+            min_limit=configuration.get("API.CONCURRENCY_MIN", 1),
+            max_limit=configuration.get("API.CONCURRENCY_MAX", 32),
+            target_p95=configuration.get("API.CONCURRENCY_TARGET_P95", 2.0),
+            max_error_rate=configuration.get("API.CONCURRENCY_MAX_ERROR_RATE", 0.1),
+            window=configuration.get("API.CONCURRENCY_WINDOW", 20),
+        )
+
+    def _throttled(self, send, kwargs: dict, priority: Priority):
+        """Send the request when the rate limit of its host lets it through."""
+        bucket = self.rate_limit.bucket(
+            self._backend.host_of(kwargs.get("endpoint"), kwargs.get("endpoint_params"))
+        )
+        bucket.acquire(priority)
+        return send()
+
+    async def _async_throttled(self, send, kwargs: dict, priority: Priority):
+        bucket = self.rate_limit.bucket(
+            self._backend.host_of(kwargs.get("endpoint"), kwargs.get("endpoint_params"))
+        )
+        await bucket.acquire(priority)
+        return await send()
+
+    def _limited(self, send):
+        """Send the request in a slot of the adaptive limit, recording its outcome."""
+        with self.concurrency:
+            start = time.monotonic()
+            result = send()
+            self.concurrency.record(
+                time.monotonic() - start, CircuitBreaker.is_failure(result)
+            )
+        return result
+
+    async def _async_limited(self, send):
+        async with self.concurrency:
+            start = time.monotonic()
+            result = await send()
+            self.concurrency.record(
+                time.monotonic() - start, CircuitBreaker.is_failure(result)
+            )
+        return result
+
+    @staticmethod
+    def _method_endpoint(args: tuple, kwargs: dict) -> tuple[str | None, str | None]:
+        method = kwargs.get("method", args[0] if args else None)
+        endpoint = kwargs.get("endpoint", args[1] if len(args) > 1 else None)
+        endpoint_params = kwargs.get("endpoint_params")
+        if endpoint and endpoint_params:
+            endpoint = endpoint.format(**endpoint_params)
+        return method, endpoint
+
+    def _send(self, args: tuple, kwargs: dict, priority=None):
+        """
+        Call the backend: in a slot of the adaptive concurrency limit, rate
+        limited by priority, through the circuit breaker, retried by the policy.
+        """
+        method, endpoint = self._method_endpoint(args, kwargs)
+        send = partial(self._backend.request, *args, **kwargs)
+        if self.concurrency is not None:
+            send = partial(self._limited, send)
+        if self.rate_limit is not None:
+            send = partial(self._throttled, send, kwargs, Priority.of(method, priority))
+        if self.circuit_breaker is not None:
+            send = partial(self.circuit_breaker.call, endpoint, send)
+        if self.retry is None:
+            return send()
+        return self.retry.call(method, endpoint, send)
+
+    async def _async_send(self, args: tuple, kwargs: dict, priority=None):
+        method, endpoint = self._method_endpoint(args, kwargs)
+        send = partial(self._backend.async_request, *args, **kwargs)
+        if self.concurrency is not None:
+            send = partial(self._async_limited, send)
+        if self.rate_limit is not None:
+            send = partial(
+                self._async_throttled, send, kwargs, Priority.of(method, priority)
+            )
+        if self.circuit_breaker is not None:
+            send = partial(self.circuit_breaker.call_async, endpoint, send)
+        if self.retry is None:
+            return await send()
+        return await self.retry.call_async(method, endpoint, send)
+
     def request(self, *args, **kwargs):
-        """Make a synchronous request."""
+        """
+        Make a synchronous request.
+
+        ``priority`` (``Priority``) sets the rate limit class of the request,
+        by default GET requests are interactive and the others mutations.
+        """
         if self.backend_type != "sync":
             raise RuntimeError("This instance is configured for asynchronous requests.")
-        return self._backend.request(*args, **kwargs)
+        priority = kwargs.pop("priority", None)
+        if self.interceptors:
+            return self.interceptors.call(self._request, args, kwargs, priority)
+        return self._request(args, kwargs, priority)
+
+    def _request(self, args: tuple, kwargs: dict, priority=None):
+        key = self._single_flight_key(args, kwargs)
+        if key is None:
+            return self._send(args, kwargs, priority)
+        return self.single_flight.do(key, partial(self._send, args, kwargs, priority))
 
     async def async_request(self, *args, **kwargs):
         """Make an asynchronous request."""
         if self.backend_type != "async":
             raise RuntimeError("This instance is configured for synchronous requests.")
-        return await self._backend.async_request(*args, **kwargs)
+        priority = kwargs.pop("priority", None)
+        if self.interceptors:
+            return await self.interceptors.call_async(
+                self._async_request, args, kwargs, priority
+            )
+        return await self._async_request(args, kwargs, priority)
+
+    async def _async_request(self, args: tuple, kwargs: dict, priority=None):
+        key = self._single_flight_key(args, kwargs)
+        if key is None:
+            return await self._async_send(args, kwargs, priority)
+        return await self.single_flight.do_async(
+            key, partial(self._async_send, args, kwargs, priority)
+        )
+
+    def stream_request(self, *args, **kwargs) -> Iterator[bytes]:
+        """
+        Make a synchronous request, yields the body as byte chunks.
+
+        Sent straight to the backend, without the retry, circuit breaker, rate
+        limit, concurrency and interceptor layers of ``request``.
+        """
+        if self.backend_type != "sync":
+            raise RuntimeError("This instance is configured for asynchronous requests.")
+        return self._backend.stream(*args, **kwargs)
+
+    def async_stream_request(self, *args, **kwargs) -> AsyncIterator[bytes]:
+        """Make an asynchronous request, yields the body as byte chunks."""
+        if self.backend_type != "async":
+            raise RuntimeError("This instance is configured for synchronous requests.")
+        return self._backend.async_stream(*args, **kwargs)
 
 
 # TEST JUST
@@ -0,0 +1,236 @@
+"""
+Compiled queries over API responses.
+
+Dotted key paths (``"kernel.cpu"``, ``"disks.0.size"``) are split once into
+accessor closures, cached per key path and per set of ``filter_keys``, so
+filtering a list walks each item without parsing any path again. ``Query`` adds
+``where``, ``order_by`` and ``limit`` on top of the projection, evaluated in one
+pass over the items.
+"""
+
+import heapq
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+Accessor = Callable[[Any], Any]
+
+
+@lru_cache(maxsize=1024)
+def accessor(key_path: str) -> Accessor:
+    """
+    Returns a function fetching the value of a dotted key path, ``None`` if not found.
+
+    Dictionaries are indexed by key, lists by the digit parts of the path.
+    """
+    keys = tuple(
+        (key, int(key) if key.isdigit() else None) for key in key_path.split(".")
+    )
+    if len(keys) == 1:
+        key, index = keys[0]
+
+        def get(data):
+            try:
+                return data.get(key)
+            except AttributeError:
+                if index is not None and isinstance(data, list):
+                    try:
+                        return data[index]
+                    except IndexError:
+                        return None
+                return None
+
+        return get
+
+    def get(data):
+        for key, index in keys:
+            if isinstance(data, dict):
+                data = data.get(key)
+            elif isinstance(data, list) and index is not None:
+                try:
+                    data = data[index]
+                except IndexError:
+                    return None
+            else:
+                return None
+            if data is None:
+                return None
+        return data
+
+    return get
+
+
+@lru_cache(maxsize=256)
+def projection(filter_keys: str | tuple[str, ...]) -> Accessor:
+    """
+    Returns the function applying ``filter_keys`` to one item.
+
+    A single key path maps the item to its value, several key paths map it to a
+    dictionary of the values found, keys with a ``None`` value are left out.
+    """
+    if isinstance(filter_keys, str):
+        return accessor(filter_keys)
+    getters = tuple((key, accessor(key)) for key in filter_keys)
+
+    def project(item):
+        result = {}
+        for key, get in getters:
+            value = get(item)
+            if value is not None:
+                result[key] = value
+        return result
+
+    return project
+
+
+EQUAL, MEMBER, CALL = range(3)
+
+
+def predicate(where) -> Callable[[Any], bool] | None:
+    """
+    Compiles ``where`` into a function of one item.
+
+    ``where`` is a function of the item, or a dictionary of key path to the
+    expected value: a function of the value, a set or tuple of accepted values,
+    or a value compared with ``==``. All conditions of the dictionary must hold.
+    """
+    if not where:
+        return None
+    if callable(where):
+        return where
+    # top-level equalities skip the accessor call
+    equal = []
+    conditions = []
+    for key_path, expected in where.items():
+        if callable(expected):
+            conditions.append((accessor(key_path), CALL, expected))
+        elif isinstance(expected, (set, frozenset, tuple)):
+            conditions.append((accessor(key_path), MEMBER, expected))
+        elif "." in key_path:
+            conditions.append((accessor(key_path), EQUAL, expected))
+        else:
+            equal.append((key_path, expected))
+    equal = tuple(equal)
+    conditions = tuple(conditions)
+
+    def match(item) -> bool:
+        try:
+            for key, expected in equal:
+                if item.get(key) != expected:
+                    return False
+        except AttributeError:
+            return False
+        for get, kind, expected in conditions:
+            value = get(item)
+            if kind == EQUAL:
+                if value != expected:
+                    return False
+            elif kind == MEMBER:
+                if value not in expected:
+                    return False
+            elif not expected(value):
+                return False
+        return True
+
+    return match
+
+
+def sort_key(order_by: str | Iterable[str]) -> tuple[Accessor, bool]:
+    """
+    Compiles ``order_by`` into a sort key function and the reverse flag.
+
+    A key path prefixed with ``-`` sorts in descending order, several key paths
+    sort by each of them in turn and must share the direction. Items without the
+    value sort last.
+    """
+    paths = [order_by] if isinstance(order_by, str) else list(order_by)
+    reverse = {path.startswith("-") for path in paths}
+    if len(reverse) != 1:
+        raise ValueError(f"order_by keys must share one direction: {order_by}")
+    reverse = reverse.pop()
+    getters = tuple(accessor(path.lstrip("-")) for path in paths)
+
+    if len(getters) == 1:
+        get = getters[0]
+
+        def key(item):
+            value = get(item)
+            return (value is None) != reverse, value
+
+        return key, reverse
+
+    def key(item):
+        result = []
+        for get in getters:
+            value = get(item)
+            result += ((value is None) != reverse, value)
+        return result
+
+    return key, reverse
+
+
+class Query:
+    """
+    Projection, selection, sorting and limit of a list response in one pass.
+
+    Selection runs on the full items, the projection of ``filter_keys`` only on
+    the items returned. Without ``order_by`` the scan stops at ``limit`` items,
+    with it only the ``limit`` best items are kept while scanning.
+    """
+
+    __slots__ = ("project", "match", "key", "reverse", "limit")
+
+    def __init__(
+        self,
+        filter_keys: str | Iterable[str] | None = None,
+        where: dict | Callable[[Any], bool] | None = None,
+        order_by: str | Iterable[str] | None = None,
+        limit: int | None = None,
+    ):
+        if filter_keys and not isinstance(filter_keys, str):
+            filter_keys = tuple(filter_keys)
+        self.project = projection(filter_keys) if filter_keys else None
+        self.match = predicate(where)
+        self.key, self.reverse = sort_key(order_by) if order_by else (None, False)
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit must not be negative: {limit}")
+        self.limit = limit
+
+    def __bool__(self) -> bool:
+        return bool(self.project or self.match or self.key or self.limit is not None)
+
+    def select(self, items: Iterable) -> Iterable:
+        """Yield the matching items, before sort and projection."""
+        if self.match is None:
+            return items
+        return filter(self.match, items)
+
+    def scan(self, items: Iterable) -> Iterator:
+        """Yield the projection of the matching items, in their order."""
+        project = self.project
+        for item in self.select(items):
+            yield project(item) if project else item
+
+    def apply(self, data):
+        """
+        Returns the query result of a response.
+
+        A list is queried item by item, a dictionary is projected only.
+        """
+        if isinstance(data, dict):
+            return self.project(data) if self.project else data
+        if not isinstance(data, list):
+            return data
+        items = self.select(data)
+        if self.key is not None:
+            if self.limit is None:
+                items = sorted(items, key=self.key, reverse=self.reverse)
+            elif self.reverse:
+                items = heapq.nlargest(self.limit, items, key=self.key)
+            else:
+                items = heapq.nsmallest(self.limit, items, key=self.key)
+        elif self.limit is not None:
+            items = islice(items, self.limit)
+        if self.project is None:
+            return items if isinstance(items, list) else list(items)
+        return [self.project(item) for item in items]
@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from enum import IntEnum
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class Priority(IntEnum):
+    """Request priority classes, lower values are served first."""
+
+    MUTATION = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+    @classmethod
+    def of(cls, method: str | None, priority: "Priority | int | str | None" = None):
+        """The priority given by the caller, by the request method otherwise."""
+        if priority is not None:
+            if isinstance(priority, str):
+                return cls[priority.upper()]
+            return cls(priority)
+        return cls.INTERACTIVE if (method or "").lower() == "get" else cls.MUTATION
+
+
+class TokenBucketBase:
+    """
+    Token bucket with waiters served by priority.
+
+    Tokens are added at ``rate`` per second up to ``burst``, a request takes one.
+    Waiters are served in order of priority, then arrival, so a queued mutation
+    is sent before any poll that is queued. Background requests also leave
+    ``reserve`` tokens in the bucket for real work arriving later.
+
+    Attributes:
+        waited (int): Requests that had to wait for a token.
+        served (dict): Requests served by priority.
+    """
+
+    def __init__(self, rate: float, burst: float = 10, reserve: float = 0):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive: {rate}")
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.reserve = min(float(reserve), self.burst - 1)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._sequence = itertools.count()
+        self.waited = 0
+        self.served = {priority: 0 for priority in Priority}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _needed(self, priority: Priority) -> float:
+        return 1 + self.reserve if priority == Priority.BACKGROUND else 1
+
+    def _take(self, priority: Priority):
+        self.tokens -= 1
+        self.served[priority] += 1
+
+    def _delay(self, priority: Priority) -> float:
+        """Seconds until the bucket holds the tokens ``priority`` needs."""
+        return max(0.0, (self._needed(priority) - self.tokens) / self.rate)
+
+
+class TokenBucket(TokenBucketBase):
+    """``TokenBucketBase`` for any number of threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+        self._waiters: list[tuple[int, int]] = []
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        with self._condition:
+            self._refill(time.monotonic())
+            if not self._waiters and self.tokens >= self._needed(priority):
+                self._take(priority)
+                return
+            self.waited += 1
+            waiter = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    self._refill(time.monotonic())
+                    if self._waiters[0] == waiter:
+                        delay = self._delay(priority)
+                        if delay <= 0:
+                            heapq.heappop(self._waiters)
+                            self._take(priority)
+                            return
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                # the next waiter may be served now
+                self._condition.notify_all()
+
+
+class AsyncTokenBucket(TokenBucketBase):
+    """``TokenBucketBase`` for the tasks of one event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        self._refill(time.monotonic())
+        if not self._waiters and self.tokens >= self._needed(priority):
+            self._take(priority)
+            return
+        self.waited += 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._waiters[0][2] is future and self._timer is not None:
+            # queued ahead of the waiter the timer was set for
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the token was handed over already, give it back
+                self.tokens += 1
+            self._release()
+            raise
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        delay = self._delay(self._waiters[0][0])
+        self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill(time.monotonic())
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < self._needed(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._take(priority)
+            future.set_result(None)
+        self._schedule()
+
+
+class RateLimiter:
+    """
+    Token buckets per endpoint host.
+
+    Every host the backend sends requests to (the API endpoints, a node with
+    node affinity, the SSH host) gets its own bucket, created on first use.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 10,
+        background_reserve: float = 0,
+        asynchronous: bool = False,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.background_reserve = background_reserve
+        self._bucket_cls = AsyncTokenBucket if asynchronous else TokenBucket
+        self._lock = threading.Lock()
+        self.buckets: dict[str, TokenBucketBase] = {}
+
+    def bucket(self, host: str) -> TokenBucketBase:
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.get(host)
+                if bucket is None:
+                    bucket = self.buckets[host] = self._bucket_cls(
+                        self.rate, self.burst, self.background_reserve
+                    )
+        return bucket
+
+    @property
+    def stats(self) -> dict[str, dict]:
+        """Requests that waited and requests served by priority, per host."""
+        return {
+            host: {
+                "waited": bucket.waited,
+                "served": {p.name.lower(): n for p, n in bucket.served.items()},
+            }
+            for host, bucket in self.buckets.items()
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class RetryPolicy:
+    """
+    Retries of failed backend requests with exponential backoff and jitter.
+
+    A request is sent again when it failed in transport (``network_error`` in
+    the result) or with one of ``statuses`` (pveproxy 502-504, 595). Idempotent
+    methods (GET) are retried on any of them. Other methods are retried only
+    when the result tells the request was never sent (``sent`` is False, e.g. a
+    refused connection), so a mutation is never applied twice.
+
+    The delay before retry ``n`` is ``backoff * 2 ** (n - 1)``, at most
+    ``backoff_max``, reduced at random by up to ``jitter`` of it so that many
+    callers failing at once don't retry at once.
+
+    Attributes:
+        max_retries (int): Retries of one request at most, 0 disables them.
+        requests (int): Requests sent through the policy.
+        retries (int): Retries performed.
+        recovered (int): Requests that succeeded after a retry.
+        exhausted (int): Requests that still failed after the last retry.
+        reasons (Counter): Retries by reason (``HTTP 503``, ``network``).
+    """
+
+    IDEMPOTENT_METHODS = ("get",)
+    # not 500: pveproxy returns it for deterministic errors, e.g. a missing VM
+    STATUSES = (502, 503, 504, 595)
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        backoff_max: float = 10.0,
+        jitter: float = 0.5,
+        statuses: tuple[int, ...] | list[int] = STATUSES,
+    ):
+        if max_retries < 0:
+            raise ValueError(f"max_retries must not be negative: {max_retries}")
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"jitter must be between 0 and 1: {jitter}")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.recovered = 0
+        self.exhausted = 0
+        self.reasons: Counter = Counter()
+
+    def reason(self, method: str | None, result) -> str | None:
+        """Why the result may be retried, ``None`` if it must not be."""
+        if not result or result.get("success"):
+            return None
+        idempotent = (method or "").lower() in self.IDEMPOTENT_METHODS
+        if result.get("network_error"):
+            if idempotent or result.get("sent") is False:
+                return "network"
+            return None
+        status_code = result.get("status_code")
+        if idempotent and status_code in self.statuses:
+            return f"HTTP {status_code}"
+        return None
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number ``retry`` (1-based)."""
+        delay = min(self.backoff_max, self.backoff * 2 ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def _next(self, method: str | None, endpoint, result, retry: int) -> float | None:
+        """Count the outcome of an attempt, returns the delay of the next one."""
+        reason = self.reason(method, result)
+        with self._lock:
+            if retry == 0:
+                self.requests += 1
+            if reason is None:
+                if retry and result and result.get("success"):
+                    self.recovered += 1
+                return None
+            if retry >= self.max_retries:
+                self.exhausted += int(self.max_retries > 0)
+                return None
+            self.retries += 1
+            self.reasons[reason] += 1
+        delay = self.delay(retry + 1)
+        logger.warning(
+            f"Retry {retry + 1}/{self.max_retries} of {(method or '').upper()} {endpoint}: "
+            f"{reason}, in {delay:.2f}s"
+        )
+        return delay
+
+    def call(self, method: str | None, endpoint, send: Callable[[], dict]) -> dict:
+        """Send a sync request, retrying it by the policy."""
+        retry = 0
+        while True:
+            result = send()
+            delay = self._next(method, endpoint, result, retry)
+            if delay is None:
+                return result
+            time.sleep(delay)
+            retry += 1
+
+    async def call_async(
+        self, method: str | None, endpoint, send: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """Send an async request, retrying it by the policy."""
+        retry = 0
+        while True:
+            result = await send()
+            delay = self._next(method, endpoint, result, retry)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
+            retry += 1
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "recovered": self.recovered,
+                "exhausted": self.exhausted,
+                "reasons": dict(self.reasons),
+            }
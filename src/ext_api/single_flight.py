@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(f"CT.{__name__}")
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests that are in flight at the same time.
+
+    The first caller of a key (the leader) performs the call, callers that
+    arrive with the same key before it finished wait for the leader and get the
+    same result object, or the same exception. Nothing is cached: once the call
+    finished the next caller of the key performs a new one.
+
+    Sync callers from any number of threads use ``do``, async callers use
+    ``do_async``. The async call runs as its own task, so cancelling the caller
+    that started it does not cancel it for the others.
+
+    Attributes:
+        calls (int): Number of calls performed.
+        coalesced (int): Number of callers served by a call of another caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_calls: dict[Hashable, concurrent.futures.Future] = {}
+        self._async_calls: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(method: str, endpoint: str, params: dict = None) -> tuple:
+        return (
+            (method or "").lower(),
+            (endpoint or "").strip("/"),
+            json.dumps(params or {}, sort_keys=True, default=str),
+        )
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._sync_calls.get(key)
+            if future is None:
+                future = self._sync_calls[key] = concurrent.futures.Future()
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        # keys are scoped to the running loop, tasks of another loop can't be awaited
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._async_calls.get(key)
+        if task is None:
+            task = self._async_calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda t: self._async_done(key, t))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _async_done(self, key: Hashable, task: asyncio.Task):
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+        if not task.cancelled():
+            # retrieved by the waiters, mark it for tasks nobody waits for anymore
+            task.exception()
+
+    def report(self) -> str:
+        return f"Single-flight: {self.calls} requests sent, {self.coalesced} coalesced"
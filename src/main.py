@@ -1,5 +1,4 @@
 import argparse
-import asyncio
 import logging
 import os
 import sys
@@ -10,8 +9,6 @@ sys.path.insert(0, str(Path(__file__).parent))
 # sys.path.insert(1, str(Path(__file__).parent.parent))
 
 from cluster_tasks.configure_logging import config_logger
-from cluster_tasks.controller_sync import main as controller_sync
-from cluster_tasks.controller_async import main as controller_async
 from config_loader.config import configuration, initialize
 
 try:
@@ -36,11 +33,19 @@ def get_version():
     return version
 
 
+# the controllers (API, backends, scenarios) are imported once a run is chosen,
+# after the config file of the command line is loaded
+
+
 def main(cli_args=None, **kwargs):
+    from cluster_tasks.controller_sync import main as controller_sync
+
     controller_sync(cli_args)
 
 
 async def async_main(cli_args=None, **kwargs):
+    from cluster_tasks.controller_async import main as controller_async
+
     await controller_async(cli_args)
 
 
@@ -120,6 +125,8 @@ def cli():
         if args.sync:
             main(cli_args=cli_args)
         else:
+            import asyncio
+
             asyncio.run(async_main(cli_args=cli_args))
         logger.info(f"{project_name}: Finished")
     except KeyboardInterrupt:
@@ -1,4 +1,6 @@
+import asyncio
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import httpx
 import pytest
@@ -134,6 +136,72 @@ async def test_api_version_cli_async(mock_backend_settings, get_api_async, mocke
         assert version.get("release") == "mock-8.3"
 
 
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_api_path_builder_is_immutable(get_api):
+    nodes = get_api.nodes("pve1")
+    qemu = nodes.qemu(100)
+    lxc = nodes.lxc(200)
+    assert qemu.status.current.get(get_request_param=True) == {
+        "method": "get",
+        "endpoint": "nodes/pve1/qemu/100/status/current",
+        "data": None,
+        "params": None,
+    }
+    assert lxc.config.set(data={"tags": "a"}, get_request_param=True) == {
+        "method": "put",
+        "endpoint": "nodes/pve1/lxc/200/config",
+        "data": {"tags": "a"},
+        "params": None,
+    }
+    assert nodes.get(get_request_param=True)["endpoint"] == "nodes/pve1"
+    with pytest.raises(ValueError):
+        qemu.unknown_action(get_request_param=True)
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_api_path_builder_threads(get_api, mocker):
+    endpoints = []
+
+    def mock_request(method=None, endpoint=None, **kwargs):
+        endpoints.append(endpoint)
+        return {"response": {"data": endpoint}, "status_code": 200, "success": True}
+
+    mocker.patch.object(get_api.backend, "request", side_effect=mock_request)
+
+    def worker(index):
+        return [
+            get_api.nodes(f"pve{index}").qemu(vm_id).status.current.get()
+            for vm_id in range(200)
+        ]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(worker, range(8)))
+    for index, result in enumerate(results):
+        assert result == [
+            f"nodes/pve{index}/qemu/{vm_id}/status/current" for vm_id in range(200)
+        ]
+    assert len(endpoints) == 8 * 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_api_path_builder_interleaved_async(get_api_async, mocker):
+    async def mock_request(method=None, endpoint=None, **kwargs):
+        await asyncio.sleep(0)
+        return {"response": {"data": endpoint}, "status_code": 200, "success": True}
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        # Start both chains before awaiting any of them
+        qemu = api.nodes("pve1").qemu(100)
+        lxc = api.nodes("pve2").lxc(200)
+        results = await asyncio.gather(qemu.config.get(), lxc.status.current.get())
+    assert results == [
+        "nodes/pve1/qemu/100/config",
+        "nodes/pve2/lxc/200/status/current",
+    ]
+
+
 # @pytest.mark.asyncio
 # async def test_api_version_async2(api_handler_async):
 #     async with api_handler_async as handler:
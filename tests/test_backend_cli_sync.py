@@ -19,7 +19,7 @@ class BackendRequestCLITest(unittest.TestCase):
                 "method": "get",
                 "endpoint": "version",
             },
-            "return_value": '{"release":"8.3","repoid":"3e76eec21c4a14a7","version":"8.3.2"}',
+            "return_value": b'{"release":"8.3","repoid":"3e76eec21c4a14a7","version":"8.3.2"}',
         }
     }
 
@@ -54,7 +54,7 @@ class BackendRequestCLITest(unittest.TestCase):
             # Mock a successful subprocess run
             mock_process = mock.MagicMock()
             mock_process.stdout = return_value
-            mock_process.stderr = ""
+            mock_process.stderr = b""
             mock_process.returncode = return_code
             mock_subprocess_run.return_value = mock_process
             if is_error:
@@ -80,6 +80,7 @@ class BackendRequestCLITest(unittest.TestCase):
         self.assertIsNotNone(data.get("release"))
         self.assertEqual(result["status_code"], 0)
         self.assertTrue(result["success"])
+        self.assertNotIn("text", mock_subprocess_run.call_args.kwargs)
 
     @mock.patch("subprocess.run")
     def test_request_failure_backend_sync(self, mock_subprocess_run):
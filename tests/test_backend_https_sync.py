@@ -126,6 +126,30 @@ class BackendRequestHTTPSTest(unittest.TestCase):
         self.assertNotEqual(result["status_code"], request_data.get("return_code"))
         self.assertFalse(result["success"])
 
+    def test_client_pool_settings_backend_sync(self):
+        backend_cls = BackendRegistry.get_backend(self.backend_name)
+        backend = backend_cls(
+            base_url="https://fake_url:8006",
+            entry_point="/api2/json",
+            token="fake_token",
+            http2=False,
+            max_connections=8,
+            max_keepalive_connections=4,
+            keepalive_expiry=30,
+            timeout_read=60,
+        )
+        backend.connect()
+        try:
+            pool = backend.client._transport._pool
+            self.assertEqual(pool._max_connections, 8)
+            self.assertEqual(pool._max_keepalive_connections, 4)
+            self.assertEqual(pool._keepalive_expiry, 30)
+            self.assertFalse(pool._http2)
+            self.assertEqual(backend.client.timeout.read, 60)
+            self.assertEqual(backend.client.timeout.connect, 5.0)
+        finally:
+            backend.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,169 @@
+import asyncio
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from ext_api.backends.backend_cli import ProxmoxAsyncCLIBackend, ProxmoxCLIBackend
+from ext_api.backends.backend_ssh import ProxmoxSSHBackend
+from ext_api.backends.batch_session import AsyncBatchSession, BatchSession
+
+# stand-in for the remote helper: answers out of order, two requests at a time
+FAKE_HELPER = r"""
+import json, sys
+held = []
+for line in sys.stdin:
+    req = json.loads(line)
+    if req["path"] == "exit":
+        break
+    held.append(req)
+    if len(held) == 2 or req["path"].startswith("single"):
+        for req in reversed(held):
+            ok = "error" not in req["path"]
+            answer = {"id": req["id"], "ok": ok, "data": {"path": req["path"], **req["params"]} if ok else None,
+                      "error": None if ok else "no handler\n"}
+            sys.stdout.write(json.dumps(answer) + "\n")
+        sys.stdout.flush()
+        held = []
+"""
+
+
+class FakeChannel:
+    def exec_command(self, command):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", FAKE_HELPER],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def makefile_stdin(self, mode):
+        return self.process.stdin
+
+    def makefile(self, mode):
+        return self.process.stdout
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+def test_ssh_batch_session_pipelines_requests():
+    client = mock.MagicMock()
+    client.get_transport.return_value.open_session.return_value = FakeChannel()
+    batch = BatchSession.over_ssh(client, command="fake")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda i: batch.request(f"nodes/pve{i}/status", {"full": True}),
+                range(8),
+            )
+        )
+    assert [r["response"]["data"]["path"] for r in results] == [
+        f"nodes/pve{i}/status" for i in range(8)
+    ]
+    assert results[0]["response"]["data"]["full"] == "1"
+    failed = batch.request("single-error")
+    assert failed["success"] is False and failed["error"] == "no handler"
+    # helper gone: waiting requests fail, new ones are refused
+    batch.request("single")
+    with pytest.raises(ConnectionError):
+        batch.request("exit", timeout=5)
+    assert batch.closed
+    batch.close()
+
+
+def test_ssh_batch_session_dropped_with_its_connection(mocker):
+    backend = ProxmoxSSHBackend(
+        hostname="pve1", username="root", entry_point="pvesh", batch=True
+    )
+    mocker.patch.object(backend, "open_client", side_effect=mock.MagicMock)
+    mocker.patch.object(backend, "client_is_alive", lambda client: client.alive)
+    mocker.patch.object(
+        BatchSession,
+        "over_ssh",
+        side_effect=lambda client: mock.MagicMock(closed=False),
+    )
+    mocker.patch.object(backend, "show_host_key")
+    backend.connect()
+    first = backend.client
+    batch = backend.batch_session(first)
+    assert backend.batch_session(first) is batch
+    first.alive = False
+    with backend.session() as client:
+        assert client is not first
+    # the pool discarded the dead connection, its helper went with it
+    batch.close.assert_called_once()
+    first.close.assert_called_once()
+    assert first not in backend._batch_sessions
+    backend.batch_session(client)
+    backend.close()
+    assert len(backend._batch_sessions) == 0
+
+
+FAKE_ARGS = [sys.executable, "-c", FAKE_HELPER]
+
+
+@pytest.mark.asyncio
+async def test_async_batch_session_pipelines_requests():
+    batch = await AsyncBatchSession.spawn(FAKE_ARGS)
+    results = await asyncio.gather(
+        *(batch.request(f"nodes/pve{i}/qemu") for i in range(6))
+    )
+    assert [r["response"]["data"]["path"] for r in results] == [
+        f"nodes/pve{i}/qemu" for i in range(6)
+    ]
+    assert batch.requests == 6
+    with pytest.raises(ConnectionError):
+        await batch.request("exit")
+    await batch.close()
+
+
+def test_cli_backend_workers_answer_get_requests():
+    with ProxmoxCLIBackend(
+        entry_point="pvesh", workers=2, worker_command=FAKE_ARGS
+    ) as backend:
+        result = backend.request(
+            method="get",
+            endpoint="single/{node}/status",
+            endpoint_params={"node": "pve1"},
+        )
+        assert result["success"]
+        assert result["response"]["data"]["path"] == "single/pve1/status"
+        assert backend.worker_pool.started == 1
+
+
+def test_cli_backend_mutations_run_pvesh():
+    backend = ProxmoxCLIBackend(entry_point="pvesh", workers=2)
+    process = subprocess.CompletedProcess("", 0, stdout=b"null", stderr=b"")
+    with mock.patch("subprocess.run", return_value=process) as run:
+        for method in ("post", "put", "delete"):
+            result = backend.request(
+                method=method, endpoint="nodes/pve1/qemu/100/config"
+            )
+            assert result["success"]
+    assert [call.args[0].split()[:2] for call in run.call_args_list] == [
+        ["pvesh", "create"],
+        ["pvesh", "set"],
+        ["pvesh", "delete"],
+    ]
+    # the worker pool is never started for mutations
+    assert backend._workers is None
+
+
+@pytest.mark.asyncio
+async def test_async_cli_backend_workers_survive_exited_helper():
+    async with ProxmoxAsyncCLIBackend(
+        entry_point="pvesh", workers=2, worker_command=FAKE_ARGS
+    ) as backend:
+        results = await asyncio.gather(
+            *(backend.async_request(method="get", endpoint=f"n{i}") for i in range(4))
+        )
+        assert all(r["success"] for r in results)
+        assert backend.worker_pool.started == 2
+        failed = await backend.async_request(method="get", endpoint="exit")
+        assert failed["status_code"] == 1 and not failed["success"]
+        result = await backend.async_request(method="get", endpoint="single")
+        assert result["success"]
+        assert backend.worker_pool.started == 2
@@ -0,0 +1,98 @@
+import pytest
+
+from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+from ext_api.circuit_breaker import CircuitBreaker
+
+OK = {"response": {"data": {"status": "running"}}, "status_code": 200, "success": True}
+DOWN = {"response": {}, "status_code": 595, "success": False}
+NOT_FOUND = {"response": {}, "status_code": 404, "success": False}
+UPID = "UPID:pve2:00000064:00001234:65A00000:qmclone:100:root@pam:"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_states():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    assert breaker.node_of("nodes/pve1/qemu/100/status/current") == "pve1"
+    assert breaker.node_of("cluster/resources") is None
+    assert breaker.call("nodes/pve1/status", lambda: NOT_FOUND) is NOT_FOUND
+    breaker.call("nodes/pve1/status", lambda: DOWN)
+    assert breaker.state("pve1") == "closed"
+    breaker.call("nodes/pve1/status", lambda: DOWN)
+    assert breaker.state("pve1") == "open"
+    result = breaker.call("nodes/pve1/status", lambda: pytest.fail("sent"))
+    assert result["circuit_open"] and result["status_code"] == breaker.CIRCUIT_OPEN
+    assert breaker.retry_after("pve1") == 10
+    clock.now += 10
+    # one probe at a time while half-open, its failure opens the circuit again
+    assert breaker.allow("pve1") and not breaker.allow("pve1")
+    breaker.record("pve1", DOWN)
+    assert breaker.state("pve1") == "open"
+    clock.now += 10
+    assert breaker.call("nodes/pve1/status", lambda: OK) is OK
+    assert breaker.states() == {"pve1": "closed"}
+    assert breaker.stats["pve1"] == {
+        "state": "closed",
+        "failures": 0,
+        "opened": 2,
+        "rejected": 2,
+    }
+
+
+def test_api_fails_fast_and_tasks_report(get_api, mocker):
+    get_api.retry = None
+    get_api.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    request = mocker.patch.object(get_api.backend, "request", return_value=DOWN)
+    assert get_api.nodes("pve2").status.get() is None
+    assert get_api.nodes("pve2").status.get() is None
+    assert get_api.version.get() is None
+    assert request.call_count == 2
+    tasks = ProxmoxTasksSync(api=get_api)
+    assert tasks.node_circuit_state(UPID) == "open"
+    assert tasks.node_circuit_state("pve1") == "closed"
+    assert tasks.wait_node_available_sync("pve1")
+    assert not tasks.wait_node_available_sync("pve2", timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_wait_node_available_async(get_api_async, mocker):
+    async with get_api_async as api:
+        api.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        api.circuit_breaker.record("pve2", DOWN)
+        tasks = ProxmoxTasksAsync(api=api)
+        assert tasks.node_circuit_state("pve2") == "open"
+        assert await tasks.wait_node_available_async("pve2")
+        assert tasks.node_circuit_state("pve2") == "half-open"
+
+
+def test_application_errors_keep_the_circuit_closed():
+    breaker = CircuitBreaker(failure_threshold=1)
+    vm_missing = {"response": {}, "status_code": 500, "success": False}
+    for _ in range(3):
+        breaker.call("nodes/pve1/qemu/100/config", lambda: vm_missing)
+    assert breaker.state("pve1") == "closed"
+    breaker.call("nodes/pve1/status", lambda: {"network_error": True})
+    assert breaker.state("pve1") == "open"
+
+
+def test_late_success_keeps_the_circuit_open():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    # two requests allowed while closed, the first failure opens the circuit
+    assert breaker.allow("pve1") and breaker.allow("pve1")
+    breaker.record("pve1", DOWN)
+    breaker.record("pve1", OK)
+    assert breaker.state("pve1") == "open"
+    assert not breaker.allow("pve1")
+    clock.now += 10
+    assert breaker.allow("pve1")
+    breaker.record("pve1", OK)
+    assert breaker.state("pve1") == "closed"
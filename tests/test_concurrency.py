@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ext_api.concurrency import AdaptiveLimit, AsyncAdaptiveLimit
+
+OK = {"response": {"data": {"release": "8.3"}}, "status_code": 200, "success": True}
+DOWN = {"response": {}, "status_code": 595, "success": False}
+
+
+def test_aimd_decisions(caplog):
+    limit = AdaptiveLimit("requests", initial=4, max_limit=5, target_p95=1.0, window=4)
+    follower = AdaptiveLimit("scenarios", initial=2, max_limit=3, window=4)
+    limit.followers.append(follower)
+    # not saturated: healthy windows keep the limit
+    for _ in range(4):
+        limit.record(0.1)
+    assert limit.limit == 4
+    for _ in range(4):
+        limit.acquire()
+    for _ in range(4):
+        limit.record(0.1)
+    assert limit.limit == 5
+    # one slow request of four is the p95
+    for latency in (0.1, 0.1, 0.1, 1.5):
+        limit.record(latency)
+    assert limit.limit == 2 and limit.in_flight == 4
+    for failed in (False, True):
+        limit.record(0.1, failed)
+        limit.record(0.1, failed)
+    assert limit.limit == 1
+    assert limit.stats == {"limit": 1, "in_flight": 4, "increased": 1, "decreased": 2}
+    assert follower.limit == 1
+    assert "Concurrency of requests cut 5 -> 2" in caplog.text
+
+
+def test_sync_limit_blocks_above_limit():
+    limit = AdaptiveLimit("requests", initial=2)
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal running, peak
+        with limit:
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert peak == 2 and limit.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_async_limit_raised_wakes_waiters():
+    limit = AsyncAdaptiveLimit("requests", initial=1, max_limit=3, window=1)
+    await limit.acquire()
+    waiters = [asyncio.create_task(limit.acquire()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert not any(w.done() for w in waiters)
+    limit.record(0.01)
+    await asyncio.sleep(0)
+    assert limit.limit == 2 and sum(w.done() for w in waiters) == 1
+
+
+def test_api_records_requests(get_api, mocker):
+    get_api.retry = None
+    get_api.circuit_breaker = None
+    get_api.concurrency = AdaptiveLimit("requests", initial=1, min_limit=1, window=2)
+    mocker.patch.object(get_api.backend, "request", side_effect=[OK, DOWN, OK, OK])
+    for _ in range(2):
+        get_api.version.get()
+    # one error in two is over the error rate, the limit is at its minimum
+    assert get_api.concurrency.limit == 1
+    for _ in range(2):
+        get_api.version.get()
+    assert get_api.concurrency.limit == 2
+    assert get_api.concurrency.in_flight == 0
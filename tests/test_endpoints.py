@@ -0,0 +1,172 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import httpx
+import pytest
+
+from ext_api.backends.backend_https import (
+    ProxmoxAsyncHTTPSBackend,
+    ProxmoxHTTPSBackend,
+)
+from ext_api.backends.endpoints import EndpointPool, NodeAffinity
+
+URLS = ["https://pve1:8006", "https://pve2:8006", "https://pve3:8006"]
+
+
+def test_endpoint_pool_parse_urls():
+    assert EndpointPool.parse_urls("https://pve1:8006, https://pve2:8006") == URLS[:2]
+    assert EndpointPool.parse_urls(URLS) == URLS
+    assert EndpointPool.parse_urls("") == []
+
+
+def test_endpoint_pool_round_robin_and_least_outstanding():
+    pool = EndpointPool(URLS)
+    assert [pool.select().url for _ in range(4)] == URLS + URLS[:1]
+
+    pool = EndpointPool(URLS, strategy="least_outstanding")
+    with pool.track(pool.endpoints[0]), pool.track(pool.endpoints[1]):
+        assert pool.select().url == URLS[2]
+
+
+def test_endpoint_pool_takes_failed_endpoint_out_of_rotation():
+    pool = EndpointPool(URLS[:2], max_failures=2, cooldown=60)
+    first = pool.endpoints[0]
+    pool.report(first, ok=False)
+    assert first.is_up(0)
+    pool.report(first, ok=False)
+    assert {pool.select().url for _ in range(4)} == {URLS[1]}
+    # all down: the one that comes back first is used
+    pool.report(pool.endpoints[1], ok=False)
+    pool.report(pool.endpoints[1], ok=False)
+    assert pool.select() is first
+
+
+def test_backend_fails_over_to_next_endpoint():
+    backend = ProxmoxHTTPSBackend(
+        base_url=",".join(URLS[:2]), entry_point="/api2/json", token="fake_token"
+    )
+
+    def request(method, url, **kwargs):
+        if url.startswith(URLS[0]):
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"data": {"url": url}})
+
+    backend._client = mock.MagicMock()
+    backend._client.request.side_effect = request
+    result = backend.request(method="post", endpoint="nodes/pve1/qemu")
+    assert result["success"]
+    assert result["response"]["data"]["url"].startswith(URLS[1])
+    assert backend.endpoints.endpoints[0].failures == 1
+
+    # a read timeout may have reached the server: mutations are not sent again
+    backend._client.request.side_effect = httpx.ReadTimeout("timeout")
+    result = backend.request(method="post", endpoint="nodes/pve1/qemu")
+    assert result["status_code"] == 999
+    assert backend._client.request.call_count == 3
+
+
+def test_application_errors_keep_the_endpoint_healthy():
+    backend = ProxmoxHTTPSBackend(
+        base_url=URLS[0], entry_point="/api2/json", token="fake_token"
+    )
+    backend._client = mock.MagicMock()
+    backend._client.request.return_value = httpx.Response(
+        500, json={"data": None, "message": "VM is locked"}
+    )
+    for _ in range(5):
+        assert not backend.request(method="post", endpoint="nodes/pve1/qemu")["success"]
+    endpoint = backend.endpoints.endpoints[0]
+    assert endpoint.failures == 0 and endpoint.is_up(0)
+    backend._client.request.return_value = httpx.Response(503)
+    backend.request(method="get", endpoint="version")
+    assert endpoint.failures == 1
+
+
+CLUSTER_STATUS = {
+    "data": [
+        {"type": "cluster", "name": "cluster", "quorate": 1},
+        {"type": "node", "name": "pve1", "ip": "10.0.0.1", "online": 1},
+        {"type": "node", "name": "pve2", "ip": "10.0.0.2", "online": 1},
+        {"type": "node", "name": "pve3", "ip": "10.0.0.3", "online": 0},
+    ]
+}
+
+
+def test_backend_node_affinity_routes_to_node():
+    backend = ProxmoxHTTPSBackend(
+        base_url=URLS[0],
+        entry_point="/api2/json",
+        token="fake_token",
+        node_affinity=True,
+    )
+    urls = []
+
+    def request(method, url, **kwargs):
+        urls.append(url)
+        if url.endswith("cluster/status"):
+            return httpx.Response(200, json=CLUSTER_STATUS)
+        if url.startswith("https://10.0.0.2:8006"):
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"data": {}})
+
+    backend._client = mock.MagicMock()
+    backend._client.request.side_effect = request
+    backend.request(
+        method="get",
+        endpoint="nodes/{node}/qemu/{vmid}/status/current",
+        endpoint_params={"node": "pve1", "vmid": 100},
+    )
+    backend.request(method="get", endpoint="nodes/pve3/status")
+    backend.request(method="get", endpoint="cluster/resources")
+    assert urls == [
+        "https://pve1:8006/api2/json/cluster/status",
+        "https://10.0.0.1:8006/api2/json/nodes/pve1/qemu/100/status/current",
+        "https://pve1:8006/api2/json/nodes/pve3/status",
+        "https://pve1:8006/api2/json/cluster/resources",
+    ]
+
+    # unreachable node: falls back to the default endpoint
+    urls.clear()
+    result = backend.request(method="post", endpoint="nodes/pve2/qemu")
+    assert result["success"]
+    assert urls == [
+        "https://10.0.0.2:8006/api2/json/nodes/pve2/qemu",
+        "https://pve1:8006/api2/json/nodes/pve2/qemu",
+    ]
+
+
+def test_node_affinity_single_refresh():
+    affinity = NodeAffinity("https://pve1:8006", ttl=60)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        claimed = list(executor.map(lambda _: affinity.start_refresh(), range(32)))
+    assert claimed.count(True) == 1
+    affinity.learn([{"type": "node", "name": "pve2", "ip": "10.0.0.2"}])
+    assert not affinity.start_refresh()
+    assert affinity.nodes["pve2"].url == "https://10.0.0.2:8006"
+
+
+@pytest.mark.asyncio
+async def test_node_affinity_cancelled_refresh_is_released():
+    backend = ProxmoxAsyncHTTPSBackend(
+        base_url=URLS[0],
+        entry_point="/api2/json",
+        token="fake_token",
+        node_affinity=True,
+    )
+    started = asyncio.Event()
+
+    async def request(method, url, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    backend._client = mock.MagicMock()
+    backend._client.request.side_effect = request
+    assert backend.node_affinity.start_refresh()
+    refresh = asyncio.create_task(backend.refresh_nodes())
+    await started.wait()
+    refresh.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await refresh
+    assert not backend.node_affinity.refreshing
+    assert backend.node_affinity.start_refresh()
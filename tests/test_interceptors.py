@@ -0,0 +1,94 @@
+import pytest
+
+from ext_api.interceptors import Interceptor, InterceptorChain
+
+OK = {"response": {"data": {"release": "8.3"}}, "status_code": 200, "success": True}
+
+
+class Recorder(Interceptor):
+    def __init__(self, name: str, calls: list):
+        self.name = name
+        self.calls = calls
+
+    def before_request(self, context):
+        self.calls.append((self.name, "before", context.method, context.endpoint))
+
+    def after_response(self, context, result):
+        self.calls.append((self.name, "after", result.get("status_code")))
+        return result
+
+
+class Cache(Interceptor):
+    def __init__(self):
+        self.results = {}
+
+    def before_request(self, context):
+        return self.results.get(context.endpoint)
+
+    def after_response(self, context, result):
+        self.results[context.endpoint] = result
+        return result
+
+
+class Fallback(Interceptor):
+    def on_error(self, context, error):
+        return {"response": {}, "status_code": 500, "error": str(error)}
+
+
+class AsyncParams(Interceptor):
+    async def before_request(self, context):
+        context.kwargs["params"] = {"full": 1}
+
+
+def test_chain_order_and_short_circuit(get_api, mocker):
+    calls = []
+    cache = Cache()
+    get_api.interceptors.add(Recorder("outer", calls))
+    get_api.interceptors.add(cache)
+    get_api.interceptors.add(Recorder("inner", calls))
+    request = mocker.patch.object(get_api.backend, "request", return_value=OK)
+    for _ in range(2):
+        assert get_api.nodes("pve1").status.get(filter_keys="release") == "8.3"
+    assert request.call_count == 1
+    assert calls == [
+        ("outer", "before", "get", "nodes/pve1/status"),
+        ("inner", "before", "get", "nodes/pve1/status"),
+        ("inner", "after", 200),
+        ("outer", "after", 200),
+        # the cache answers, the inner interceptor is not called
+        ("outer", "before", "get", "nodes/pve1/status"),
+        ("outer", "after", 200),
+    ]
+    get_api.interceptors.remove(cache)
+    assert len(get_api.interceptors) == 2
+
+
+def test_on_error_replaces_the_error(get_api, mocker):
+    get_api.interceptors.add(Fallback())
+    mocker.patch.object(get_api.backend, "request", side_effect=OSError("down"))
+    result = get_api.version.get(filter_keys="_raw_")
+    assert result == {"response": {}, "status_code": 500, "error": "down"}
+    get_api.interceptors = InterceptorChain()
+    with pytest.raises(OSError):
+        get_api.version.get()
+
+
+def test_async_interceptor_needs_async_api(get_api):
+    get_api.interceptors.add(AsyncParams())
+    with pytest.raises(TypeError):
+        get_api.version.get()
+
+
+@pytest.mark.asyncio
+async def test_async_interceptors(get_api_async, mocker):
+    async with get_api_async as api:
+        calls = []
+        api.interceptors.add(AsyncParams())
+        api.interceptors.add(Recorder("sync", calls))
+        request = mocker.patch.object(api.backend, "async_request", return_value=OK)
+        assert await api.version.get(filter_keys="release") == "8.3"
+        assert request.call_args.kwargs["params"] == {"full": 1}
+        assert calls == [
+            ("sync", "before", "get", "version"),
+            ("sync", "after", 200),
+        ]
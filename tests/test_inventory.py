@@ -0,0 +1,97 @@
+import pytest
+
+from cluster_tasks.scenarios.clone_template_vm_async import (
+    ScenarioCloneTemplateVmAsync,
+)
+from cluster_tasks.scenarios.clone_template_vm_sync import ScenarioCloneTemplateVmSync
+from cluster_tasks.tasks.inventory import Inventory
+from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+
+RESOURCES = [
+    {"type": "node", "node": "pve1", "status": "online"},
+    {"type": "node", "node": "pve2", "status": "offline"},
+    {"type": "qemu", "vmid": 100, "node": "pve1", "name": "web", "tags": "a;b"},
+    {"type": "qemu", "vmid": 101, "node": "pve2", "name": "web", "pool": "prod"},
+    {"type": "lxc", "vmid": 200, "node": "pve1", "name": "ct", "tags": "b"},
+    {"type": "storage", "storage": "local", "node": "pve1"},
+]
+
+
+def response(data):
+    return {"response": {"data": data}, "status_code": 200, "success": True}
+
+
+def test_inventory_indexes():
+    inventory = Inventory(RESOURCES)
+    assert len(inventory) == len(RESOURCES)
+    assert inventory.get(100)["name"] == "web"
+    assert inventory.get("101") is RESOURCES[3]
+    assert inventory.get(999) is None and inventory.get(None) is None
+    assert 200 in inventory and 300 not in inventory
+    assert inventory.node_of(101) == "pve2"
+    assert [r["vmid"] for r in inventory.on_node("pve1")] == [100, 200]
+    assert [r["vmid"] for r in inventory.by_name("web")] == [100, 101]
+    assert [r["vmid"] for r in inventory.by_tag("b")] == [100, 200]
+    assert [r["vmid"] for r in inventory.by_tag("a")] == [100]
+    assert [r["vmid"] for r in inventory.in_pool("prod")] == [101]
+    assert inventory.of_type("storage") == [RESOURCES[5]]
+    assert inventory.of_type("sdn") == []
+    assert inventory.nodes() == ["pve1"]
+    assert inventory.nodes(online=False) == ["pve1", "pve2"]
+
+
+def test_inventory_empty():
+    inventory = Inventory(None)
+    assert len(inventory) == 0
+    assert inventory.node_of(100) is None
+    assert inventory.in_pool("prod") == []
+    assert inventory.by_name("web") == [] and inventory.by_tag("a") == []
+    assert Inventory.split_tags("a;b,c;") == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_inventory_scenario_check_async(get_api_async, mocker):
+    async with get_api_async as api:
+        mocker.patch.object(
+            api.backend, "async_request", return_value=response(RESOURCES)
+        )
+        tasks = ProxmoxTasksAsync(api=api)
+        check = ScenarioCloneTemplateVmAsync.check_vm_is_exists_in_cluster
+        assert await check(tasks, 101) == "pve2"
+        assert await check(tasks, 200) is None
+        assert await check(tasks, 300) is None
+        assert api.backend.async_request.call_count == 1
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_inventory_scenario_check_sync(get_api, mocker):
+    mocker.patch.object(get_api.backend, "request", return_value=response(RESOURCES))
+    tasks = ProxmoxTasksSync(api=get_api)
+    check = ScenarioCloneTemplateVmSync.check_vm_is_exists_in_cluster
+    assert check(tasks, 100) == "pve1"
+    assert check(tasks, 300) is None
+    assert [r["vmid"] for r in tasks.get_resources("qemu")] == [100, 101]
+    assert get_api.backend.request.call_count == 1
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_pool_members_from_inventory(get_api, mocker):
+    endpoints = []
+
+    def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        endpoints.append((method, endpoint))
+        if endpoint == "pools":
+            return response([{"poolid": "dev", "members": []}])
+        return response(RESOURCES)
+
+    mocker.patch.object(get_api.backend, "request", side_effect=mock_request)
+    tasks = ProxmoxTasksSync(api=get_api)
+    assert tasks.get_nodes() == ["pve1"]
+    assert tasks.create_pool_member("prod", 101)
+    assert tasks.delete_pool_member("prod", 100)
+    # the membership comes from the inventory, /pools is not requested
+    assert endpoints == [("get", "cluster/resources")]
+    assert tasks.get_pool_members("dev") == (set(), True)
+    assert endpoints[-1] == ("get", "pools")
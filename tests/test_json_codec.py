@@ -0,0 +1,34 @@
+import pytest
+
+from ext_api.backends import json_codec
+from ext_api.backends.backend_cli import ProxmoxCLIBaseBackend
+from ext_api.backends.backend_ssh import ProxmoxSSHBaseBackend
+
+BODY = b'  [{"vmid": 100, "name": "vm-\xc3\xa9", "cpu": 0.5}]\n'
+
+
+@pytest.mark.parametrize("library", json_codec.LIBRARIES)
+def test_json_codec_libraries(library):
+    try:
+        json_codec.use(library)
+    except ImportError:
+        pytest.skip(f"{library} is not installed")
+    try:
+        assert json_codec.loads(BODY) == [{"vmid": 100, "name": "vm-é", "cpu": 0.5}]
+        assert json_codec.loads(BODY.decode()) == json_codec.loads(BODY)
+        with pytest.raises(ValueError):
+            json_codec.loads(b"Usage: pvesh get <api_path>")
+    finally:
+        json_codec.use()
+
+
+@pytest.mark.parametrize("backend", [ProxmoxCLIBaseBackend, ProxmoxSSHBaseBackend])
+def test_result_analyze_decodes_once(backend, mocker):
+    loads = mocker.spy(json_codec, "_loads")
+    result = backend.result_analyze(BODY, b"", 0)
+    assert result["response"]["data"][0]["vmid"] == 100
+    assert loads.call_count == 1
+    assert backend.result_analyze(b" \n", b"", 0)["response"] == {"data": {}}
+    failed = backend.result_analyze(b"line 1\nno such resource\n", b"error", 2)
+    assert failed["response"]["data"] == "no such resource"
+    assert failed["success"] is False
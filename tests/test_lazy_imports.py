@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from config_loader.config import ConfigLoader
+from ext_api.backends.backend_registry import BackendRegistry, BackendType
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+
+
+def test_cli_startup_imports_no_backend_dependencies():
+    code = (
+        "import sys, main\n"
+        "from ext_api.backends.registry import register_backends\n"
+        "register_backends()\n"
+        "print(' '.join(m for m in ('httpx', 'paramiko', 'asyncssh', 'yaml') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_config_read_on_first_use(tmp_path):
+    config_file = tmp_path / "config.toml"
+    configuration = ConfigLoader(config_file)
+    config_file.write_text("[API]\nTIMEOUT = 7\n")
+    assert configuration.get("API.TIMEOUT") == 7
+    config_file.write_text("[API]\nTIMEOUT = 9\n")
+    configuration.load()
+    assert configuration.get("API.TIMEOUT") == 9
+
+
+def test_backend_with_missing_module():
+    BackendRegistry.register_backend(
+        "missing", BackendType.SYNC, "not_installed_module:Backend"
+    )
+    try:
+        with pytest.raises(ImportError, match="missing backend requires"):
+            BackendRegistry.get_backend("missing", BackendType.SYNC)
+    finally:
+        BackendRegistry.unregister_backend("missing", BackendType.SYNC)
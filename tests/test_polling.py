@@ -0,0 +1,50 @@
+import pytest
+
+from cluster_tasks.tasks.polling import PollingPolicies, PollingPolicy, PollingStats
+
+
+def test_polling_policy_backoff_with_ceiling():
+    policy = PollingPolicy(initial=0.1, factor=2, max_interval=1, jitter=0)
+    assert [policy.interval(n) for n in range(6)] == [0.1, 0.2, 0.4, 0.8, 1, 1]
+
+
+def test_polling_policy_jitter_bounds():
+    policy = PollingPolicy(initial=1, factor=1, max_interval=1, jitter=0.2)
+    intervals = [policy.interval(0) for _ in range(200)]
+    assert all(0.8 <= i <= 1.2 for i in intervals)
+    assert len(set(intervals)) > 1
+
+
+def test_polling_policies_from_config():
+    policies = PollingPolicies.from_config(
+        {
+            "INITIAL": 0.3,
+            "MAX_INTERVAL": 5,
+            "TYPES": {"qmclone": {"INITIAL": 3}, "vzdump": {"FACTOR": 3}},
+        }
+    )
+    assert policies.get("unknown") == PollingPolicy(initial=0.3, max_interval=5)
+    assert policies.get(None) == policies.default
+    # type overrides keep the built-in defaults of the type
+    assert policies.get("qmclone").initial == 3
+    assert policies.get("qmclone").max_interval == 15
+    assert policies.get("vzdump") == PollingPolicy(
+        initial=0.3, factor=3, max_interval=5
+    )
+    assert policies.get("qmconfig") == PollingPolicies.DEFAULT_POLICIES["qmconfig"]
+
+
+def test_polling_stats_detection_delay():
+    stats = PollingStats()
+    stats.add_wait(0.3)
+    assert "detection delay" not in stats.report()
+    stats.add_wait(9, detection_delay=1.5)
+    stats.add_wait(30, detection_delay=13.5)
+    stats.add_requests(6)
+    assert stats.requests_per_wait == 2
+    assert stats.detected == 2
+    assert stats.mean_detection_delay == pytest.approx(7.5)
+    assert stats.max_detection_delay == 13.5
+    assert "detection delay mean 7.5s max 13.5s (2 tasks)" in stats.report()
+    total = stats + stats
+    assert total.waits == 6 and total.max_detection_delay == 13.5
@@ -0,0 +1,63 @@
+import pytest
+
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+from ext_api.query import Query, accessor
+
+RESOURCES = [
+    {"id": "node/pve1", "type": "node", "node": "pve1", "cpu": 0.5},
+    {
+        "id": "qemu/102",
+        "type": "qemu",
+        "vmid": 102,
+        "node": "pve2",
+        "disks": [{"size": 8}],
+    },
+    {"id": "qemu/100", "type": "qemu", "vmid": 100, "node": "pve1", "disks": []},
+    {"id": "qemu/101", "type": "qemu", "vmid": 101, "node": "pve1"},
+    {"id": "storage/pve1/local", "type": "storage", "node": "pve1"},
+]
+
+
+def test_accessor_nested_paths():
+    assert accessor("disks.0.size")(RESOURCES[1]) == 8
+    assert accessor("disks.0.size")(RESOURCES[2]) is None
+    assert accessor("disks.x")(RESOURCES[1]) is None
+    assert accessor("vmid")("not a dict") is None
+    assert accessor("vmid") is accessor("vmid")
+    # a single digit key indexes a list, as nested paths do
+    assert accessor("1")([10, 20]) == 20
+    assert accessor("2")([10, 20]) is None
+    assert accessor("x")([10, 20]) is None
+
+
+def test_query_one_pass():
+    query = Query("vmid", where={"type": "qemu", "node": {"pve1"}}, order_by="vmid")
+    assert query.apply(RESOURCES) == [100, 101]
+    query = Query(["vmid", "cpu"], order_by="-vmid", limit=2)
+    assert query.apply(RESOURCES) == [{"vmid": 102}, {"vmid": 101}]
+    query = Query(where=lambda item: item.get("cpu"), limit=5)
+    assert query.apply(RESOURCES) == RESOURCES[:1]
+    query = Query(where={"vmid": lambda vmid: vmid and vmid > 100}, limit=1)
+    assert query.apply(RESOURCES) == RESOURCES[1:2]
+    assert Query(["node"]).apply(RESOURCES[0]) == {"node": "pve1"}
+    assert not Query()
+    with pytest.raises(ValueError):
+        Query(order_by=["vmid", "-node"])
+
+
+def test_get_with_query(get_api, mocker):
+    mocker.patch.object(
+        get_api.backend,
+        "request",
+        return_value={"response": {"data": RESOURCES}, "success": True},
+    )
+    vmids = get_api.cluster.resources.get(
+        filter_keys="vmid", where={"type": "qemu"}, order_by="vmid", limit=2
+    )
+    assert vmids == [100, 101]
+    assert get_api.cluster.resources.get(filter_keys=["node", "cpu"])[0] == {
+        "node": "pve1",
+        "cpu": 0.5,
+    }
+    tasks = ProxmoxTasksSync(api=get_api)
+    assert tasks.get_resources("storage", cached=False) == RESOURCES[-1:]
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ext_api.rate_limit import (
+    AsyncTokenBucket,
+    Priority,
+    RateLimiter,
+    TokenBucket,
+)
+
+OK = {"response": {"data": {"release": "8.3"}}, "status_code": 200, "success": True}
+
+
+def test_priority_of():
+    assert Priority.of("get") == Priority.INTERACTIVE
+    assert Priority.of("post") == Priority.MUTATION
+    assert Priority.of("get", "background") == Priority.BACKGROUND
+    assert Priority.of("delete", Priority.INTERACTIVE) == Priority.INTERACTIVE
+
+
+def test_sync_waiters_served_by_priority():
+    bucket = TokenBucket(rate=50, burst=1)
+    bucket.acquire()
+    served = []
+
+    def worker(priority: Priority):
+        bucket.acquire(priority)
+        served.append(priority)
+
+    threads = []
+    for priority in (Priority.BACKGROUND, Priority.INTERACTIVE, Priority.MUTATION):
+        thread = threading.Thread(target=worker, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        # queue them in this order before the first token is back
+        while bucket.waited < len(threads):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert served == [Priority.MUTATION, Priority.INTERACTIVE, Priority.BACKGROUND]
+    assert bucket.waited == 3
+
+
+def test_background_reserve():
+    bucket = TokenBucket(rate=1, burst=3, reserve=2)
+    bucket.acquire(Priority.BACKGROUND)
+    # the reserve is left to other requests
+    assert bucket._delay(Priority.BACKGROUND) > 0
+    bucket.acquire(Priority.INTERACTIVE)
+    bucket.acquire(Priority.MUTATION)
+    assert bucket.served == {
+        Priority.MUTATION: 1,
+        Priority.INTERACTIVE: 1,
+        Priority.BACKGROUND: 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_waiters_served_by_priority():
+    bucket = AsyncTokenBucket(rate=100, burst=1)
+    await bucket.acquire()
+    served = []
+
+    async def worker(priority: Priority):
+        await bucket.acquire(priority)
+        served.append(priority)
+
+    tasks = []
+    for priority in (Priority.BACKGROUND, Priority.BACKGROUND, Priority.MUTATION):
+        tasks.append(asyncio.create_task(worker(priority)))
+        await asyncio.sleep(0)
+    cancelled = asyncio.create_task(worker(Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(*tasks)
+    assert served == [Priority.MUTATION, Priority.BACKGROUND, Priority.BACKGROUND]
+
+
+def test_api_rate_limit_per_host(get_api, mocker):
+    get_api.rate_limit = RateLimiter(rate=1000, burst=5)
+    mocker.patch.object(get_api.backend, "request", return_value=OK)
+    host = get_api.backend.host_of("version")
+    assert host == get_api.backend.api_host
+    assert get_api.version.get(filter_keys="release") == "8.3"
+    get_api.cluster.tasks.get(priority=Priority.BACKGROUND)
+    get_api.nodes("pve1").qemu.post(data={"vmid": 100})
+    assert get_api.rate_limit.stats == {
+        host: {
+            "waited": 0,
+            "served": {"mutation": 1, "interactive": 1, "background": 1},
+        }
+    }
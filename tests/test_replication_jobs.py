@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+
+JOBS = [
+    {"id": "100-0", "guest": 100, "jobnum": 0, "target": "pve2"},
+    {"id": "100-3", "guest": 100, "jobnum": 3, "target": "pve3"},
+    {"id": "101-0", "guest": 101, "jobnum": 0, "target": "pve4"},
+]
+TARGETS = {"pve2": None, "pve4": {"schedule": "*/30"}, "pve5": {}}
+
+
+class FakeReplication:
+    def __init__(self):
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    def response(self, method, endpoint, data=None):
+        self.requests.append((method, endpoint, data))
+        if method == "get":
+            return {"response": {"data": JOBS}, "status_code": 200, "success": True}
+        success = data.get("target") != "pve5"
+        return {"response": {"data": None}, "status_code": 200, "success": success}
+
+
+def test_plan_replication_jobs():
+    planned, skipped = ProxmoxTasksSync.plan_replication_jobs(100, JOBS[:2], TARGETS)
+    assert skipped == ["pve2"]
+    assert planned["pve4"] == {
+        "schedule": "*/30",
+        "id": "100-4",
+        "target": "pve4",
+        "type": "local",
+    }
+    assert planned["pve5"]["id"] == "100-5"
+    planned, _ = ProxmoxTasksSync.plan_replication_jobs(102, [], {"pve1": None})
+    assert planned["pve1"]["id"] == "102-0"
+    assert TARGETS["pve4"] == {"schedule": "*/30"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_create_replication_jobs_async(get_api_async, mocker):
+    fake = FakeReplication()
+
+    async def mock_request(method=None, endpoint=None, data=None, **kwargs):
+        if method == "post":
+            fake.active += 1
+            fake.max_active = max(fake.max_active, fake.active)
+            await asyncio.sleep(0.01)
+            fake.active -= 1
+        return fake.response(method, endpoint, data)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        tasks = ProxmoxTasksAsync(api=api)
+        targets = {f"pve{n}": None for n in range(5, 11)} | {"pve3": None}
+        results = await tasks.create_replication_jobs(100, targets, max_concurrency=2)
+    assert list(results) == list(targets)
+    assert results["pve3"] is False and results["pve5"] is False
+    assert all(results[f"pve{n}"] for n in range(6, 11))
+    assert [r[0] for r in fake.requests].count("get") == 1
+    ids = sorted(r[2]["id"] for r in fake.requests if r[0] == "post")
+    assert ids == sorted(f"100-{n}" for n in range(4, 10))
+    assert fake.max_active == 2
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_create_replication_jobs_sync(get_api, mocker):
+    fake = FakeReplication()
+
+    def mock_request(method=None, endpoint=None, data=None, **kwargs):
+        return fake.response(method, endpoint, data)
+
+    mocker.patch.object(get_api.backend, "request", side_effect=mock_request)
+    tasks = ProxmoxTasksSync(api=get_api)
+    assert tasks.create_replication_jobs(100, TARGETS) == {
+        "pve2": False,
+        "pve4": True,
+        "pve5": False,
+    }
+    assert tasks.create_replication_job(100, "pve6") is True
+    assert tasks.create_replication_jobs(100, {}) == {}
+    assert [r[0] for r in fake.requests] == ["get", "post", "post", "get", "post"]
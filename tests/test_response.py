@@ -0,0 +1,37 @@
+import json
+
+from ext_api.backends.backend_cli import ProxmoxCLIBaseBackend
+from ext_api.backends.response import Response
+
+BODY = json.dumps({"data": [{"vmid": 100}, {"vmid": 101}]}).encode()
+
+
+def test_response_decodes_on_first_use():
+    response = Response(BODY, 200, True)
+    assert response["success"] and response.get("status_code") == 200
+    assert not response.decoded
+    assert response.data == [{"vmid": 100}, {"vmid": 101}]
+    assert response["response"] is response.body
+    assert response.decoded
+    assert response.get("missing", 1) == 1
+    assert Response(b"{broken", 200, True).data is None
+    assert Response.of({"release": "8.3"}).get("response") == {
+        "data": {"release": "8.3"}
+    }
+
+
+def test_cli_response_is_the_data():
+    result = ProxmoxCLIBaseBackend.result_analyze(b'{"release": "8.3"}\n', b"", 0)
+    assert result.data == {"release": "8.3"}
+    result = ProxmoxCLIBaseBackend.result_analyze(b"warning\nUPID:pve1:1:2:3\n", b"", 0)
+    assert result.data == "UPID:pve1:1:2:3"
+    result = ProxmoxCLIBaseBackend.result_analyze(b"", b"failed", 2)
+    assert result.data == {} and not result.success and result.error == "failed"
+
+
+def test_raw_callers_skip_decoding(get_api, mocker):
+    response = Response(BODY, 200, True)
+    mocker.patch.object(get_api.backend, "request", return_value=response)
+    result = get_api.cluster.replication.post(data={}, filter_keys="_raw_")
+    assert result.get("success") and not response.decoded
+    assert get_api.cluster.resources.get(filter_keys="vmid") == [100, 101]
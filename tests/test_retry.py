@@ -0,0 +1,62 @@
+import httpx
+import pytest
+
+from ext_api.backends.backend_https import ProxmoxHTTPBaseBackend
+from ext_api.retry import RetryPolicy
+
+OK = {"response": {"data": {"release": "8.3"}}, "status_code": 200, "success": True}
+BUSY = {"response": {}, "status_code": 503, "success": False}
+REFUSED = ProxmoxHTTPBaseBackend.error_result(httpx.ConnectError("refused"))
+RESET = ProxmoxHTTPBaseBackend.error_result(httpx.ReadError("reset"))
+
+
+def test_retry_reasons():
+    policy = RetryPolicy()
+    assert REFUSED["network_error"] and REFUSED["sent"] is False
+    assert RESET["sent"] is True
+    assert policy.reason("get", BUSY) == "HTTP 503"
+    assert policy.reason("get", RESET) == "network"
+    assert policy.reason("post", REFUSED) == "network"
+    # a mutation that may have reached the server is never sent again
+    assert policy.reason("post", RESET) is None
+    assert policy.reason("post", BUSY) is None
+    assert policy.reason("get", {"status_code": 404, "success": False}) is None
+    # pveproxy 500s repeat, e.g. the status of a VM that doesn't exist
+    assert policy.reason("get", {"status_code": 500, "success": False}) is None
+    assert policy.reason("get", OK) is None
+    assert all(0.5 <= policy.delay(2) <= 1.0 for _ in range(100))
+    assert RetryPolicy(backoff=4, backoff_max=5, jitter=0).delay(3) == 5
+
+
+def test_sync_retries(get_api, mocker):
+    get_api.retry = RetryPolicy(max_retries=2, backoff=0)
+    request = mocker.patch.object(
+        get_api.backend, "request", side_effect=[BUSY, RESET, OK]
+    )
+    assert get_api.version.get(filter_keys="release") == "8.3"
+    assert request.call_count == 3
+    request = mocker.patch.object(get_api.backend, "request", side_effect=[RESET, OK])
+    assert get_api.nodes("pve1").qemu.post(data={"vmid": 100}) is None
+    assert request.call_count == 1
+    request = mocker.patch.object(get_api.backend, "request", return_value=BUSY)
+    assert get_api.version.get() is None
+    assert request.call_count == 3
+    assert get_api.retry.stats == {
+        "requests": 3,
+        "retries": 4,
+        "recovered": 1,
+        "exhausted": 1,
+        "reasons": {"HTTP 503": 3, "network": 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_retries_unsent_mutation(get_api_async, mocker):
+    async with get_api_async as api:
+        api.retry = RetryPolicy(max_retries=1, backoff=0)
+        request = mocker.patch.object(
+            api.backend, "async_request", side_effect=[REFUSED, OK]
+        )
+        result = await api.nodes("pve1").qemu.post(data={}, filter_keys="_raw_")
+        assert result["success"] and request.call_count == 2
+        assert api.retry.recovered == 1
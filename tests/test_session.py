@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ext_api.backends.session import AsyncPersistentSession, PersistentSession
+from ext_api.proxmox_api import ProxmoxAPI
+
+
+class FakeBackend:
+    def __init__(self):
+        self.client = None
+        self.connects = 0
+        self.closes = 0
+
+    def connect(self):
+        self.connects += 1
+        self.client = object()
+
+    def close(self):
+        self.closes += 1
+        self.client = None
+
+
+class AsyncFakeBackend(FakeBackend):
+    async def connect(self):
+        super().connect()
+
+    async def close(self):
+        super().close()
+
+
+def test_nested_with_share_the_session():
+    backend = FakeBackend()
+    session = PersistentSession(backend, idle_timeout=0)
+    session.enter()
+    session.enter()
+    session.begin()
+    session.end()
+    session.exit()
+    assert backend.client is not None
+    session.exit()
+    assert (backend.connects, backend.closes) == (1, 1)
+
+
+def test_lazy_session_closed_when_idle():
+    backend = FakeBackend()
+    session = PersistentSession(backend, idle_timeout=0.05)
+    for _ in range(3):
+        session.begin()
+        session.end()
+    assert backend.connects == 1 and backend.client is not None
+    time.sleep(0.15)
+    assert backend.closes == 1 and backend.client is None
+    session.begin()
+    session.end()
+    session.close()
+    assert backend.connects == 2
+
+
+@pytest.mark.asyncio
+async def test_async_session_shared_and_closed_when_idle():
+    backend = AsyncFakeBackend()
+    session = AsyncPersistentSession(backend, idle_timeout=0.05)
+    await asyncio.gather(*(session.begin() for _ in range(5)))
+    for _ in range(5):
+        session.end()
+    assert backend.connects == 1
+    await session.enter()
+    await session.begin()
+    session.end()
+    await session.exit()
+    assert backend.closes == 1
+    await session.begin()
+    session.end()
+    await asyncio.sleep(0.15)
+    assert (backend.connects, backend.closes) == (2, 2)
+
+
+def test_async_session_of_another_loop_reopened():
+    backend = AsyncFakeBackend()
+    session = AsyncPersistentSession(backend, idle_timeout=0)
+
+    async def request():
+        await session.begin()
+        session.end()
+
+    asyncio.run(request())
+    asyncio.run(request())
+    # the client of the first loop is closed before it is replaced
+    assert (backend.connects, backend.closes) == (2, 1)
+
+
+def test_async_session_of_another_loop_replaced_when_close_fails():
+    backend = AsyncFakeBackend()
+    session = AsyncPersistentSession(backend, idle_timeout=0)
+
+    async def close():
+        raise RuntimeError("Event loop is closed")
+
+    async def request():
+        await session.begin()
+        session.end()
+        return backend.client
+
+    first = asyncio.run(request())
+    backend.close = close
+    assert asyncio.run(request()) is not first
+    assert backend.connects == 2
+
+
+@pytest.mark.asyncio
+async def test_async_idle_close_task_kept_and_errors_logged(caplog):
+    backend = AsyncFakeBackend()
+    session = AsyncPersistentSession(backend, idle_timeout=0.01)
+    closing = asyncio.Event()
+
+    async def slow_close():
+        await closing.wait()
+        FakeBackend.close(backend)
+
+    backend.close = slow_close
+    await session.begin()
+    session.end()
+    await asyncio.sleep(0.03)
+    assert session._closing is not None and not session._closing.done()
+    asyncio.get_running_loop().call_later(0.01, closing.set)
+    # close() waits for the idle close instead of closing the client twice
+    await session.close()
+    assert session._closing is None and backend.closes == 1
+
+    async def close():
+        raise OSError("connection reset")
+
+    backend.close = close
+    await session.begin()
+    session.end()
+    await asyncio.sleep(0.05)
+    assert session._closing is None
+    assert "Closing the idle session failed" in caplog.text
+
+
+def test_requests_outside_with_reuse_the_client(mocker):
+    api = ProxmoxAPI(
+        backend_name="https",
+        backend_type="sync",
+        base_url="https://pve1:8006",
+        entry_point="/api2/json",
+        token="fake_token",
+    )
+    backend = api.backend
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"data": {"release": "8.3"}})
+    )
+
+    def connect():
+        backend._client = httpx.Client(transport=transport)
+
+    mocker.patch.object(backend, "connect", side_effect=connect)
+    for _ in range(3):
+        assert api.version.get(filter_keys="release") == "8.3"
+    with api:
+        with api:
+            assert api.version.get(filter_keys="release") == "8.3"
+        assert backend.client is not None
+    assert backend.client is None
+    assert backend.connect.call_count == 1
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ext_api.proxmox_api import ProxmoxAPI
+from ext_api.single_flight import SingleFlight
+
+
+def test_single_flight_key():
+    key = SingleFlight.make_key("GET", "/nodes/", {"b": 1, "a": "x"})
+    assert key == SingleFlight.make_key("get", "nodes", {"a": "x", "b": 1})
+    assert key != SingleFlight.make_key("get", "nodes", {"a": "y", "b": 1})
+
+
+def test_single_flight_sync_threads():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(1)
+        return {"data": 1}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, "key", call) for _ in range(8)]
+        while flight.calls + flight.coalesced < 8:
+            pass
+        release.set()
+        results = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert (flight.calls, flight.coalesced) == (1, 7)
+    # finished calls are not cached
+    flight.do("key", call)
+    assert len(calls) == 2
+
+
+def test_single_flight_sync_exception():
+    flight = SingleFlight()
+
+    def call():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", call)
+    assert flight._sync_calls == {}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_async_leader_cancelled():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "result"
+
+    leader = asyncio.create_task(flight.do_async("key", call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do_async("key", call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "result"
+    assert len(calls) == 1 and flight.coalesced == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_single_flight_api_async(get_api_async, mocker):
+    requests = []
+
+    async def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        requests.append((method, endpoint, params))
+        await asyncio.sleep(0.01)
+        data = [{"node": "pve1", "status": "online"}]
+        return {"response": {"data": data}, "status_code": 200, "success": True}
+
+    api = ProxmoxAPI(backend=get_api_async.backend, single_flight=True)
+    mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+    results = await asyncio.gather(
+        *(api.nodes.get() for _ in range(10)),
+        api.nodes.get(filter_keys="node"),
+        api.nodes.get(params={"x": 1}),
+        api.nodes.post(data={"x": 1}),
+        api.nodes.post(data={"x": 1}),
+    )
+    assert results[0] == [{"node": "pve1", "status": "online"}]
+    assert results[10] == ["pve1"]
+    assert len(requests) == 4
+    assert api.single_flight.coalesced == 10
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_single_flight_disabled_by_default(get_api):
+    assert get_api.single_flight is None
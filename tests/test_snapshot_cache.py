@@ -0,0 +1,123 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+from cluster_tasks.tasks.snapshot_cache import SnapshotCacheAsync, SnapshotCacheSync
+from ext_api.proxmox_api import ProxmoxAPI
+
+RESOURCES = [
+    {"type": "qemu", "vmid": 100, "node": "pve1"},
+    {"type": "qemu", "vmid": 101, "node": "pve2"},
+    {"type": "storage", "storage": "local", "node": "pve1"},
+    {"type": "node", "node": "pve2", "status": "online"},
+    {"type": "node", "node": "pve1", "status": "online"},
+    {"type": "node", "node": "pve3", "status": "offline"},
+]
+NODES = [
+    {"node": "pve2", "status": "online", "cpu": 0.1},
+    {"node": "pve1", "status": "online", "cpu": 0.2},
+    {"node": "pve3", "status": "offline"},
+]
+
+
+def response(endpoint):
+    data = {"cluster/resources": RESOURCES, "nodes": NODES}.get(endpoint, "UPID:x")
+    return {"response": {"data": data}, "status_code": 200, "success": True}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_snapshot_cache_async_single_flight(get_api_async, mocker):
+    endpoints = []
+
+    async def mock_request(method=None, endpoint=None, **kwargs):
+        endpoints.append(endpoint)
+        await asyncio.sleep(0.01)
+        return response(endpoint)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        tasks = ProxmoxTasksAsync(api=api)
+        resources = await asyncio.gather(
+            *(tasks.get_resources("qemu") for _ in range(20)),
+            tasks.get_resources("storage"),
+        )
+        nodes = await asyncio.gather(*(tasks.get_nodes() for _ in range(20)))
+    assert resources[0] == RESOURCES[:2]
+    assert resources[-1] == RESOURCES[2:3]
+    assert nodes[0] == ["pve1", "pve2"]
+    # the nodes come from the same snapshot
+    assert endpoints == ["cluster/resources"]
+    assert tasks.snapshot_cache_async is SnapshotCacheAsync.for_api(api)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_snapshot_cache_async_invalidated_by_clone(get_api_async, mocker):
+    endpoints = []
+
+    async def mock_request(method=None, endpoint=None, **kwargs):
+        endpoints.append(endpoint)
+        return response(endpoint)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        tasks = ProxmoxTasksAsync(api=api)
+        await tasks.get_resources("qemu")
+        await tasks.get_resources("qemu")
+        await tasks.vm_clone("pve1", 100, data={"newid": 102}, wait=False)
+        await tasks.get_resources("qemu")
+    assert endpoints.count("cluster/resources") == 2
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_snapshot_cache_sync_ttl_and_threads(get_api, mocker):
+    endpoints = []
+
+    def mock_request(method=None, endpoint=None, **kwargs):
+        endpoints.append(endpoint)
+        time.sleep(0.01)
+        return response(endpoint)
+
+    mocker.patch.object(get_api.backend, "request", side_effect=mock_request)
+    tasks = ProxmoxTasksSync(api=get_api)
+    tasks.snapshot_cache_sync.ttl = 0.05
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: tasks.get_resources("qemu"), range(16)))
+    assert results == [RESOURCES[:2]] * 16
+    assert endpoints == ["cluster/resources"]
+    time.sleep(0.06)
+    tasks.get_resources("qemu")
+    assert endpoints == ["cluster/resources"] * 2
+    assert tasks.get_nodes(online=False) == ["pve1", "pve2", "pve3"]
+    assert tasks.get_nodes(cached=False) == ["pve1", "pve2"]
+    assert endpoints.count("nodes") == 1
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_snapshot_cache_shared_by_clients_of_threads(get_api, mocker):
+    endpoints = []
+
+    def mock_request(method=None, endpoint=None, **kwargs):
+        endpoints.append(endpoint)
+        time.sleep(0.01)
+        return response(endpoint)
+
+    other_api = ProxmoxAPI(backend_name="https", backend_type="sync")
+    for api in (get_api, other_api):
+        mocker.patch.object(api.backend, "request", side_effect=mock_request)
+    cache = SnapshotCacheSync()
+    clients = [
+        ProxmoxTasksSync(api=api, snapshot_cache=cache) for api in (get_api, other_api)
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda i: clients[i % 2].get_resources("qemu"), range(16))
+        )
+    assert results == [RESOURCES[:2]] * 16
+    assert endpoints == ["cluster/resources"]
+    assert clients[1].snapshot_cache_sync is cache
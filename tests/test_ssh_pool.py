@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ext_api.backends.ssh_pool import AsyncSSHConnectionPool, SSHConnectionPool
+
+
+class FakeClient:
+    def __init__(self):
+        self.alive = True
+        self.active = 0
+        self.max_active = 0
+
+    def close(self):
+        self.alive = False
+
+
+def test_ssh_pool_bounds_channels_per_connection():
+    clients = []
+
+    def connect():
+        clients.append(FakeClient())
+        return clients[-1]
+
+    pool = SSHConnectionPool(
+        connect, lambda c: c.alive, FakeClient.close, size=2, max_channels=3
+    )
+    lock = threading.Lock()
+
+    def run():
+        with pool.acquire() as client:
+            with lock:
+                client.active += 1
+                client.max_active = max(client.max_active, client.active)
+            time.sleep(0.01)
+            with lock:
+                client.active -= 1
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(lambda _: run(), range(36)))
+    assert len(clients) == 2
+    assert all(0 < c.max_active <= 3 for c in clients)
+    assert sum(c.requests for c in pool.connections) == 36
+    pool.close()
+    assert not any(c.alive for c in clients)
+
+
+def test_ssh_pool_replaces_dropped_connection():
+    clients = []
+
+    def connect():
+        clients.append(FakeClient())
+        return clients[-1]
+
+    pool = SSHConnectionPool(connect, lambda c: c.alive, FakeClient.close, size=1)
+    first = pool.start()
+    first.alive = False
+    with pool.acquire() as client:
+        assert client is clients[1]
+    assert (pool.connects, pool.dropped) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_async_ssh_pool_bounds_channels():
+    clients = []
+
+    async def connect():
+        await asyncio.sleep(0)
+        clients.append(FakeClient())
+        return clients[-1]
+
+    async def close(client):
+        client.close()
+
+    pool = AsyncSSHConnectionPool(
+        connect, lambda c: c.alive, close, size=2, max_channels=2
+    )
+
+    async def run():
+        async with pool.acquire() as client:
+            client.active += 1
+            client.max_active = max(client.max_active, client.active)
+            await asyncio.sleep(0.01)
+            client.active -= 1
+
+    await asyncio.gather(*(run() for _ in range(10)))
+    assert len(clients) == 2
+    assert all(c.max_active == 2 for c in clients)
+    for client in clients:
+        client.alive = False
+    await run()
+    assert (pool.connects, pool.dropped) == (3, 2)
+    await pool.close()
+    assert not any(c.alive for c in clients)
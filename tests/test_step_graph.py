@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cluster_tasks.scenarios.step_graph import ScenarioStep, StepGraph
+
+STEPS = (
+    ScenarioStep("clone"),
+    ScenarioStep("migrate", ("clone",)),
+    ScenarioStep("tags", ("migrate",)),
+    ScenarioStep("replication", ("migrate",)),
+    ScenarioStep("pool", ("migrate",)),
+)
+
+
+def test_step_graph_validation():
+    with pytest.raises(ValueError, match="unknown"):
+        StepGraph([ScenarioStep("a", ("b",))])
+    with pytest.raises(ValueError, match="Cycle"):
+        StepGraph([ScenarioStep("a", ("b",)), ScenarioStep("b", ("a",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        StepGraph([ScenarioStep("a"), ScenarioStep("a")])
+
+
+@pytest.mark.asyncio
+async def test_step_graph_async_runs_independent_steps_concurrently():
+    events = []
+
+    def step(name):
+        async def run():
+            events.append(("start", name))
+            await asyncio.sleep(0.05)
+            events.append(("end", name))
+
+        return run
+
+    graph = StepGraph(STEPS, name="test")
+    started = time.monotonic()
+    await graph.run_async({s.name: step(s.name) for s in STEPS})
+    elapsed = time.monotonic() - started
+    assert elapsed < 0.05 * 4
+    assert events[:4] == [
+        ("start", "clone"),
+        ("end", "clone"),
+        ("start", "migrate"),
+        ("end", "migrate"),
+    ]
+    assert {e[1] for e in events[4:7]} == {"tags", "replication", "pool"}
+    assert all(e[0] == "start" for e in events[4:7])
+    assert [t.name for t in graph.timings][:2] == ["clone", "migrate"]
+    assert all(t.finished and t.error is None for t in graph.timings)
+
+
+@pytest.mark.asyncio
+async def test_step_graph_async_failure_stops_dependents():
+    ran = []
+
+    def step(name, fail=False):
+        async def run():
+            ran.append(name)
+            if fail:
+                raise RuntimeError(f"{name} failed")
+
+        return run
+
+    graph = StepGraph(STEPS)
+    steps = {s.name: step(s.name) for s in STEPS}
+    steps["migrate"] = step("migrate", fail=True)
+    with pytest.raises(RuntimeError, match="migrate failed"):
+        await graph.run_async(steps)
+    assert ran == ["clone", "migrate"]
+    assert isinstance(graph.timings[-1].error, RuntimeError)
+
+
+def test_step_graph_sync_threads():
+    threads = {}
+    barrier = threading.Barrier(3, timeout=1)
+
+    def step(name):
+        def run():
+            threads[name] = threading.current_thread().name
+            if name in ("tags", "replication", "pool"):
+                # the three independent steps must be running at the same time
+                barrier.wait()
+
+        return run
+
+    graph = StepGraph(STEPS)
+    graph.run_sync({s.name: step(s.name) for s in STEPS})
+    assert set(threads) == {s.name for s in STEPS}
+    assert len(graph.timings) == len(STEPS)
@@ -0,0 +1,139 @@
+import json
+from functools import partial
+
+import httpx
+import pytest
+
+from ext_api.backends.backend_abstract import ProxmoxBackend, StreamError
+from ext_api.backends.json_codec import JSONArrayStream
+from ext_api.proxmox_api import ProxmoxAPI
+
+RESOURCES = [
+    {"id": f"qemu/{vmid}", "type": "qemu", "vmid": vmid, "name": f"vm-{vmid}]"}
+    for vmid in range(100, 160)
+] + [{"id": "node/pve1", "type": "node", "node": "pve1", "name": 'a "[{,\\'}]
+BODY = json.dumps({"data": RESOURCES}).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(BODY)])
+def test_json_array_stream_chunk_boundaries(chunk_size):
+    parser = JSONArrayStream()
+    items = []
+    for start in range(0, len(BODY), chunk_size):
+        items += parser.feed(BODY[start : start + chunk_size])
+    assert items == RESOURCES
+    assert parser.done
+    # pvesh prints the bare array
+    assert JSONArrayStream().feed(json.dumps(RESOURCES[:2]).encode()) == RESOURCES[:2]
+    assert JSONArrayStream().feed(b'{"data": []}') == []
+    assert JSONArrayStream().feed(b'{"errors": [1], "data": [2]}') == [2]
+
+
+def test_json_array_stream_object_body():
+    parser = JSONArrayStream()
+    assert parser.feed(b'{"data": {"release": "8.3", "re') == []
+    assert parser.feed(b'pos": [1, 2]}}') == []
+    assert parser.close() == [{"release": "8.3", "repos": [1, 2]}]
+    # pvesh prints the object itself
+    parser = JSONArrayStream()
+    assert parser.feed(b'{"cpu": 0.1, "loadavg": ["0.5"]}') == []
+    assert parser.close() == [{"cpu": 0.1, "loadavg": ["0.5"]}]
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    assert request.url.path == "/api2/json/cluster/resources"
+    assert request.url.params.get("type") == "vm"
+    return httpx.Response(200, content=BODY)
+
+
+def make_api(backend_type: str, client) -> ProxmoxAPI:
+    api = ProxmoxAPI(
+        backend_name="https",
+        backend_type=backend_type,
+        base_url="https://pve1:8006",
+        entry_point="/api2/json",
+        token="fake_token",
+    )
+    api.backend._client = client
+    return api
+
+
+def test_stream_sync_filters_items():
+    api = make_api("sync", httpx.Client(transport=httpx.MockTransport(handler)))
+    items = api.cluster.resources.stream(params={"type": "vm"}, filter_keys="vmid")
+    assert list(items) == [r.get("vmid") for r in RESOURCES]
+    request = api.cluster.resources.stream(get_request_param=True)
+    assert request["method"] == "get"
+    assert request["endpoint"] == "cluster/resources"
+
+
+@pytest.mark.asyncio
+async def test_stream_async_filters_items():
+    api = make_api("async", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    items = [
+        item
+        async for item in api.cluster.resources.stream(
+            params={"type": "vm"}, filter_keys=["vmid", "node"]
+        )
+    ]
+    assert items[0] == {"vmid": 100}
+    assert items[-1] == {"node": "pve1"}
+    assert len(items) == len(RESOURCES)
+
+
+def test_stream_falls_back_to_full_request(get_api, mocker):
+    mocker.patch.object(
+        get_api.backend,
+        "request",
+        return_value={"response": {"data": RESOURCES[:3]}, "success": True},
+    )
+    # backends without streaming send the body of request() as one chunk
+    mocker.patch.object(
+        get_api.backend, "stream", partial(ProxmoxBackend.stream, get_api.backend)
+    )
+    assert list(get_api.cluster.resources.stream(filter_keys="vmid")) == [100, 101, 102]
+
+
+def test_stream_where_and_limit():
+    api = make_api("sync", httpx.Client(transport=httpx.MockTransport(handler)))
+    items = api.cluster.resources.stream(
+        params={"type": "vm"},
+        filter_keys="vmid",
+        where={"vmid": lambda vmid: vmid % 2},
+        limit=3,
+    )
+    assert list(items) == [101, 103, 105]
+
+
+def test_stream_failure_raises(get_api, mocker):
+    api = make_api(
+        "sync",
+        httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(500))),
+    )
+    with pytest.raises(StreamError) as error:
+        list(api.cluster.resources.stream())
+    assert error.value.status_code == 500
+    mocker.patch.object(
+        get_api.backend,
+        "request",
+        return_value={"response": None, "status_code": 2, "success": False},
+    )
+    mocker.patch.object(
+        get_api.backend, "stream", partial(ProxmoxBackend.stream, get_api.backend)
+    )
+    with pytest.raises(StreamError):
+        list(get_api.cluster.resources.stream())
+
+
+@pytest.mark.asyncio
+async def test_stream_async_object_body():
+    api = make_api(
+        "async",
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda r: httpx.Response(200, json={"data": {"release": "8.3"}})
+            )
+        ),
+    )
+    items = [item async for item in api.version.stream(filter_keys="release")]
+    assert items == ["8.3"]
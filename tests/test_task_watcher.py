@@ -0,0 +1,177 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cluster_tasks.tasks.polling import PollingPolicies, PollingPolicy
+from cluster_tasks.tasks.proxmox_tasks_async import ProxmoxTasksAsync
+from cluster_tasks.tasks.proxmox_tasks_sync import ProxmoxTasksSync
+from cluster_tasks.tasks.task_watcher import TaskWatcherAsync, TaskWatcherSync
+
+FAST_POLICY = PollingPolicy(initial=0.01, factor=1, max_interval=0.01, jitter=0)
+FAST_POLICIES = PollingPolicies(default=FAST_POLICY, policies={"qmclone": FAST_POLICY})
+
+
+def make_upid(node: str, vm_id: int, task_type: str = "qmclone") -> str:
+    return (
+        f"UPID:{node}:0000{vm_id:04X}:00001234:65A00000:{task_type}:{vm_id}:root@pam:"
+    )
+
+
+class FakeCluster:
+    """Fake task lists: each task finishes after the given number of polls."""
+
+    def __init__(self, tasks: dict[str, int]):
+        self.tasks = tasks
+        self.endpoints = []
+
+    def response(self, endpoint, params=None):
+        self.endpoints.append(endpoint)
+        polls = self.endpoints.count(endpoint)
+        if endpoint == "cluster/tasks":
+            end = {"endtime": int(time.time()), "status": "OK"}
+            data = [
+                {"upid": upid, **(end if polls >= n else {})}
+                for upid, n in self.tasks.items()
+            ]
+        else:
+            node = endpoint.split("/")[1]
+            data = [
+                {"upid": upid}
+                for upid, n in self.tasks.items()
+                if f":{node}:" in upid and polls < n
+            ]
+        return {"response": {"data": data}, "status_code": 200, "success": True}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_task_watcher_async_single_poll_per_tick(get_api_async, mocker):
+    upids = [make_upid("pve1", 100), make_upid("pve2", 101), make_upid("pve3", 102)]
+    cluster = FakeCluster({upids[0]: 1, upids[1]: 3, upids[2]: 2})
+
+    async def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        return cluster.response(endpoint, params)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        tasks = ProxmoxTasksAsync(
+            api=api, polling_interval=0.01, polling_policies=FAST_POLICIES
+        )
+        results = await asyncio.gather(
+            *(tasks.wait_task_done_async(upid) for upid in upids)
+        )
+    assert results == [True, True, True]
+    assert cluster.endpoints == ["cluster/tasks"] * 3
+    assert tasks.polling_stats.detected == 3
+    assert 0 <= tasks.polling_stats.max_detection_delay < 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_task_watcher_async_as_completed(get_api_async, mocker):
+    upids = [make_upid("pve1", 100), make_upid("pve1", 101), make_upid("pve2", 102)]
+    cluster = FakeCluster({upids[0]: 3, upids[1]: 1, upids[2]: 2})
+
+    async def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        return cluster.response(endpoint, params)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        watcher = TaskWatcherAsync(
+            api, polling_interval=0.01, source="node", polling_policies=FAST_POLICIES
+        )
+        completed = [upid async for upid, _ in watcher.as_completed(upids)]
+    assert completed == [upids[1], upids[2], upids[0]]
+    assert set(cluster.endpoints) == {"nodes/pve1/tasks", "nodes/pve2/tasks"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_task_watcher_async_timeout(get_api_async, mocker):
+    upid = make_upid("pve1", 100)
+    cluster = FakeCluster({upid: 1_000})
+
+    async def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        return cluster.response(endpoint, params)
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        watcher = TaskWatcherAsync(
+            api, polling_interval=0.01, polling_policies=FAST_POLICIES
+        )
+        assert await watcher.wait(upid, timeout=0.05) is False
+    assert watcher.pending == []
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_task_watcher_sync_shared_between_threads(get_api, mocker):
+    upids = [make_upid("pve1", vm_id) for vm_id in range(100, 108)]
+    cluster = FakeCluster({upid: 2 + i % 3 for i, upid in enumerate(upids)})
+
+    def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        return cluster.response(endpoint, params)
+
+    mocker.patch.object(get_api.backend, "request", side_effect=mock_request)
+    tasks = ProxmoxTasksSync(
+        api=get_api, polling_interval=0.01, polling_policies=FAST_POLICIES
+    )
+    with ThreadPoolExecutor(max_workers=len(upids)) as executor:
+        results = list(executor.map(tasks.wait_task_done_sync, upids))
+    assert results == [True] * len(upids)
+    assert tasks.task_watcher_sync is TaskWatcherSync.for_api(get_api)
+    assert len(cluster.endpoints) <= 4
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_task_watcher_settings_of_the_latest_caller(get_api):
+    slow = PollingPolicies(default=PollingPolicy(initial=60))
+    watcher = TaskWatcherSync.for_api(get_api, timeout=30, polling_policies=slow)
+    first = make_upid("pve1", 100)
+    watcher.watch(first)
+    shared = TaskWatcherSync.for_api(get_api, timeout=5, polling_policies=FAST_POLICIES)
+    assert shared is watcher and watcher.timeout == 5
+    second = make_upid("pve1", 101)
+    watcher.watch(second)
+    # the watched UPID keeps its settings, the new one takes the latest
+    assert watcher._pending[first].timeout == 30
+    assert watcher._pending[first].policy is slow.get("qmclone")
+    assert watcher._pending[second].timeout == 5
+    assert watcher._pending[second].policy is FAST_POLICY
+    assert TaskWatcherSync.for_api(get_api).timeout == 5
+    with pytest.raises(ValueError):
+        TaskWatcherSync.for_api(get_api, source="node")
+
+
+@pytest.mark.parametrize("get_api", [{"backend_name": "https"}], indirect=True)
+def test_task_watcher_sync_malformed_upid(get_api, mocker):
+    request = mocker.patch.object(get_api.backend, "request")
+    tasks = ProxmoxTasksSync(api=get_api, polling_policies=FAST_POLICIES)
+    assert tasks.wait_task_done_sync("not a upid") is False
+    assert tasks.task_watcher_sync.pending == []
+    request.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_api_async", [{"backend_name": "https"}], indirect=True)
+async def test_task_watcher_async_missing_from_cluster_list(get_api_async, mocker):
+    upid = make_upid("pve1", 100)
+    endpoints = []
+
+    async def mock_request(method=None, endpoint=None, params=None, **kwargs):
+        endpoints.append(endpoint)
+        # the task rotated out of the recent cluster task list
+        data = {"status": "stopped"} if endpoint.endswith("/status") else []
+        return {"response": {"data": data}, "status_code": 200, "success": True}
+
+    async with get_api_async as api:
+        mocker.patch.object(api.backend, "async_request", side_effect=mock_request)
+        watcher = TaskWatcherAsync(
+            api, polling_interval=0.01, polling_policies=FAST_POLICIES
+        )
+        watcher.MISSING_GRACE = 0.02
+        assert await watcher.wait(upid, timeout=5) is True
+        assert await watcher.wait("UPID:bad") is False
+    assert endpoints[-1] == f"nodes/pve1/tasks/{upid}/status"
+    assert endpoints.count("cluster/tasks") <= 4